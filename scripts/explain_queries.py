@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+"""
+Run EXPLAIN (ANALYZE) over the hot-path queries against a seeded database and flag sequential scans.
+
+Sample ids (the user with the most chats, their longest chat, ...) are taken from the database itself, so run it
+after seeding and some traffic, e.g.:
+    python scripts/explain_queries.py
+    python scripts/explain_queries.py --force-index   # small databases, see the notes below
+
+By default a Seq Scan is flagged on tables with at least --min-rows rows, below that the planner rightly prefers
+seq scans. On a small database use --force-index instead: it disables seq scans for the session, so a Seq Scan that
+is still in a plan means no index can serve the query at all. Exits with 1 when any plan is flagged.
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+from uuid import UUID
+
+root_dir = Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+
+from sqlalchemy import and_, func, select, text, tuple_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.services.chats.chat_service import CHAT_LIST_COLUMNS, MESSAGE_LIST_COLUMNS
+
+from src.storage.db import db_session_manager
+from src.storage.models import Chat, ChatMessage, HostApiKey, Resource, SharedConversation, Usage
+
+PAGE_SIZE = 50
+LAST_UUID = UUID(int=2 ** 128 - 1)  # cursor past every message, so the first page goes through the keyset filter
+
+
+class Samples(NamedTuple):
+    user_id: Any
+    chat_id: Any
+    previous_message_id: Any
+    model_id: Any
+    resource: Any
+
+
+class CanonicalQuery(NamedTuple):
+    name: str
+    build: Callable[[Samples], Any]
+
+
+# Mirrors of the queries the services run on every request
+CANONICAL_QUERIES: List[CanonicalQuery] = [
+    CanonicalQuery(
+        "chats: list page",
+        lambda s: select(*CHAT_LIST_COLUMNS, SharedConversation.id)
+        .outerjoin(SharedConversation, SharedConversation.chat_id == Chat.id)
+        .where(Chat.user_id == s.user_id)
+        .order_by(Chat.pinned.desc(), Chat.updated_at.desc(), Chat.id.desc())
+        .limit(PAGE_SIZE + 1),
+    ),
+    CanonicalQuery(
+        "chats: get chat",
+        lambda s: select(Chat).where(Chat.id == s.chat_id, Chat.user_id == s.user_id),
+    ),
+    CanonicalQuery(
+        "chat_messages: history",
+        lambda s: select(ChatMessage)
+        .join(Chat, Chat.id == ChatMessage.chat_id)
+        .where(ChatMessage.chat_id == s.chat_id, Chat.user_id == s.user_id, ChatMessage.content.isnot(None))
+        .order_by(ChatMessage.seq_num.asc()),
+    ),
+    CanonicalQuery(
+        "chat_messages: history page",
+        lambda s: select(*MESSAGE_LIST_COLUMNS)
+        .join(Chat, Chat.id == ChatMessage.chat_id)
+        .where(ChatMessage.chat_id == s.chat_id, Chat.user_id == s.user_id, ChatMessage.content.isnot(None))
+        .where(tuple_(ChatMessage.seq_num, ChatMessage.id) < (2 ** 31 - 1, LAST_UUID))
+        .order_by(ChatMessage.seq_num.desc(), ChatMessage.id.desc())
+        .limit(PAGE_SIZE + 1),
+    ),
+    CanonicalQuery(
+        "chat_messages: max seq_num",
+        lambda s: select(func.coalesce(func.max(ChatMessage.seq_num), 0)).where(ChatMessage.chat_id == s.chat_id),
+    ),
+    CanonicalQuery(
+        "chat_messages: replies of a message",
+        lambda s: select(ChatMessage.id).where(ChatMessage.previous_message_id == s.previous_message_id),
+    ),
+    CanonicalQuery(
+        "shared_conversations: of a chat",
+        lambda s: select(SharedConversation).where(SharedConversation.chat_id == s.chat_id),
+    ),
+    CanonicalQuery(
+        "usage: of a user and model",
+        lambda s: select(Usage).where(Usage.user_id == s.user_id, Usage.model_id == s.model_id),
+    ),
+    CanonicalQuery(
+        "host_api_keys: active keys of a user",
+        lambda s: select(HostApiKey).where(HostApiKey.user_id == s.user_id, HostApiKey.is_active == True),
+    ),
+    CanonicalQuery(
+        "resources: file of a user",
+        lambda s: select(Resource).where(
+            and_(Resource.id == s.resource.id, Resource.user_id == s.resource.user_id)
+        ) if s.resource else None,
+    ),
+]
+
+
+async def load_samples(connection: AsyncConnection) -> Optional[Samples]:
+    user_id = await connection.scalar(
+        select(Chat.user_id).group_by(Chat.user_id).order_by(func.count().desc()).limit(1)
+    )
+    if user_id is None:
+        return None
+
+    chat_id = await connection.scalar(
+        select(ChatMessage.chat_id)
+        .join(Chat, Chat.id == ChatMessage.chat_id)
+        .where(Chat.user_id == user_id)
+        .group_by(ChatMessage.chat_id)
+        .order_by(func.count().desc())
+        .limit(1)
+    )
+    previous_message_id = await connection.scalar(
+        select(ChatMessage.previous_message_id).where(ChatMessage.chat_id == chat_id, ChatMessage.previous_message_id.isnot(None)).limit(1)
+    )
+    model_id = await connection.scalar(select(Usage.model_id).where(Usage.user_id == user_id).limit(1))
+    resource = (await connection.execute(select(Resource.id, Resource.user_id).limit(1))).first()
+    return Samples(user_id, chat_id, previous_message_id, model_id, resource)
+
+
+def find_seq_scans(plan: Dict[str, Any]) -> List[str]:
+    relations = []
+    if plan.get("Node Type") == "Seq Scan":
+        relations.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        relations.extend(find_seq_scans(child))
+    return relations
+
+
+async def get_table_rows(connection: AsyncConnection, table: str) -> Optional[int]:
+    """Estimated row count, None for a table never vacuumed or analyzed (reltuples -1)."""
+    rows = await connection.scalar(text(f"SELECT reltuples FROM pg_class WHERE oid = 'agg_ai.{table}'::regclass"))
+    return int(rows) if rows >= 0 else None
+
+
+async def explain(connection: AsyncConnection, stmt, analyze: bool) -> Dict[str, Any]:
+    sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    result = await connection.exec_driver_sql(f"EXPLAIN ({options}) {sql}")
+    return result.scalar()[0]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN the hot-path queries and flag sequential scans")
+    parser.add_argument("--min-rows", type=int, default=1000, help="Flag seq scans on tables with at least this many rows (default: 1000)")
+    parser.add_argument("--force-index", action="store_true", help="Disable seq scans and flag any plan that still has one")
+    parser.add_argument("--no-analyze", action="store_true", help="Plain EXPLAIN, the queries are not executed")
+    parser.add_argument("--verbose", action="store_true", help="Print the full plans")
+    args = parser.parse_args()
+
+    flagged = 0
+    async with db_session_manager.connect() as connection:
+        samples = await load_samples(connection)
+        if samples is None:
+            print("No chats in the database, seed it first")
+            return 1
+
+        if args.force_index:
+            await connection.execute(text("SET LOCAL enable_seqscan = off"))
+
+        for query in CANONICAL_QUERIES:
+            stmt = query.build(samples)
+            if stmt is None:
+                print(f"SKIP  {query.name}: no sample data")
+                continue
+
+            explained = await explain(connection, stmt, analyze=not args.no_analyze)
+            plan = explained["Plan"]
+
+            seq_scans = []
+            for table in find_seq_scans(plan):
+                rows = await get_table_rows(connection, table)
+                if rows is None:
+                    # Its size is unknown, so is whether the scan matters. ANALYZE the table to find out
+                    seq_scans.append(f"{table} (never analyzed)")
+                elif args.force_index or rows >= args.min_rows:
+                    seq_scans.append(table)
+
+            timing = f"{explained['Execution Time']:.2f} ms" if "Execution Time" in explained else f"cost {plan['Total Cost']:.0f}"
+            status = "FLAG" if seq_scans else "OK  "
+            details = f", seq scan on {', '.join(sorted(set(seq_scans)))}" if seq_scans else ""
+            print(f"{status}  {query.name}: {timing}{details}")
+            if args.verbose:
+                print(explained)
+
+            flagged += bool(seq_scans)
+
+    await db_session_manager.close()
+    print(f"\n{flagged} of {len(CANONICAL_QUERIES)} queries flagged")
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -4,7 +4,7 @@ import json
 import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Tuple
 from uuid import UUID
 
 root_dir = Path(__file__).parent.parent
@@ -13,6 +13,7 @@ sys.path.append(str(root_dir))
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.storage.base_repo import BaseRepository
 from src.storage.db import db_session_manager
 from src.storage.models import (
     AiProvider,
@@ -393,24 +394,21 @@ async def seed_white_list(db: AsyncSession, env: str) -> None:
     if not data:
         return
 
-    for email in data.get("emails", []):
-        result = await db.execute(select(WhiteList).where(WhiteList.email == email))
-        existing_item = result.scalar_one_or_none()
-
-        if not existing_item:
-            item = WhiteList(email=email)
-            db.add(item)
+    # One INSERT ... ON CONFLICT DO NOTHING instead of a lookup per email
+    emails = data.get("emails", [])
+    await BaseRepository(WhiteList, db).upsert_many([{"email": email} for email in emails], index_elements=[WhiteList.email])
 
     print("White list seeding complete.")
 
 
 async def seed_usage(db: AsyncSession, env: str, update: bool = False) -> None:
-    """Set up usage records idempotently."""
+    """Set up usage records idempotently, one running total per user and model summing their dated entries."""
     print("Seeding usage data...")
     data = load_seed_data(env, "usage.json")
     if not data:
         return
 
+    totals: Dict[Tuple[UUID, UUID], Dict[str, Any]] = {}
     for usage_data in data.get("usage", []):
         email = usage_data.pop("email")
         model_name = usage_data.pop("model_name")
@@ -433,7 +431,6 @@ async def seed_usage(db: AsyncSession, env: str, update: bool = False) -> None:
         # Calculate tokens
         prompt_tokens = usage_data.get("input_tokens", 0)
         completion_tokens = usage_data.get("output_tokens", 0)
-        total_tokens = prompt_tokens + completion_tokens
 
         # Parse date if provided
         usage_date = None
@@ -443,23 +440,28 @@ async def seed_usage(db: AsyncSession, env: str, update: bool = False) -> None:
             except ValueError:
                 print(f"Warning: Invalid date format {date_str}, using current time")
 
-        # Check if usage record already exists for this user, model, and date
-        query = select(Usage).where(
-            Usage.user_id == user.id,
-            Usage.model_id == model.id
+        total = totals.setdefault(
+            (user.id, model.id),
+            {"email": email, "model_name": model_name, "prompt_tokens": 0, "completion_tokens": 0, "dates": []},
         )
-
+        total["prompt_tokens"] += prompt_tokens
+        total["completion_tokens"] += completion_tokens
         if usage_date:
-            query = query.where(Usage.created_at == usage_date)
+            total["dates"].append(usage_date)
+
+    for (user_id, model_id), total in totals.items():
+        email, model_name = total["email"], total["model_name"]
+        total_tokens = total["prompt_tokens"] + total["completion_tokens"]
 
-        result = await db.execute(query)
+        # Usage has a single row per user and model
+        result = await db.execute(select(Usage).where(Usage.user_id == user_id, Usage.model_id == model_id))
         existing_usage = result.scalar_one_or_none()
 
         if existing_usage:
             if update:
                 # Update existing usage record
-                existing_usage.prompt_tokens = prompt_tokens
-                existing_usage.completion_tokens = completion_tokens
+                existing_usage.prompt_tokens = total["prompt_tokens"]
+                existing_usage.completion_tokens = total["completion_tokens"]
                 existing_usage.total_tokens = total_tokens
                 print(f"Updated usage record for user {email} and model '{model_name}'")
             else:
@@ -467,17 +469,17 @@ async def seed_usage(db: AsyncSession, env: str, update: bool = False) -> None:
         else:
             # Create new usage record
             usage = Usage(
-                user_id=user.id,
-                model_id=model.id,
-                prompt_tokens=prompt_tokens,
-                completion_tokens=completion_tokens,
+                user_id=user_id,
+                model_id=model_id,
+                prompt_tokens=total["prompt_tokens"],
+                completion_tokens=total["completion_tokens"],
                 total_tokens=total_tokens,
             )
 
-            # Set creation date if provided
-            if usage_date:
-                usage.created_at = usage_date
-                usage.updated_at = usage_date
+            # Dated from the first to the last entry
+            if total["dates"]:
+                usage.created_at = min(total["dates"])
+                usage.updated_at = max(total["dates"])
 
             db.add(usage)
             print(f"Created usage record for user {email} and model '{model_name}'")
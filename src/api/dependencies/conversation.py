@@ -1,3 +1,4 @@
+from functools import partial
 from typing import Dict, List, Optional
 from uuid import UUID
 
@@ -25,9 +26,11 @@ from src.services.user.user_service import UserService
 from src.services.ai_providers.dto import AiModelsInputDTO
 
 from src.storage.base_repo import BaseRepository
-from src.storage.db import db_session_manager
+from src.storage.db import db_session_manager, route_name
 from src.storage.models import (
     AiProviderModel,
+    Blob,
+    BlobArtifact,
     Budget,
     Chat,
     ChatMessage,
@@ -43,7 +46,19 @@ from src.api.schemas.chat import AiModelsRequestSchema, MultiModelCompletionRequ
 from src.utils import constants
 
 
-async def get_conversation_service(request: Request, db: AsyncSession) -> ConversationService:
+async def generate_chat_title(
+        request: Request, chat_id: UUID, message: ChatMessageDTO, background_tasks: BackgroundTasks
+) -> str:
+    """
+    Generate and save the title of a new chat, in a session of its own so it can run next to the response streams
+    and is committed as soon as it is generated.
+    """
+    async with db_session_manager.session(user_id=get_user_id(request), route=route_name(request)) as db:
+        conversation_service = await get_conversation_service(request, db, with_title_generator=False)
+        return await conversation_service.set_generated_chat_title(chat_id, message, background_tasks)
+
+
+async def get_conversation_service(request: Request, db: AsyncSession, with_title_generator: bool = True) -> ConversationService:
     context = get_context(user_id=get_user_id(request))
 
     # Create repositories
@@ -52,6 +67,8 @@ async def get_conversation_service(request: Request, db: AsyncSession) -> Conver
     chat_message_repo = BaseRepository(ChatMessage, db)
     ai_model_repo = BaseRepository(AiProviderModel, db)
     resource_repo = BaseRepository(Resource, db)
+    blob_repo = BaseRepository(Blob, db)
+    blob_artifact_repo = BaseRepository(BlobArtifact, db)
     budget_repo = BaseRepository(Budget, db)
     limits_repo = BaseRepository(Limits, db)
     usage_repo = BaseRepository(Usage, db)
@@ -65,8 +82,8 @@ async def get_conversation_service(request: Request, db: AsyncSession) -> Conver
     cloud_storage_service = CloudStorageService(context=context)
     background_task_service = BackgroundTaskService(context=context)
     tools_service = ToolsService(context=context)
-    files_service = FilesService(context=context, resource_repo=resource_repo,
-                                 cloud_storage_service=cloud_storage_service)
+    files_service = FilesService(context=context, resource_repo=resource_repo, blob_repo=blob_repo,
+                                 blob_artifact_repo=blob_artifact_repo, cloud_storage_service=cloud_storage_service)
     model_provider = ModelProvider(context=context, tools_service=tools_service,
                                    host_api_key_service=host_api_key_service, files_service=files_service)
     budget_service = BudgetService(context=context, budget_repo=budget_repo)
@@ -99,6 +116,7 @@ async def get_conversation_service(request: Request, db: AsyncSession) -> Conver
         files_service=files_service,
         ai_model_service=ai_model_service,
         limits_service=limits_service,
+        title_generator=partial(generate_chat_title, request) if with_title_generator else None,
     )
 
 
@@ -116,7 +134,7 @@ async def _use_default_models(
 
 
 async def stream_conversation(request: Request, input: MultiModelCompletionRequestSchema, background_tasks: BackgroundTasks):
-    async with db_session_manager.session() as db:
+    async with db_session_manager.session(user_id=get_user_id(request), route=route_name(request)) as db:
         conversation_service = await get_conversation_service(request, db)
         async for chunk in conversation_service.chat_completion_stream(
             message=ChatMessageDTO.model_validate(input.message),
@@ -0,0 +1,127 @@
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from fastapi import Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from src.services.common import errors
+
+from src.config import settings
+
+FILE_FIELD = "file"
+# Boundaries, part headers and small form fields around the file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class StreamedUpload:
+    """
+    The "file" part of a multipart/form-data request, parsed from the request stream as it arrives instead of
+    being spooled by Starlette before the handler runs. The body is capped at MAX_UPLOAD_SIZE_BYTES plus the
+    multipart overhead, up front from Content-Length and on the bytes received.
+    """
+
+    def __init__(self, request: Request, boundary: bytes):
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self._body = request.stream().__aiter__()
+        self._received = 0
+        self._pending: Deque[bytes] = deque()
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._in_file = False
+        self._file_started = False
+        self._file_done = False
+        self._parser = MultipartParser(
+            boundary,
+            callbacks={
+                "on_part_begin": self._on_part_begin,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+            },
+        )
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        # Only the first file part is read, the data of every other part is skipped
+        self._in_file = (
+            not self._file_started and options.get(b"name") == FILE_FIELD.encode() and b"filename" in options
+        )
+        if self._in_file:
+            self._file_started = True
+            self.filename = options[b"filename"].decode("utf-8", errors="replace")
+            self.content_type = self._headers.get(b"content-type", b"application/octet-stream").decode("latin-1")
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self._pending.append(data[start:end])
+
+    def _on_part_end(self) -> None:
+        if self._in_file:
+            self._in_file = False
+            self._file_done = True
+
+    async def _feed(self) -> bool:
+        """Parse the next chunk of the body, False once the body is over."""
+        try:
+            chunk = await self._body.__anext__()
+        except StopAsyncIteration:
+            return False
+
+        self._received += len(chunk)
+        if self._received > settings.MAX_UPLOAD_SIZE_BYTES + MULTIPART_OVERHEAD_BYTES:
+            raise errors.PayloadTooLargeError(
+                f"File exceeds the maximum upload size of {settings.MAX_UPLOAD_SIZE_BYTES} bytes"
+            )
+        if chunk:
+            self._parser.write(chunk)
+        return True
+
+    async def open(self) -> None:
+        """Read up to the file part's headers, for its filename and content type."""
+        while not self._file_started:
+            if not await self._feed():
+                raise errors.InvalidInputError(f"The request has no {FILE_FIELD} part")
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        while True:
+            while self._pending:
+                yield self._pending.popleft()
+            if self._file_done:
+                return
+            if not await self._feed():
+                raise errors.InvalidInputError("The multipart body ended before the file")
+
+
+async def get_streamed_upload(request: Request) -> StreamedUpload:
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or not options.get(b"boundary"):
+        raise errors.InvalidInputError("Expected a multipart/form-data body")
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit():
+        if int(content_length) > settings.MAX_UPLOAD_SIZE_BYTES + MULTIPART_OVERHEAD_BYTES:
+            raise errors.PayloadTooLargeError(
+                f"File exceeds the maximum upload size of {settings.MAX_UPLOAD_SIZE_BYTES} bytes"
+            )
+
+    upload = StreamedUpload(request, options[b"boundary"])
+    await upload.open()
+    return upload
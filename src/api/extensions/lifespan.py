@@ -0,0 +1,20 @@
+from contextlib import asynccontextmanager
+
+from src.services.files.preprocessing import shutdown_preprocessing_pool
+from src.services.files.storage import get_storage_backend
+from src.services.rate_limit import get_rate_limit_store
+from src.services.usage_tracking.usage_aggregator import get_usage_aggregator
+
+from src.storage.db import lifespan as db_lifespan
+
+
+@asynccontextmanager
+async def lifespan(app):
+    async with db_lifespan(app):
+        get_usage_aggregator().start()
+        yield
+        # Flush buffered usage while the database is still available
+        await get_usage_aggregator().close()
+        shutdown_preprocessing_pool()
+        await get_storage_backend().close()
+        await get_rate_limit_store().close()
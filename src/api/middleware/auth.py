@@ -1,80 +1,146 @@
-from typing import Callable, Optional, Tuple
+from typing import Dict, Optional
 from uuid import UUID
 
-from fastapi import Request
 from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-from src.services.auth.token_service import TokenService
+from src.services.auth.token_service import TokenService, is_admin_email
 
-from src.config import settings
+# Route policies
+PUBLIC = "public"  # no authentication
+OPTIONAL = "optional"  # user context is set when a valid token is sent
+REQUIRED = "required"  # a valid token is required
+ADMIN = "admin"  # a valid token of an admin user is required
 
+# Exact paths, checked first
+EXACT_ROUTE_POLICIES: Dict[str, str] = {
+    "/": PUBLIC,
+    "/docs": PUBLIC,
+    "/redoc": PUBLIC,
+    "/openapi.json": PUBLIC,
+    "/health/live": PUBLIC,
+    "/health/logs": PUBLIC,
+    "/api/auth/google": PUBLIC,
+    "/api/ai-providers": PUBLIC,
+    "/api/ai-models": OPTIONAL,
+}
 
-def create_auth_middleware(token_service_instance: TokenService) -> Callable:
-    def extract_and_validate_token(auth_header: Optional[str]) -> Optional[dict]:
-        if not auth_header or not auth_header.startswith("Bearer "):
+# Path prefixes (whole segments), the longest matching prefix wins. Anything unmatched requires authentication.
+PREFIX_ROUTE_POLICIES: Dict[str, str] = {
+    "/static/": PUBLIC,
+    "/api/chats/shared/": PUBLIC,
+    "/api/admin": ADMIN,
+}
+
+# Trie node keys: the policy of the prefix ending at the node, and of the paths strictly below it
+_POLICY = object()
+_CHILDREN_POLICY = object()
+
+
+def _split_path(path: str):
+    return path.strip("/").split("/")
+
+
+def _compile_prefix_trie(policies: Dict[str, str]) -> dict:
+    """
+    Compile the prefix policies into a trie of path segments, so a lookup costs one dict access per segment
+    instead of a startswith over every prefix. A trailing slash means only the paths below the prefix match.
+    """
+    root: dict = {}
+    for prefix, policy in policies.items():
+        node = root
+        for segment in _split_path(prefix):
+            node = node.setdefault(segment, {})
+        node[_CHILDREN_POLICY if prefix.endswith("/") else _POLICY] = policy
+    return root
+
+
+def _lookup_prefix(trie: dict, path: str) -> Optional[str]:
+    policy = None
+    node = trie
+    segments = _split_path(path)
+    for index, segment in enumerate(segments):
+        node = node.get(segment)
+        if node is None:
+            break
+        policy = node.get(_POLICY, policy)
+        if index + 1 < len(segments):
+            policy = node.get(_CHILDREN_POLICY, policy)
+    return policy
+
+
+def _get_bearer_token(scope: Scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            auth_header = value.decode("latin-1")
+            if auth_header.startswith("Bearer "):
+                return auth_header[len("Bearer "):]
             return None
+    return None
+
 
-        token = auth_header.replace("Bearer ", "")
-        return token_service_instance.validate_token(token)
+def _unauthorized(detail: str) -> JSONResponse:
+    return JSONResponse(status_code=401, content={"detail": detail})
 
-    def set_user_context(request: Request, payload: dict) -> None:
-        request.state.user_id = UUID(payload.get("sub"))
-        request.state.user_email = payload.get("email")
 
-    async def auth_middleware(request: Request, call_next):
-        if request.method == "OPTIONS":
-            return await call_next(request)
+class AuthMiddleware:
+    """
+    Pure ASGI authentication middleware. Sets user_id and user_email on the request state according to
+    the route policy, and answers 401 itself when the policy is not satisfied.
+    """
+
+    def __init__(self, app: ASGIApp, token_service: TokenService):
+        self.app = app
+        self.token_service = token_service
+        self.prefix_trie = _compile_prefix_trie(PREFIX_ROUTE_POLICIES)
+
+    def get_route_policy(self, path: str) -> str:
+        policy = EXACT_ROUTE_POLICIES.get(path)
+        if policy is None:
+            policy = _lookup_prefix(self.prefix_trie, path) or REQUIRED
+        return policy
+
+    def set_user_context(self, scope: Scope, payload: dict) -> None:
+        state = scope.setdefault("state", {})
+        state["user_id"] = UUID(payload.get("sub"))
+        state["user_email"] = payload.get("email")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        policy = self.get_route_policy(scope["path"])
 
         # Skip authentication for public endpoints
-        if (
-            request.url.path
-            in [
-                "/",
-                "/docs",
-                "/redoc",
-                "/openapi.json",
-                "/health/live",
-                "/health/logs",
-                "/api/auth/google",
-                "/api/ai-providers",
-            ]
-            or request.url.path.startswith("/static/")
-            or request.url.path.startswith("/api/chats/shared/")
-        ):
-            return await call_next(request)
-
-        # Handle optional authentication for /api/ai-models
-        if request.url.path == "/api/ai-models":
-            auth_header = request.headers.get("Authorization")
-            payload = extract_and_validate_token(auth_header)
+        if policy == PUBLIC:
+            await self.app(scope, receive, send)
+            return
+
+        token = _get_bearer_token(scope)
+
+        # Handle optional authentication
+        if policy == OPTIONAL:
+            payload = self.token_service.validate_token(token) if token else None
             if payload:
-                set_user_context(request, payload)
-            return await call_next(request)
+                self.set_user_context(scope, payload)
+            await self.app(scope, receive, send)
+            return
 
         # Handle required authentication for all other protected endpoints
-        auth_header = request.headers.get("Authorization")
-        if not auth_header or not auth_header.startswith("Bearer "):
-            return JSONResponse(
-                status_code=401,
-                content={"detail": "Unauthorized: Missing or invalid authentication token"},
-            )
-
-        payload = extract_and_validate_token(auth_header)
+        if not token:
+            await _unauthorized("Unauthorized: Missing or invalid authentication token")(scope, receive, send)
+            return
+
+        payload = self.token_service.validate_token(token)
         if not payload:
-            return JSONResponse(
-                status_code=401,
-                content={"detail": "Unauthorized: Invalid or expired token"},
-            )
+            await _unauthorized("Unauthorized: Invalid or expired token")(scope, receive, send)
+            return
 
         # Check admin access for admin endpoints
-        if request.url.path.startswith("/api/admin"):
-            if payload.get("email") not in settings.ADMIN_EMAILS:
-                return JSONResponse(
-                    status_code=401,
-                    content={"detail": "Unauthorized: User is not an admin"},
-                )
-
-        set_user_context(request, payload)
-        return await call_next(request)
+        if policy == ADMIN and not is_admin_email(payload.get("email")):
+            await _unauthorized("Unauthorized: User is not an admin")(scope, receive, send)
+            return
 
-    return auth_middleware
+        self.set_user_context(scope, payload)
+        await self.app(scope, receive, send)
@@ -1,8 +1,8 @@
 import traceback
-from typing import Callable
 
-from fastapi import Request, status
+from fastapi import status
 from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from src.services.common import errors
 
@@ -11,21 +11,51 @@ from src.logging.logging_config import get_logger
 logger = get_logger(__name__)
 
 
-async def error_handling_middleware(request: Request, call_next: Callable):
-    try:
-        return await call_next(request)
-    except errors.NotFoundError as e:
+def get_error_response(e: Exception) -> JSONResponse:
+    if isinstance(e, errors.NotFoundError):
         return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"detail": str(e)})
-    except errors.ForbiddenError as e:
+    elif isinstance(e, errors.ForbiddenError):
         return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": str(e)})
-    except (errors.BudgetExceededError, errors.LimitsExceededError) as e:
+    elif isinstance(e, (errors.BudgetExceededError, errors.LimitsExceededError)):
         return JSONResponse(status_code=status.HTTP_402_PAYMENT_REQUIRED, content={"detail": str(e)})
-    except (errors.BadRequestError, errors.InvalidInputError) as e:
+    elif isinstance(e, (errors.BadRequestError, errors.InvalidInputError)):
         return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": str(e)})
-    except Exception as e:
-        logger.error(f"Internal server error: {str(e)}")
-        logger.error(traceback.format_exc())
-        return JSONResponse(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            content={"detail": "Internal server error"},
-        )
+    elif isinstance(e, errors.PayloadTooLargeError):
+        return JSONResponse(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, content={"detail": str(e)})
+
+    logger.error(f"Internal server error: {str(e)}")
+    logger.error(traceback.format_exc())
+    return JSONResponse(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        content={"detail": "Internal server error"},
+    )
+
+
+class ErrorHandlingMiddleware:
+    """
+    Pure ASGI middleware mapping service errors to JSON responses.
+    Messages are passed through untouched, so streaming responses are not buffered or re-wrapped.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            if response_started:
+                raise  # the status line is already sent, there is no error response left to give
+            await get_error_response(e)(scope, receive, send)
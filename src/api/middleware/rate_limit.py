@@ -1,53 +1,104 @@
-import time
-from collections import defaultdict
+import math
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Tuple
 
-from fastapi import HTTPException, Request
 from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from src.services.rate_limit import get_rate_limit_store
 
-# Simple in-memory rate limiting
-class SimpleRateLimiter:
-    def __init__(self):
-        self.requests = defaultdict(list)
+from src.config import settings
 
-    def is_allowed(self, ip: str, limit: int = 100, window: int = 60):
-        """Check if request is allowed (limit requests per window seconds)"""
-        now = time.time()
-        # Clean old requests
-        self.requests[ip] = [req_time for req_time in self.requests[ip] if now - req_time < window]
+# Health checks and docs are never limited
+EXEMPT_PATHS = {"/health/live", "/health/logs", "/docs", "/redoc", "/openapi.json"}
 
-        # Check if under limit
-        if len(self.requests[ip]) >= limit:
-            return False
+# (path prefix, route group, key). Checked in order, anything unmatched falls into the "default" group.
+# Requests are keyed by user id when the key is "user" and the request is authenticated, by client IP otherwise.
+ROUTE_GROUPS: List[Tuple[str, str, str]] = [
+    ("/api/auth", "auth", "ip"),
+    ("/api/chats/conversation", "conversation", "user"),
+    ("/api/admin/messages", "conversation", "user"),
+    ("/api/files/upload", "upload", "user"),
+]
+DEFAULT_ROUTE_GROUP = ("", "default", "user")
 
-        # Add current request
-        self.requests[ip].append(now)
-        return True
 
+class RateLimitPolicy(NamedTuple):
+    group: str
+    key: str
+    limit: int
+    window: float
 
-# Create rate limiter instance
-rate_limiter = SimpleRateLimiter()
 
+def _parse_limit(value: str) -> Tuple[int, float]:
+    """Parse "<requests>/<window seconds>", e.g. "100/60"."""
+    limit, _, window = value.partition("/")
+    return int(limit), float(window or 60)
 
-# Global rate limiting middleware
-async def rate_limit_middleware(request: Request, call_next):
-    # Skip rate limiting for health checks and public endpoints
-    if request.url.path in ["/health/live", "/health/logs", "/docs", "/redoc", "/openapi.json"]:
-        return await call_next(request)
 
-    # Get client IP
-    client_ip = request.client.host if request.client else "unknown"
+@lru_cache()
+def _get_limits() -> Dict[str, Tuple[int, float]]:
+    limits = {group: _parse_limit(value) for group, value in settings.RATE_LIMITS.items()}
+    limits.setdefault("default", (100, 60.0))
+    return limits
 
-    # Check rate limit (100 requests per minute)
-    if not rate_limiter.is_allowed(client_ip, limit=100, window=60):
-        return JSONResponse(
-            status_code=429,
-            content={
-                "detail": "Rate limit exceeded. Maximum 100 requests per minute allowed.",
-                "retry_after": 60
-            },
-            headers={"Retry-After": "60"}
-        )
 
-    response = await call_next(request)
-    return response
+@lru_cache(maxsize=1024)
+def get_policy(path: str) -> RateLimitPolicy:
+    _, group, key = next((route for route in ROUTE_GROUPS if path.startswith(route[0])), DEFAULT_ROUTE_GROUP)
+    limits = _get_limits()
+    limit, window = limits.get(group, limits["default"])
+    return RateLimitPolicy(group=group, key=key, limit=limit, window=window)
+
+
+def _get_rate_limit_key(scope: Scope, policy: RateLimitPolicy) -> str:
+    user_id = scope.get("state", {}).get("user_id")
+    if policy.key == "user" and user_id:
+        return f"{policy.group}:user:{user_id}"
+
+    client = scope.get("client")
+    client_ip = client[0] if client else "unknown"
+    return f"{policy.group}:ip:{client_ip}"
+
+
+class RateLimitMiddleware:
+    """
+    Pure ASGI rate limiting middleware, must run inside the auth middleware so the user id is known.
+    Allowed responses get X-RateLimit-* headers added to their start message, the body is passed through as is.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        policy = get_policy(scope["path"])
+        result = await get_rate_limit_store().hit(_get_rate_limit_key(scope, policy), policy.limit, policy.window)
+
+        if not result.allowed:
+            retry_after = max(1, math.ceil(result.retry_after))
+            response = JSONResponse(
+                status_code=429,
+                content={
+                    "detail": f"Rate limit exceeded. Maximum {policy.limit} requests per {policy.window:g} seconds allowed.",
+                    "retry_after": retry_after
+                },
+                headers={"Retry-After": str(retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        rate_limit_headers = [
+            (b"x-ratelimit-limit", str(policy.limit).encode("latin-1")),
+            (b"x-ratelimit-remaining", str(result.remaining).encode("latin-1")),
+        ]
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), *rate_limit_headers]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -2,7 +2,9 @@ from datetime import datetime
 from typing import Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Depends, Query
+
+from src.storage.db import replica_reads
 
 from src.api.schemas.admin import AggregationType, BudgetResponseSchema, UsageAggregationResponseSchema
 from src.containers.container import BudgetServiceDep, UsageTrackingServiceDep
@@ -17,7 +19,7 @@ async def get_budget(
     return await budget_service.get_budget()
 
 
-@router.get("/usage", response_model=UsageAggregationResponseSchema)
+@router.get("/usage", response_model=UsageAggregationResponseSchema, dependencies=[Depends(replica_reads)])
 async def get_usage(
     usage_tracking_service: UsageTrackingServiceDep,
     aggregation: AggregationType = Query(AggregationType.day, description="How to aggregate the usage data"),
@@ -1,9 +1,10 @@
 from typing import Dict, List, Optional
 
-from fastapi import APIRouter, Query, Request
+from fastapi import APIRouter, Depends, Query, Request
 
 from src.services.common.filters import FiltersParser, SQLAlchemyFilterBuilder
 
+from src.storage.db import replica_reads
 from src.storage.models.ai_provider_model import AiProviderModel
 
 from src.api.schemas.ai_models import AiModelResponseSchema
@@ -12,7 +13,7 @@ from src.containers.container import AiModelServiceDep, LimitsServiceDep
 router = APIRouter(prefix="/api/ai-models", tags=["AI Models"])
 
 
-@router.get("", response_model=List[AiModelResponseSchema])
+@router.get("", response_model=List[AiModelResponseSchema], dependencies=[Depends(replica_reads)])
 async def get_ai_models(
         request: Request,
     ai_model_service: AiModelServiceDep,
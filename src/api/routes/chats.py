@@ -1,9 +1,14 @@
-from typing import List
+import gzip
+from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response
 from fastapi.responses import StreamingResponse
 
+from src.services.chats.dto import SharedChatSnapshotDTO
+
+from src.storage.db import replica_reads
+
 from src.api.dependencies.budget import check_budget
 from src.api.dependencies.conversation import stream_conversation
 from src.api.schemas.chat import (
@@ -19,19 +24,57 @@ from src.api.schemas.chat import (
     UnshareChatsRequestSchema,
     UpdateChatTitleRequestSchema,
 )
+from src.config import settings
 from src.containers.container import ChatServiceDep
 
 router = APIRouter(prefix="/api/chats", tags=["Chats"])
 
+MAX_PAGE_SIZE = 200
+# The chat list body is a plain list, so its cursor travels in a header
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _snapshot_response(request: Request, snapshot: SharedChatSnapshotDTO) -> Response:
+    """
+    Serve a shared chat snapshot as is, gzipped when the client accepts it. Its ETag differs per encoding,
+    so browsers and CDNs can revalidate either with If-None-Match and get a bodyless 304.
+    """
+    gzipped = "gzip" in request.headers.get("accept-encoding", "")
+    etag = f'"{snapshot.etag}-gzip"' if gzipped else f'"{snapshot.etag}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.SHARED_CHAT_MAX_AGE}",
+        "Vary": "Accept-Encoding",
+    }
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if any(tag.strip().removeprefix("W/") in (etag, "*") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+
+    if gzipped:
+        return Response(snapshot.body, media_type="application/json", headers={**headers, "Content-Encoding": "gzip"})
+    return Response(gzip.decompress(snapshot.body), media_type="application/json", headers=headers)
+
 
 @router.post("", response_model=ChatResponseSchema)
 async def create_chat(chat_service: ChatServiceDep):
     return await chat_service.create_chat()
 
 
-@router.get("", response_model=List[ChatListItemResponseSchema])
-async def get_chats(chat_service: ChatServiceDep):
-    return await chat_service.get_user_chats()
+@router.get("", response_model=List[ChatListItemResponseSchema], dependencies=[Depends(replica_reads)])
+async def get_chats(
+    response: Response,
+    chat_service: ChatServiceDep,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size, all chats when omitted"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+):
+    if limit is None:
+        return await chat_service.get_user_chats()
+
+    page = await chat_service.get_user_chats_page(limit=limit, cursor=cursor)
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return page.items
 
 
 @router.delete("")
@@ -48,18 +91,18 @@ async def send_message(message: MultiModelCompletionRequestSchema, background_ta
     )
 
 
-@router.get("/shared", response_model=List[SharedConversationListItemResponseSchema])
+@router.get("/shared", response_model=List[SharedConversationListItemResponseSchema], dependencies=[Depends(replica_reads)])
 async def get_shared_chats(chat_service: ChatServiceDep):
     shared_chats = await chat_service.get_shared_chats()
     return shared_chats
 
 
-@router.get("/shared/{shared_conversation_id}", response_model=ChatResponseSchema)
-async def get_shared_chat(shared_conversation_id: UUID, chat_service: ChatServiceDep):
-    chat = await chat_service.get_shared_chat(shared_conversation_id=shared_conversation_id)
-    if not chat:
+@router.get("/shared/{shared_conversation_id}", response_model=ChatResponseSchema, dependencies=[Depends(replica_reads)])
+async def get_shared_chat(shared_conversation_id: UUID, request: Request, chat_service: ChatServiceDep):
+    snapshot = await chat_service.get_shared_chat_snapshot(shared_conversation_id=shared_conversation_id)
+    if not snapshot:
         raise HTTPException(status_code=404, detail="Chat not found")
-    return chat
+    return _snapshot_response(request, snapshot)
 
 
 @router.delete("/share")
@@ -68,7 +111,7 @@ async def unshare_chats(unshare_chats_request: UnshareChatsRequestSchema, chat_s
     return {"status": "success"}
 
 
-@router.get("/{chat_id}", response_model=ChatResponseSchema)
+@router.get("/{chat_id}", response_model=ChatResponseSchema, dependencies=[Depends(replica_reads)])
 async def get_chat(chat_id: UUID, chat_service: ChatServiceDep):
     chat = await chat_service.get_chat(chat_id=chat_id)
     if not chat:
@@ -76,10 +119,19 @@ async def get_chat(chat_id: UUID, chat_service: ChatServiceDep):
     return chat
 
 
-@router.get("/{chat_id}/messages", response_model=ChatMessagesResponseSchema)
-async def get_messages(chat_id: UUID, chat_service: ChatServiceDep):
-    messages = await chat_service.get_messages(chat_id=chat_id)
-    return ChatMessagesResponseSchema(messages=messages)
+@router.get("/{chat_id}/messages", response_model=ChatMessagesResponseSchema, dependencies=[Depends(replica_reads)])
+async def get_messages(
+    chat_id: UUID,
+    chat_service: ChatServiceDep,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size, the whole history when omitted"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+):
+    if limit is None:
+        messages = await chat_service.get_messages(chat_id=chat_id)
+        return ChatMessagesResponseSchema(messages=messages)
+
+    page = await chat_service.get_messages_page(chat_id=chat_id, limit=limit, cursor=cursor)
+    return ChatMessagesResponseSchema(messages=page.items, next_cursor=page.next_cursor)
 
 
 @router.patch("/{chat_id}/title")
@@ -1,7 +1,11 @@
-from fastapi import APIRouter, File, Response, UploadFile
+from typing import Optional, Tuple
 
+from fastapi import APIRouter, BackgroundTasks, Depends, Request, Response
+from fastapi.responses import StreamingResponse
+
+from src.api.dependencies.upload import FILE_FIELD, StreamedUpload, get_streamed_upload
 from src.api.schemas.files import FileResponseSchema
-from src.containers.container import FilesServiceDep
+from src.containers.container import BackgroundTaskServiceDep, FilesServiceDep
 from src.logging.logging_config import get_logger
 
 logger = get_logger(__name__)
@@ -9,24 +13,121 @@ logger = get_logger(__name__)
 router = APIRouter(prefix="/api/files", tags=["Files"])
 
 
-@router.post("/upload", response_model=FileResponseSchema)
+class RangeNotSatisfiableError(Exception):
+    pass
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates
+
+
+def _parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single "bytes=" range into an inclusive (start, end) tuple.
+    Returns None when the whole file should be served (no header, or a multi-range request which we do not support).
+    """
+    if not range_header or not range_header.startswith("bytes="):
+        return None
+
+    ranges = range_header[len("bytes="):].split(",")
+    if len(ranges) != 1:
+        return None
+
+    start_str, _, end_str = ranges[0].strip().partition("-")
+    try:
+        if not start_str:  # suffix range: the last N bytes
+            length = int(end_str)
+            if length <= 0:
+                raise RangeNotSatisfiableError()
+            return max(size - length, 0), size - 1
+
+        start = int(start_str)
+        end = int(end_str) if end_str else size - 1
+    except ValueError:
+        return None
+
+    if start >= size or start > end:
+        raise RangeNotSatisfiableError()
+
+    return start, min(end, size - 1)
+
+
+# The body is parsed by get_streamed_upload, so it is documented here instead of inferred from a File parameter
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {FILE_FIELD: {"type": "string", "format": "binary"}},
+                    "required": [FILE_FIELD],
+                }
+            }
+        },
+    }
+}
+
+
+@router.post("/upload", response_model=FileResponseSchema, openapi_extra=UPLOAD_REQUEST_BODY)
 async def upload_file(
     files_service: FilesServiceDep,
-    file: UploadFile = File(...),
+    background_task_service: BackgroundTaskServiceDep,
+    background_tasks: BackgroundTasks,
+    upload: StreamedUpload = Depends(get_streamed_upload),
 ) -> FileResponseSchema:
-    contents = await file.read()
-    resp = await files_service.upload_file(contents, file.content_type, file.filename)
+    resp = await files_service.upload_file_stream(upload.chunks(), upload.content_type, upload.filename)
+    background_tasks.add_task(
+        background_task_service.preprocess_attachment,
+        user_id=files_service.context.user_id,
+        file_id=resp.file_id,
+    )
     return resp
 
 
 @router.get("/{file_id}")
 async def get_file(
     file_id: str,
+    request: Request,
     files_service: FilesServiceDep,
 ) -> Response:
-    file_data = await files_service.get_file(file_id)
-    response = Response(content=file_data.data, media_type=file_data.content_type)
-    response.headers[
-        "Content-Disposition"
-    ] = f"attachment; filename={file_data.filename}"
-    return response
+    file_info = await files_service.get_file_info(file_id)
+
+    headers = {
+        "ETag": file_info.etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, max-age=31536000, immutable",
+        "Content-Disposition": f"attachment; filename={file_info.filename}",
+    }
+
+    if _etag_matches(request.headers.get("if-none-match"), file_info.etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        byte_range = _parse_range(request.headers.get("range"), file_info.size)
+    except RangeNotSatisfiableError:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{file_info.size}"})
+
+    if byte_range is None:
+        headers["Content-Length"] = str(file_info.size)
+        return StreamingResponse(
+            files_service.stream_file(file_info),
+            media_type=file_info.content_type,
+            headers=headers,
+        )
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{file_info.size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        files_service.stream_file(file_info, start=start, end=end),
+        status_code=206,
+        media_type=file_info.content_type,
+        headers=headers,
+    )
@@ -30,7 +30,7 @@ class BaseAggregatedUsage(BaseModel):
     prompt_tokens: int
     completion_tokens: int
     total_tokens: int
-
+    cost_usd: float = 0.0
 
 
 class UnifiedAggregatedUsage(BaseAggregatedUsage):
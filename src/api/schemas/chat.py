@@ -32,6 +32,7 @@ class ChatMessageResponseSchema(BaseModel):
 
 class ChatMessagesResponseSchema(BaseModel):
     messages: List[ChatMessageResponseSchema] = Field(..., description="The messages of the chat")
+    next_cursor: Optional[str] = Field(None, description="Cursor of the page of older messages, null on the last page")
 
     class Config:
         from_attributes = True
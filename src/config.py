@@ -21,6 +21,7 @@ class Settings(BaseSettings):
     JWT_SECRET_KEY: str = Field(..., env="JWT_SECRET_KEY")
     API_KEY_ENCRYPTION_KEY: str = Field(..., env="API_KEY_ENCRYPTION_KEY")
     JWT_EXPIRATION_MINUTES: int = Field(60 * 24 * 60, env="JWT_EXPIRATION_MINUTES")
+    JWT_CACHE_SIZE: int = Field(10_000, env="JWT_CACHE_SIZE")  # verified tokens kept per process, 0 disables
 
     TITLE_GENERATION_MODEL: str = Field("openai/gpt-4.1-nano", env="TITLE_GENERATION_MODEL")
 
@@ -28,14 +29,72 @@ class Settings(BaseSettings):
     DB_POOL_SIZE: int = Field(30, env="DB_POOL_SIZE")
     DB_MAX_OVERFLOW: int = Field(100, env="DB_MAX_OVERFLOW")
     DB_POOL_RECYCLE: int = Field(3600, env="DB_POOL_RECYCLE")
+    # Compiled statements cached by SQLAlchemy per engine, and prepared statements cached by asyncpg per connection.
+    # Set DB_PREPARED_STATEMENT_CACHE_SIZE to 0 behind pgbouncer in transaction pooling mode.
+    DB_QUERY_CACHE_SIZE: int = Field(1200, env="DB_QUERY_CACHE_SIZE")
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = Field(500, env="DB_PREPARED_STATEMENT_CACHE_SIZE")
+    # Read replicas for the reads marked replica-safe, out of rotation while lagging more than DB_REPLICA_MAX_LAG seconds.
+    # A user who wrote reads from the primary for the next DB_REPLICA_STICKY_SECONDS.
+    DB_REPLICA_URLS: List[str] = Field(default_factory=list, env="DB_REPLICA_URLS")
+    DB_REPLICA_MAX_LAG: float = Field(5.0, env="DB_REPLICA_MAX_LAG")
+    DB_REPLICA_CHECK_INTERVAL: float = Field(2.0, env="DB_REPLICA_CHECK_INTERVAL")
+    DB_REPLICA_STICKY_SECONDS: float = Field(10.0, env="DB_REPLICA_STICKY_SECONDS")
+    # A connection checked out for longer is logged with the stack of the task holding it, 0 disables
+    DB_SESSION_WARN_SECONDS: float = Field(60.0, env="DB_SESSION_WARN_SECONDS")
 
     # OpenTelemetry settings
+    OTEL_ENABLED: bool = Field(False, env="OTEL_ENABLED")
     OTEL_SERVICE_NAME: str = Field("t4-chat-api", env="OTEL_SERVICE_NAME")
     OTEL_EXPORTER_OTLP_ENDPOINT: str = Field("jaeger:4317", env="OTEL_EXPORTER_OTLP_ENDPOINT")
 
+    # Object storage settings, STORAGE_BACKEND is either "gcs" or "local"
+    STORAGE_BACKEND: str = Field("gcs", env="STORAGE_BACKEND")
+    LOCAL_STORAGE_PATH: str = Field(".storage", env="LOCAL_STORAGE_PATH")
+    FILE_CHUNK_SIZE: int = Field(256 * 1024, env="FILE_CHUNK_SIZE")
+    MAX_UPLOAD_SIZE_BYTES: int = Field(50 * 1024 * 1024, env="MAX_UPLOAD_SIZE_BYTES")
     GCP_BUCKET_NAME: str = Field("t4-chat-bucket", env="GCP_BUCKET_NAME")
+
+    # Local attachment cache, set ATTACHMENT_CACHE_MAX_BYTES to 0 to disable it
+    ATTACHMENT_CACHE_PATH: str = Field(".cache/attachments", env="ATTACHMENT_CACHE_PATH")
+    ATTACHMENT_CACHE_MAX_BYTES: int = Field(512 * 1024 * 1024, env="ATTACHMENT_CACHE_MAX_BYTES")
+    ATTACHMENT_CACHE_PREPARED_PARTS: bool = Field(True, env="ATTACHMENT_CACHE_PREPARED_PARTS")
+
+    # Attachment preprocessing (image downscaling, PDF text extraction)
+    PREPROCESSING_WORKERS: int = Field(2, env="PREPROCESSING_WORKERS")
+    IMAGE_ARTIFACT_QUALITY: int = Field(85, env="IMAGE_ARTIFACT_QUALITY")
     GCP_PROJECT_ID: str = Field("dev-t4-chat", env="GCP_PROJECT_ID")
 
+    # Shared chats are served from a gzipped snapshot, cached in process for SHARED_CHAT_CACHE_TTL seconds and
+    # by browsers and CDNs for SHARED_CHAT_MAX_AGE seconds (then revalidated with the ETag)
+    SHARED_CHAT_CACHE_TTL: float = Field(5.0, env="SHARED_CHAT_CACHE_TTL")
+    SHARED_CHAT_CACHE_MAX_ENTRIES: int = Field(1000, env="SHARED_CHAT_CACHE_MAX_ENTRIES")
+    SHARED_CHAT_MAX_AGE: int = Field(60, env="SHARED_CHAT_MAX_AGE")
+
+    # Token usage is buffered in process and written in batches every USAGE_FLUSH_INTERVAL seconds,
+    # usage that failed USAGE_FLUSH_MAX_ATTEMPTS flushes in a row is dropped with an error log
+    USAGE_FLUSH_INTERVAL: float = Field(5.0, env="USAGE_FLUSH_INTERVAL")
+    USAGE_FLUSH_MAX_ATTEMPTS: int = Field(12, env="USAGE_FLUSH_MAX_ATTEMPTS")
+
+    # Budget accounting: the pre-request check reads a snapshot refreshed every BUDGET_SNAPSHOT_TTL seconds,
+    # BUDGET_USAGE_SHARDS > 0 spreads usage updates over that many counter rows
+    BUDGET_SNAPSHOT_TTL: float = Field(5.0, env="BUDGET_SNAPSHOT_TTL")
+    BUDGET_USAGE_SHARDS: int = Field(0, env="BUDGET_USAGE_SHARDS")
+
+    # Per-user utilization snapshots (/api/utilization and the pre-flight limit check) are cached for
+    # UTILIZATION_CACHE_TTL seconds, 0 disables the cache
+    UTILIZATION_CACHE_TTL: float = Field(5.0, env="UTILIZATION_CACHE_TTL")
+    UTILIZATION_CACHE_MAX_USERS: int = Field(10_000, env="UTILIZATION_CACHE_MAX_USERS")
+
+    # Rate limiting, RATE_LIMIT_BACKEND is either "memory" (per replica) or "postgres" (shared by all replicas).
+    # RATE_LIMITS maps a route group to "<requests>/<window seconds>"
+    RATE_LIMIT_BACKEND: str = Field("memory", env="RATE_LIMIT_BACKEND")
+    RATE_LIMITS: Dict[str, str] = Field(
+        {"default": "100/60", "auth": "10/60", "conversation": "20/60", "upload": "30/60"},
+        env="RATE_LIMITS",
+    )
+    RATE_LIMIT_MAX_KEYS: int = Field(100_000, env="RATE_LIMIT_MAX_KEYS")
+    RATE_LIMIT_CLEANUP_INTERVAL: int = Field(60, env="RATE_LIMIT_CLEANUP_INTERVAL")
+
     MODEL_HOSTS: Dict[str, ModelHostSettings] = Field(default_factory=dict)
 
     MOCK_AI_RESPONSE: bool = Field(False, env="MOCK_AI_RESPONSE")
@@ -29,6 +29,8 @@ from src.storage.db import get_db_session
 from src.storage.models import (
     AiProvider,
     AiProviderModel,
+    Blob,
+    BlobArtifact,
     Budget,
     Chat,
     ChatMessage,
@@ -62,6 +64,8 @@ get_ai_model_repo = create_repo_factory(AiProviderModel)
 get_user_repo = create_repo_factory(User)
 get_ai_provider_repo = create_repo_factory(AiProvider)
 get_resource_repo = create_repo_factory(Resource)
+get_blob_repo = create_repo_factory(Blob)
+get_blob_artifact_repo = create_repo_factory(BlobArtifact)
 get_budget_repo = create_repo_factory(Budget)
 get_limits_repo = create_repo_factory(Limits)
 get_usage_model_repo = create_repo_factory(Usage)
@@ -103,12 +107,16 @@ CloudStorageServiceDep = Annotated[CloudStorageService, Depends(get_cloud_storag
 
 def get_files_service(
         resource_repo: BaseRepository[Resource] = Depends(get_resource_repo),
+        blob_repo: BaseRepository[Blob] = Depends(get_blob_repo),
+        blob_artifact_repo: BaseRepository[BlobArtifact] = Depends(get_blob_artifact_repo),
         context: Context = Depends(get_context),
         cloud_storage_service: CloudStorageService = Depends(get_cloud_storage_service),
 ) -> FilesService:
     return FilesService(
         context=context,
         resource_repo=resource_repo,
+        blob_repo=blob_repo,
+        blob_artifact_repo=blob_artifact_repo,
         cloud_storage_service=cloud_storage_service,
     )
 
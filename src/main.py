@@ -1,14 +1,14 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from src.storage.db import lifespan
-
 from src.api.extensions.app_extensions import configure_openapi
-from src.api.middleware.auth import create_auth_middleware
-from src.api.middleware.errors import error_handling_middleware
-from src.api.middleware.rate_limit import rate_limit_middleware
+from src.api.extensions.lifespan import lifespan
+from src.api.middleware.auth import AuthMiddleware
+from src.api.middleware.errors import ErrorHandlingMiddleware
+from src.api.middleware.rate_limit import RateLimitMiddleware
 from src.api.routes import ai_models, ai_providers, auth, chats, files, health_checks, host_api_keys, users, utilization
 from src.api.routes.admin import admin_ai_models, admin_ai_models_hosts, admin_messages, admin_tools, admin_usage
+from src.api.telemetry.otel import configure_telemetry
 from src.config import get_settings
 from src.containers.container import get_token_service
 from src.logging.logging_config import configure_logging, get_logger
@@ -43,19 +43,23 @@ def create_app():
     app.include_router(admin_tools.router)
 
     configure_openapi(app)
+    if settings.OTEL_ENABLED:
+        configure_telemetry(app)
 
-    # Add global rate limiting middleware
-    app.middleware("http")(rate_limit_middleware)
+    # Middlewares are pure ASGI so streaming responses pass through them without extra tasks or buffering.
+    # The last one added runs first: auth -> CORS -> errors -> rate limit.
+    app.add_middleware(RateLimitMiddleware)
 
-    app.middleware("http")(error_handling_middleware)
+    app.add_middleware(ErrorHandlingMiddleware)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
     )
-    app.middleware("http")(create_auth_middleware(get_token_service()))
+    app.add_middleware(AuthMiddleware, token_service=get_token_service())
 
     return app
 
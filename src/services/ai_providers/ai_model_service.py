@@ -1,7 +1,8 @@
 from typing import List, Optional
 from uuid import UUID
 
-from sqlalchemy import and_
+from sqlalchemy import and_, bindparam, select
+from sqlalchemy.orm import selectinload
 from sqlalchemy.sql import ColumnElement
 
 from src.services.common.context import Context
@@ -18,6 +19,17 @@ from src.storage.models.limits import Limits
 from src.storage.models.model_host_association import ModelHostAssociation
 from src.storage.models.usage import Usage
 
+# Looked up for every model of every completion, built once, see BaseRepository.fetch_one
+MODEL_BY_ID = (
+    select(AiProviderModel)
+    .where(AiProviderModel.id == bindparam("id"))
+    .options(
+        selectinload(AiProviderModel.provider),
+        selectinload(AiProviderModel.host_associations),
+        selectinload(AiProviderModel.hosts),
+    )
+)
+
 
 class AiModelService:
     def __init__(
@@ -67,7 +79,7 @@ class AiModelService:
 
     @convert_to_dto
     async def get_by_id(self, id: UUID) -> Optional[AiProviderModelDTO]:
-        model = await self.ai_model_repo.get(filter=AiProviderModel.id == id, includes=[AiProviderModel.provider, AiProviderModel.host_associations, AiProviderModel.hosts])
+        model = await self.ai_model_repo.fetch_one(MODEL_BY_ID, id=id)
         if not model:
             return None
 
@@ -0,0 +1,59 @@
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, NamedTuple, Optional
+
+from src.config import settings
+
+
+class CachedToken(NamedTuple):
+    token: str
+    payload: Dict[str, Any]
+    expires_at: float
+
+
+class TokenCache:
+    """
+    Per-process LRU of verified JWT payloads keyed by the token signature, so a token is only decoded and
+    verified once. The full token is compared on a hit, a signature pasted onto another payload never matches.
+    Entries are dropped when the token expires.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, CachedToken]" = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return token.rpartition(".")[2]
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None or entry.token != token:
+            return None
+
+        if entry.expires_at <= time.time():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return entry.payload
+
+    def put(self, token: str, payload: Dict[str, Any]) -> None:
+        expires_at = payload.get("exp")
+        if expires_at is None:
+            return  # tokens without an expiry are verified every time
+
+        self._entries[self._key(token)] = CachedToken(token=token, payload=payload, expires_at=float(expires_at))
+        self._entries.move_to_end(self._key(token))
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+@lru_cache()
+def get_token_cache() -> Optional[TokenCache]:
+    """Process-wide token cache, None when JWT_CACHE_SIZE is 0."""
+    if settings.JWT_CACHE_SIZE <= 0:
+        return None
+    return TokenCache(settings.JWT_CACHE_SIZE)
@@ -4,20 +4,29 @@ from typing import Any, Dict, Optional
 
 import jwt
 
+from src.services.auth.token_cache import TokenCache, get_token_cache
+
 from src.storage.models.user import User
 
 from src.config import settings
 
+ADMIN_EMAILS = frozenset(settings.ADMIN_EMAILS)
+
+
+def is_admin_email(email: Optional[str]) -> bool:
+    return email in ADMIN_EMAILS
+
 
 class TokenService:
-    def __init__(self):
+    def __init__(self, token_cache: Optional[TokenCache] = None):
         self.jwt_secret = settings.JWT_SECRET_KEY
         self.jwt_algorithm = "HS256"
         self.jwt_expiration = settings.JWT_EXPIRATION_MINUTES
+        self.token_cache = token_cache or get_token_cache()
 
     def create_token_from_user(self, user: User) -> str:
         dict = {
-            "admin": user.email in settings.ADMIN_EMAILS,
+            "admin": is_admin_email(user.email),
             "sub": str(user.id),
             "email": user.email,
         }
@@ -34,14 +43,20 @@ class TokenService:
         return encoded_jwt
 
     def validate_token(self, token: str) -> Optional[Dict[str, Any]]:
+        if self.token_cache and (payload := self.token_cache.get(token)):
+            return payload
+
         try:
             payload = jwt.decode(
                 token, self.jwt_secret, algorithms=[self.jwt_algorithm]
             )
-            return payload
         except jwt.PyJWTError:
             return None
 
+        if self.token_cache:
+            self.token_cache.put(token, payload)
+        return payload
+
     def get_user_id_from_token(self, token: str) -> Optional[uuid.UUID]:
         payload = self.validate_token(token)
         if not payload or "sub" not in payload:
@@ -1,13 +1,15 @@
-import traceback
 from uuid import UUID
 
 from src.services.common.context import Context
+from src.services.files.cloud_storage_service import CloudStorageService
+from src.services.files.files_service import FilesService
 from src.services.usage_tracking.dto import TokenUsageDTO
-from src.services.usage_tracking.usage_tracking_service import UsageTrackingService
+from src.services.usage_tracking.usage_aggregator import get_usage_aggregator
 
 from src.storage.base_repo import BaseRepository
 from src.storage.db import db_session_manager
-from src.storage.models.usage import Usage
+from src.storage.models.blob import Blob, BlobArtifact
+from src.storage.models.resource import Resource
 
 from src.logging.logging_config import get_logger
 
@@ -24,17 +26,22 @@ class BackgroundTaskService:
     def __init__(self, context: Context):
         self.context = context
 
-    async def track_model_usage(self, user_id: UUID, model_id: UUID, usage: TokenUsageDTO):
+    async def track_model_usage(self, user_id: UUID, model_id: UUID, usage: TokenUsageDTO, cost_usd: float = 0.0):
+        # Buffered in process and written in batches, see UsageAggregator
+        get_usage_aggregator().add(user_id, model_id, usage, cost_usd)
+
+    async def preprocess_attachment(self, user_id: UUID, file_id: UUID):
         try:
             async with db_session_manager.session() as session:
-                usage_model_repo = BaseRepository(Usage, session)
-                usage_service = UsageTrackingService(self.context, usage_model_repo)
-                await usage_service.track_usage(user_id, model_id, usage)
+                context = Context(user_id=user_id)
+                files_service = FilesService(
+                    context=context,
+                    cloud_storage_service=CloudStorageService(context=context),
+                    resource_repo=BaseRepository(Resource, session),
+                    blob_repo=BaseRepository(Blob, session),
+                    blob_artifact_repo=BaseRepository(BlobArtifact, session),
+                )
+                await files_service.preprocess_file(str(file_id))
         except Exception as e:
-            logger.error(
-                f"Error tracking model usage for user {user_id}, model {model_id}: {str(e)}",
-                exc_info=True,
-            )
-            self.context.logger.error(traceback.format_exc())
-            # Re-raise the exception to ensure FastAPI knows the task failed
-            raise e
+            # The original file keeps being served, so a failed preprocessing is not fatal
+            logger.error(f"Error preprocessing attachment {file_id} for user {user_id}: {str(e)}", exc_info=True)
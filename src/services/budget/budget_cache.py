@@ -0,0 +1,36 @@
+import time
+from functools import lru_cache
+from typing import Optional
+
+from src.services.budget.dto import BudgetDTO
+
+from src.config import settings
+
+
+class BudgetCache:
+    """
+    Per-process snapshot of the current budget, so the pre-request budget check does not hit the database.
+    The snapshot is replaced whenever this process records usage, and expires after ttl seconds otherwise.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._snapshot: Optional[BudgetDTO] = None
+        self._expires_at = 0.0
+
+    def get(self) -> Optional[BudgetDTO]:
+        if self._snapshot is None or time.monotonic() >= self._expires_at:
+            return None
+        return self._snapshot
+
+    def set(self, budget: BudgetDTO) -> None:
+        self._snapshot = budget
+        self._expires_at = time.monotonic() + self.ttl
+
+
+@lru_cache()
+def get_budget_cache() -> Optional[BudgetCache]:
+    """Process-wide budget snapshot, None when BUDGET_SNAPSHOT_TTL is 0."""
+    if settings.BUDGET_SNAPSHOT_TTL <= 0:
+        return None
+    return BudgetCache(settings.BUDGET_SNAPSHOT_TTL)
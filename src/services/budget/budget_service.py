@@ -1,35 +1,107 @@
+import random
+from typing import Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import aliased
+
+from src.services.budget.budget_cache import BudgetCache, get_budget_cache
 from src.services.budget.dto import BudgetDTO
 from src.services.common import errors
 from src.services.common.context import Context
-from src.services.common.decorators import convert_to_dto
 
 from src.storage.base_repo import BaseRepository
-from src.storage.models.budget import Budget
+from src.storage.models.budget import Budget, BudgetUsageShard
+
+from src.config import settings
 
 
 class BudgetService:
-    def __init__(self, context: Context, budget_repo: BaseRepository[Budget]):
+    def __init__(self, context: Context, budget_repo: BaseRepository[Budget], budget_cache: Optional[BudgetCache] = None):
         self.context = context
         self.budget_repo = budget_repo
+        self.budget_cache = budget_cache or get_budget_cache()
 
-    async def add_usage(self, cost: float) -> None:
-        budget = await self.budget_repo.get(order_by=Budget.created_at.desc())
-        if not budget:
-            raise errors.NotFoundError("Budget", "No budget found")
+    def _current_budget_id(self):
+        # Aliased, otherwise it would be correlated to the budget row being updated
+        latest = aliased(Budget)
+        return select(latest.id).order_by(latest.created_at.desc()).limit(1)
 
-        budget.usage += cost
-        await self.budget_repo.update(budget)
+    def _total_usage(self):
+        """Budget.usage plus the sharded counters of the same budget."""
+        shards_usage = (
+            select(func.coalesce(func.sum(BudgetUsageShard.usage), 0.0))
+            .where(BudgetUsageShard.budget_id == Budget.id)
+            .correlate(Budget)
+            .scalar_subquery()
+        )
+        return Budget.usage + shards_usage
 
+    def _ensure_within_budget(self, budget: BudgetDTO) -> None:
         if budget.usage > budget.budget:
             raise errors.BudgetExceededError("Budget exceeded")
 
-    @convert_to_dto
+    async def _add_usage_to_shard(self, cost: float) -> BudgetDTO:
+        budget_id = await self.budget_repo.session.scalar(self._current_budget_id())
+        if budget_id is None:
+            raise errors.NotFoundError("Budget", "No budget found")
+
+        stmt = insert(BudgetUsageShard).values(
+            budget_id=budget_id, shard=random.randrange(settings.BUDGET_USAGE_SHARDS), usage=cost
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[BudgetUsageShard.budget_id, BudgetUsageShard.shard],
+            set_={"usage": BudgetUsageShard.usage + stmt.excluded.usage},
+        )
+        await self.budget_repo.session.execute(stmt)
+
+        # Reading the other shards takes no locks, so the total may miss in-flight increments of other transactions
+        row = (
+            await self.budget_repo.session.execute(
+                select(Budget.budget, self._total_usage().label("usage")).where(Budget.id == budget_id)
+            )
+        ).one()
+        return BudgetDTO(budget=row.budget, usage=row.usage)
+
+    async def _add_usage_to_budget(self, cost: float) -> BudgetDTO:
+        stmt = (
+            update(Budget)
+            .where(Budget.id == self._current_budget_id().scalar_subquery())
+            .values(usage=Budget.usage + cost)
+            .returning(Budget.budget, self._total_usage().label("usage"))
+        )
+        row = (await self.budget_repo.session.execute(stmt)).one_or_none()
+        if row is None:
+            raise errors.NotFoundError("Budget", "No budget found")
+        return BudgetDTO(budget=row.budget, usage=row.usage)
+
+    async def add_usage(self, cost: float) -> None:
+        """Add the cost to the current budget's usage atomically in the database, no read-modify-write."""
+        if settings.BUDGET_USAGE_SHARDS > 0:
+            budget = await self._add_usage_to_shard(cost)
+        else:
+            budget = await self._add_usage_to_budget(cost)
+
+        if self.budget_cache:
+            self.budget_cache.set(budget)
+
+        self._ensure_within_budget(budget)
+
     async def get_budget(self) -> BudgetDTO:
-        budget = await self.budget_repo.get(order_by=Budget.created_at.desc())
-        if not budget:
+        row = (
+            await self.budget_repo.session.execute(
+                select(Budget.budget, self._total_usage().label("usage")).order_by(Budget.created_at.desc()).limit(1)
+            )
+        ).one_or_none()
+        if row is None:
             raise errors.NotFoundError("Budget", "No budget found")
-        return budget
+        return BudgetDTO(budget=row.budget, usage=row.usage)
 
     async def check_budget(self) -> None:
-        if (budget := await self.get_budget()).usage > budget.budget:
-            raise errors.BudgetExceededError("Budget exceeded")
+        budget = self.budget_cache.get() if self.budget_cache else None
+        if budget is None:
+            budget = await self.get_budget()
+            if self.budget_cache:
+                self.budget_cache.set(budget)
+
+        self._ensure_within_budget(budget)
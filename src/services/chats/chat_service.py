@@ -1,21 +1,78 @@
 import uuid
-from typing import List, Optional
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
 from uuid import UUID
 
-from sqlalchemy import and_, func, select
-
-from src.services.chats.dto import ChatDTO, ChatMessageDTO, SharedConversationListItemDTO
+from sqlalchemy import (
+    and_,
+    bindparam,
+    case,
+    delete,
+    false,
+    func,
+    insert,
+    literal,
+    null,
+    or_,
+    select,
+    true,
+    tuple_,
+    type_coerce,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import UUID as PGUUID
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql import ClauseElement, Update
+
+from src.services.chats.dto import (
+    ChatDTO,
+    ChatListItemDTO,
+    ChatMessageDTO,
+    ChatMessageUsageDTO,
+    SharedChatSnapshotDTO,
+    SharedConversationDTO,
+    SharedConversationListItemDTO,
+)
+from src.services.chats.shared_chat_cache import SharedChatCache, get_shared_chat_cache
+from src.services.chats.utils import build_shared_chat_snapshot, estimate_tokens
 from src.services.common import errors
 from src.services.common.context import Context
 from src.services.common.decorators import convert_to_dto
+from src.services.common.pagination import PageDTO, decode_cursor, encode_cursor
 
 from src.storage.base_repo import BaseRepository
 from src.storage.models import Chat, ChatMessage, SharedConversation
+from src.storage.replicas import REPLICA_SAFE
 
 from src.logging.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Ownership checks run on most requests, so their statements are built once, see BaseRepository.fetch_one
+OWNED_CHAT = select(Chat).where(Chat.id == bindparam("chat_id"), Chat.user_id == bindparam("user_id"))
+OWNED_MESSAGE = (
+    select(ChatMessage)
+    .join(Chat, Chat.id == ChatMessage.chat_id)
+    .where(ChatMessage.id == bindparam("message_id"), Chat.user_id == bindparam("user_id"))
+)
+
+# List projections, the chat list and the message list don't need whole entities
+CHAT_LIST_COLUMNS = [Chat.id, Chat.title, Chat.user_id, Chat.created_at, Chat.updated_at, Chat.pinned]
+MESSAGE_LIST_COLUMNS = [
+    ChatMessage.id,
+    ChatMessage.chat_id,
+    ChatMessage.model_id,
+    ChatMessage.previous_message_id,
+    ChatMessage.seq_num,
+    ChatMessage.role,
+    ChatMessage.content,
+    ChatMessage.selected,
+    ChatMessage.attachments,
+    ChatMessage.created_at,
+]
+
 
 class ChatService:
     def __init__(
@@ -24,11 +81,13 @@ class ChatService:
         chat_repo: BaseRepository[Chat],
         chat_message_repo: BaseRepository[ChatMessage],
         shared_conversation_repo: BaseRepository[SharedConversation],
+        shared_chat_cache: Optional[SharedChatCache] = None,
     ):
         self.context = context
         self.chat_repo = chat_repo
         self.chat_message_repo = chat_message_repo
         self.shared_conversation_repo = shared_conversation_repo
+        self.shared_chat_cache = shared_chat_cache or get_shared_chat_cache()
 
     @convert_to_dto
     async def create_chat(self, title: Optional[str] = None) -> ChatDTO:
@@ -41,35 +100,84 @@ class ChatService:
     
     @convert_to_dto
     async def create_chat_from_shared_conversation(self, shared_conversation_id: UUID) -> ChatDTO:
-        existing_chat = await self.chat_repo.get(
-            joins=[(SharedConversation, SharedConversation.chat_id == Chat.id)],
-            filter=SharedConversation.id == shared_conversation_id,
-            includes=[Chat.messages]
+        """
+        Fork a shared chat for the user in one INSERT ... SELECT statement, the messages are copied inside the
+        database without passing through Python. The new chat is returned without its messages.
+        """
+        source = (
+            select(Chat.id, Chat.title, Chat.last_seq_num)
+            .join(SharedConversation, SharedConversation.chat_id == Chat.id)
+            .where(SharedConversation.id == shared_conversation_id)
+            .cte("source")
+        )
+        new_chat = (
+            insert(Chat)
+            .from_select(
+                ["id", "user_id", "title", "last_seq_num"],
+                select(
+                    literal(uuid.uuid4(), Chat.id.type),
+                    literal(self.context.user_id, Chat.user_id.type),
+                    source.c.title,
+                    source.c.last_seq_num,
+                ),
+            )
+            .returning(*Chat.__table__.c)
+            .cte("new_chat")
         )
 
-        if not existing_chat:
-            raise errors.NotFoundError(resource_name="Chat", message=f"Chat with shared conversation id {shared_conversation_id} not found")
-
-        new_chat = Chat(
-            user_id=self.context.user_id,
-            title=existing_chat.title,
-            messages=self._copy_messages(existing_chat.messages)
+        # New ids of the copied messages, so previous_message_id can point at the copies
+        id_map = (
+            select(ChatMessage.id.label("old_id"), func.gen_random_uuid().label("new_id"))
+            .where(ChatMessage.chat_id.in_(select(source.c.id)))
+            .cte("id_map")
+            .prefix_with("MATERIALIZED")
         )
+        previous_id_map = id_map.alias("previous_id_map")
+        copied = (
+            insert(ChatMessage)
+            .from_select(
+                [
+                    "id", "chat_id", "seq_num", "role", "content", "selected", "model_id", "attachments",
+                    "token_estimate", "previous_message_id",
+                ],
+                select(
+                    id_map.c.new_id,
+                    new_chat.c.id,
+                    ChatMessage.seq_num,
+                    ChatMessage.role,
+                    ChatMessage.content,
+                    ChatMessage.selected,
+                    ChatMessage.model_id,
+                    ChatMessage.attachments,
+                    ChatMessage.token_estimate,
+                    previous_id_map.c.new_id,
+                )
+                .select_from(ChatMessage)
+                .join(id_map, id_map.c.old_id == ChatMessage.id)
+                .outerjoin(previous_id_map, previous_id_map.c.old_id == ChatMessage.previous_message_id)
+                .join(new_chat, true()),
+            )
+            .cte("copied")
+        )
+
+        row = (await self.chat_repo.session.execute(select(*new_chat.c).add_cte(copied))).one_or_none()
+        if row is None:
+            raise errors.NotFoundError(resource_name="Chat", message=f"Chat with shared conversation id {shared_conversation_id} not found")
 
-        new_chat = await self.chat_repo.add(new_chat)
-        return new_chat
+        return ChatDTO(**row._mapping)
 
     @convert_to_dto
-    async def get_chat(self, chat_id: UUID) -> Optional[ChatDTO]:
+    async def get_chat(self, chat_id: UUID, with_messages: bool = True) -> Optional[ChatDTO]:
         chat = await self.chat_repo.get(
             filter=and_(Chat.id == chat_id, Chat.user_id == self.context.user_id),
-            includes=[Chat.messages, Chat.shared_conversation],
+            includes=[Chat.messages, Chat.shared_conversation] if with_messages else [Chat.shared_conversation],
         )
         return chat
 
     @convert_to_dto
     async def get_messages(self, chat_id: UUID) -> List[ChatMessageDTO]:
-        return await self.chat_message_repo.select(
+        return await self.chat_message_repo.project(
+            ChatMessageDTO,
             joins=[(Chat, Chat.id == ChatMessage.chat_id)],
             filter=and_(ChatMessage.chat_id == chat_id, Chat.user_id == self.context.user_id, ChatMessage.content.isnot(None)),
             order_by=[ChatMessage.seq_num.asc()],
@@ -83,10 +191,79 @@ class ChatService:
             order_by=[ChatMessage.seq_num.desc()],
         )
 
+    async def get_messages_page(self, chat_id: UUID, limit: int, cursor: Optional[str] = None) -> PageDTO[ChatMessageDTO]:
+        """
+        Keyset paginated history, newest page first: each page holds the `limit` messages before the cursor in
+        (seq_num, id) order, since the replies of several models share a seq_num. Only the columns the message
+        list needs are loaded.
+        """
+        filter = and_(ChatMessage.chat_id == chat_id, Chat.user_id == self.context.user_id, ChatMessage.content.isnot(None))
+        if cursor:
+            seq_num, message_id = decode_cursor(cursor, 2)
+            try:
+                key = (int(seq_num), UUID(message_id))
+            except (AttributeError, TypeError, ValueError):  # UUID() of a non-string raises AttributeError
+                raise errors.BadRequestError("Invalid cursor")
+            filter = and_(filter, tuple_(ChatMessage.seq_num, ChatMessage.id) < key)
+
+        messages = await self.chat_message_repo.project(
+            ChatMessageDTO,
+            columns=MESSAGE_LIST_COLUMNS,
+            joins=[(Chat, Chat.id == ChatMessage.chat_id)],
+            filter=filter,
+            order_by=[ChatMessage.seq_num.desc(), ChatMessage.id.desc()],
+            limit=limit + 1,
+        )
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+
+        next_cursor = encode_cursor(messages[-1].seq_num, messages[-1].id) if has_more else None
+        return PageDTO[ChatMessageDTO](items=messages[::-1], next_cursor=next_cursor)
+
     @convert_to_dto
     async def get_user_chats(self) -> List[ChatDTO]:
         return await self.chat_repo.select(filter=Chat.user_id == self.context.user_id, includes=[Chat.shared_conversation])
 
+    async def get_user_chats_page(self, limit: int, cursor: Optional[str] = None) -> PageDTO[ChatListItemDTO]:
+        """
+        Keyset paginated chat list, ordered pinned first, then most recently updated, on (pinned, updated_at, id).
+        Loads only the list columns, with the shared conversation id from an outer join instead of a second query.
+        """
+        stmt = (
+            select(*CHAT_LIST_COLUMNS, SharedConversation.id.label("shared_conversation_id"))
+            .outerjoin(SharedConversation, SharedConversation.chat_id == Chat.id)
+            .where(Chat.user_id == self.context.user_id)
+            .order_by(Chat.pinned.desc(), Chat.updated_at.desc(), Chat.id.desc())
+            .limit(limit + 1)
+        )
+        if cursor:
+            pinned, updated_at, chat_id = decode_cursor(cursor, 3)
+            try:
+                key = (bool(pinned), datetime.fromisoformat(updated_at), UUID(chat_id))
+            except (AttributeError, TypeError, ValueError):
+                raise errors.BadRequestError("Invalid cursor")
+            stmt = stmt.where(tuple_(Chat.pinned, Chat.updated_at, Chat.id) < key)
+
+        rows = (await self.chat_repo.session.execute(stmt)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        chats = [
+            ChatListItemDTO(
+                id=row.id,
+                title=row.title,
+                user_id=row.user_id,
+                created_at=row.created_at,
+                updated_at=row.updated_at,
+                pinned=row.pinned,
+                shared_conversation=SharedConversationDTO(id=row.shared_conversation_id)
+                if row.shared_conversation_id else None,
+            )
+            for row in rows
+        ]
+        next_cursor = encode_cursor(rows[-1].pinned, rows[-1].updated_at, rows[-1].id) if has_more else None
+        return PageDTO[ChatListItemDTO](items=chats, next_cursor=next_cursor)
+
     @convert_to_dto
     async def add_message(
         self,
@@ -95,23 +272,54 @@ class ChatService:
         previous_message_id: Optional[UUID] = None,
     ) -> ChatMessageDTO:
         # Verify the chat exists and belongs to the user
-        chat = await self.chat_repo.get(filter=and_(Chat.id == message.chat_id, Chat.user_id == self.context.user_id))
+        chat = await self.chat_repo.fetch_one(OWNED_CHAT, chat_id=message.chat_id, user_id=self.context.user_id)
         if not chat:
             raise errors.NotFoundError(resource_name="Chat", message=f"Chat with id {message.chat_id} not found")
 
-        chat_message = ChatMessage(**message.model_dump(exclude={"seq_num", "previous_message_id"}))
-        chat_message.seq_num = seq_num
-        chat_message.previous_message_id = previous_message_id
+        return (await self._insert_messages([message], seq_num, previous_message_id))[0]
 
-        return await self.chat_message_repo.add(chat_message)
+    @convert_to_dto
+    async def add_messages(
+        self,
+        messages: List[ChatMessageDTO],
+        seq_num: int,
+        previous_message_id: Optional[UUID] = None,
+    ) -> List[ChatMessageDTO]:
+        """Add messages of the same turn, e.g. the placeholders of every model answering it, in one statement."""
+        chat_ids = {message.chat_id for message in messages}
+        if len(chat_ids) != 1:
+            raise errors.BadRequestError("Messages of a turn must belong to the same chat")
+
+        chat_id = chat_ids.pop()
+        chat = await self.chat_repo.fetch_one(OWNED_CHAT, chat_id=chat_id, user_id=self.context.user_id)
+        if not chat:
+            raise errors.NotFoundError(resource_name="Chat", message=f"Chat with id {chat_id} not found")
+
+        return await self._insert_messages(messages, seq_num, previous_message_id)
+
+    async def _insert_messages(
+        self,
+        messages: List[ChatMessageDTO],
+        seq_num: int,
+        previous_message_id: Optional[UUID],
+    ) -> List[ChatMessage]:
+        rows = [
+            {
+                **message.model_dump(exclude={"seq_num", "previous_message_id", "created_at"}),
+                "id": message.id or uuid.uuid4(),
+                "seq_num": seq_num,
+                "previous_message_id": previous_message_id,
+                "token_estimate": estimate_tokens(message.content, message.attachments) if message.content else None,
+            }
+            for message in messages
+        ]
+        return await self.chat_message_repo.add_many(rows)
 
     @convert_to_dto
     async def update_message(self, message_id: UUID, content: str,
-                             attachments: Optional[List[UUID]] = None) -> ChatMessageDTO:
-        message = await self.chat_message_repo.get(
-            joins=[(Chat, Chat.id == ChatMessage.chat_id)],
-            filter=and_(ChatMessage.id == message_id, Chat.user_id == self.context.user_id),
-        )
+                             attachments: Optional[List[UUID]] = None,
+                             usage: Optional[ChatMessageUsageDTO] = None) -> ChatMessageDTO:
+        message = await self.chat_message_repo.fetch_one(OWNED_MESSAGE, message_id=message_id, user_id=self.context.user_id)
 
         if not message:
             raise errors.NotFoundError(
@@ -121,35 +329,57 @@ class ChatService:
 
         message.content = content
         message.attachments = attachments
-        return await self.chat_message_repo.update(message)
+        message.token_estimate = estimate_tokens(content, attachments)
+        if usage:
+            for field, value in usage.model_dump().items():
+                setattr(message, field, value)
+        message = await self.chat_message_repo.update(message)
+        await self._invalidate_shared_snapshot(message.chat_id)
+        return message
 
     async def delete_chats(self, chat_ids: List[UUID]) -> None:
-        await self.chat_repo.delete_by_filter(filter=and_(Chat.id.in_(chat_ids), Chat.user_id == self.context.user_id))
+        # The shares would go with the chats anyway, deleting them here returns their ids for the cache
+        deleted_chats = (
+            delete(Chat)
+            .where(Chat.id.in_(chat_ids), Chat.user_id == self.context.user_id)
+            .returning(Chat.id)
+            .cte("deleted_chats")
+        )
+        stmt = (
+            delete(SharedConversation)
+            .where(SharedConversation.chat_id.in_(select(deleted_chats.c.id)))
+            .returning(SharedConversation.id)
+            .add_cte(deleted_chats)
+            .execution_options(synchronize_session=False)
+        )
+        self._evict_shared_snapshots(await self.chat_repo.session.scalars(stmt))
 
     @convert_to_dto
     async def update_chat_title(self, chat_id: UUID, title: str) -> Optional[ChatDTO]:
-        chat = await self.chat_repo.get(filter=and_(Chat.id == chat_id, Chat.user_id == self.context.user_id))
+        chat = await self.chat_repo.fetch_one(OWNED_CHAT, chat_id=chat_id, user_id=self.context.user_id)
 
         if not chat:
             raise errors.NotFoundError(resource_name="Chat", message=f"Chat with id {chat_id} not found")
 
         chat.title = title
         chat = await self.chat_repo.update(chat)
+        await self._invalidate_shared_snapshot(chat_id)
         return chat
 
     @convert_to_dto
     async def pin_chat(self, chat_id: UUID) -> Optional[ChatDTO]:
-        chat = await self.chat_repo.get(filter=and_(Chat.id == chat_id, Chat.user_id == self.context.user_id))
+        chat = await self.chat_repo.fetch_one(OWNED_CHAT, chat_id=chat_id, user_id=self.context.user_id)
 
         if not chat:
             raise errors.NotFoundError(resource_name="Chat", message=f"Chat with id {chat_id} not found")
 
         chat.pinned = not chat.pinned
         chat = await self.chat_repo.update(chat)
+        await self._invalidate_shared_snapshot(chat_id)
         return chat
 
     async def get_chat_title(self, chat_id: UUID) -> Optional[str]:
-        chat = await self.chat_repo.get(filter=and_(Chat.id == chat_id, Chat.user_id == self.context.user_id))
+        chat = await self.chat_repo.fetch_one(OWNED_CHAT, chat_id=chat_id, user_id=self.context.user_id)
 
         if not chat:
             raise errors.NotFoundError(resource_name="Chat", message=f"Chat with id {chat_id} not found")
@@ -160,7 +390,7 @@ class ChatService:
         if not message.id:
             return False
 
-        chat = await self.chat_repo.get(filter=and_(Chat.id == message.chat_id, Chat.user_id == self.context.user_id))
+        chat = await self.chat_repo.fetch_one(OWNED_CHAT, chat_id=message.chat_id, user_id=self.context.user_id)
         if not chat:
             return False
 
@@ -183,6 +413,7 @@ class ChatService:
             # Delete everything after the user message, but not the user message itself (>)
             await self.chat_message_repo.delete_by_filter(filter=and_(ChatMessage.chat_id == message.chat_id, ChatMessage.seq_num > user_message.seq_num))
 
+        await self._invalidate_shared_snapshot(message.chat_id)
         return True
 
     @convert_to_dto
@@ -207,7 +438,99 @@ class ChatService:
 
         # Select the target message
         message.selected = True
-        return await self.chat_message_repo.update(message)
+        message = await self.chat_message_repo.update(message)
+        await self._invalidate_shared_snapshot(chat_id)
+        return message
+
+    async def rewrite_history(self, message: ChatMessageDTO) -> Tuple[ChatMessageDTO, List[ChatMessageDTO]]:
+        """
+        Add a user message to a chat and return it with the resulting selected history, in one statement.
+        When message.id is set the conversation is first cut at that message: a user message is replaced with
+        everything after it, for an assistant message everything after its user message goes.
+
+        The sequence number comes from the chat's counter, whose update also checks the chat belongs to the user.
+        Each turn takes two numbers, the user message's and the one its assistant replies share.
+        The counter update locks the chat row until the transaction ends, call commit_turn before streaming.
+        """
+        counter = (
+            update(Chat)
+            .where(Chat.id == message.chat_id, Chat.user_id == self.context.user_id)
+            .values(last_seq_num=Chat.last_seq_num + 2)
+            .returning(Chat.id, (Chat.last_seq_num - 1).label("seq_num"))
+            .cte("counter")
+        )
+
+        target, previous = aliased(ChatMessage), aliased(ChatMessage)
+        cut_seq_num = (
+            select(case((target.role == "user", target.seq_num), else_=previous.seq_num + 1))
+            .select_from(target)
+            .outerjoin(previous, previous.id == target.previous_message_id)
+            .where(target.id == message.id, target.chat_id == message.chat_id)
+            .scalar_subquery()
+        )
+        deleted = (
+            delete(ChatMessage)
+            .where(
+                ChatMessage.chat_id.in_(select(counter.c.id)),
+                ChatMessage.seq_num >= cut_seq_num if message.id else false(),
+            )
+            .returning(ChatMessage.id)
+            .cte("deleted")
+        )
+
+        new_message_id = uuid.uuid4()
+        inserted = (
+            insert(ChatMessage)
+            .from_select(
+                ["id", "chat_id", "seq_num", "role", "content", "attachments", "token_estimate"],
+                select(
+                    literal(new_message_id, ChatMessage.id.type),
+                    counter.c.id,
+                    counter.c.seq_num,
+                    literal("user", ChatMessage.role.type),
+                    literal(message.content, ChatMessage.content.type),
+                    literal(message.attachments, ChatMessage.attachments.type),
+                    literal(estimate_tokens(message.content, message.attachments), ChatMessage.token_estimate.type),
+                ),
+            )
+            .returning(*ChatMessage.__table__.c)
+            .cte("inserted")
+        )
+
+        # The ids of the shares whose snapshot was dropped come back on the new message's row, for the cache
+        invalidated = self._invalidate_shared_snapshot_stmt(SharedConversation.chat_id.in_(select(counter.c.id))).cte("invalidated")
+        invalidated_shares = select(func.array_agg(invalidated.c.id)).scalar_subquery()
+
+        # The statement sees the table as it was before it, so deleted rows are filtered out explicitly
+        history = select(
+            *ChatMessage.__table__.c,
+            type_coerce(null(), ARRAY(PGUUID(as_uuid=True))).label("invalidated_shares"),
+        ).where(
+            ChatMessage.chat_id.in_(select(counter.c.id)),
+            ChatMessage.content.isnot(None),
+            or_(ChatMessage.selected.is_(True), ChatMessage.selected.is_(None)),
+            ChatMessage.id.not_in(select(deleted.c.id)),
+        )
+        stmt = union_all(history, select(*inserted.c, invalidated_shares.label("invalidated_shares"))).order_by("seq_num")
+
+        rows = (await self.chat_message_repo.session.execute(stmt)).all()
+        new_row = next((row for row in rows if row.id == new_message_id), None)
+        if not new_row:
+            raise errors.NotFoundError(resource_name="Chat", message=f"Chat with id {message.chat_id} not found")
+
+        self._evict_shared_snapshots(new_row.invalidated_shares or [])
+        messages = [ChatMessageDTO(**row._mapping) for row in rows]
+        new_message = next(msg for msg in messages if msg.id == new_message_id)
+
+        return new_message, messages
+
+    async def commit_turn(self) -> None:
+        """Commit the new turn's messages, so the chat row isn't locked for the whole response stream."""
+        await self.chat_repo.commit()
+
+    async def rollback_turn(self) -> None:
+        """Discard a turn refused before commit_turn, with the chat when the turn created it."""
+        await self.chat_repo.rollback()
 
     async def get_max_sequence_number(self, chat_id: UUID) -> int:
         stmt = select(func.coalesce(func.max(ChatMessage.seq_num), 0)).where(ChatMessage.chat_id == chat_id)
@@ -222,8 +545,10 @@ class ChatService:
         if chat.shared_conversation:
             return chat.shared_conversation.id
         
-        shared_conversation = SharedConversation(chat_id=chat_id)
-        shared_conversation = await self.shared_conversation_repo.add(shared_conversation)
+        shared_conversation = await self.shared_conversation_repo.add(SharedConversation(chat_id=chat_id))
+        # The chat was loaded without its messages and share, the snapshot build has to load it again
+        self.chat_repo.session.expire(chat)
+        await self._build_shared_snapshot(shared_conversation.id)
         return shared_conversation.id
     
 
@@ -249,30 +574,80 @@ class ChatService:
             filter=and_(SharedConversation.id.in_(shared_conversation_ids), Chat.user_id == self.context.user_id)
         )
         ids_to_delete = [sc.id for sc in shared_conversations]
-        await self.shared_conversation_repo.delete_by_filter(filter=SharedConversation.id.in_(ids_to_delete))   
+        await self.shared_conversation_repo.delete_by_filter(filter=SharedConversation.id.in_(ids_to_delete))
+        self._evict_shared_snapshots(ids_to_delete)
     
 
-    def _copy_messages(self, messages: List[ChatMessage]) -> List[ChatMessage]:
-        sorted_messages = sorted(messages, key=lambda msg: msg.seq_num)
-        new_messages = []
-        previous_message_id = None
-        
-        for msg in sorted_messages:
-            new_message = ChatMessage(
-                id=uuid.uuid4(),
-                role=msg.role,
-                content=msg.content,
-                selected=msg.selected,
-                model_id=msg.model_id,
-                attachments=msg.attachments,
-                seq_num=msg.seq_num
+    async def get_shared_chat_snapshot(self, shared_conversation_id: UUID) -> Optional[SharedChatSnapshotDTO]:
+        """
+        The shared chat as pre-serialized by share_chat, rebuilt here when a change to the chat dropped it.
+        Repeated views are served from the process cache without touching the database.
+        """
+        snapshot = self.shared_chat_cache.get(shared_conversation_id) if self.shared_chat_cache else None
+        if snapshot is not None:
+            return snapshot
+
+        row = (
+            await self.shared_conversation_repo.session.execute(
+                select(SharedConversation.snapshot, SharedConversation.snapshot_etag)
+                .where(SharedConversation.id == shared_conversation_id)
             )
-            
-            if msg.role == "user":
-                previous_message_id = new_message.id
-            elif msg.role == "assistant":
-                new_message.previous_message_id = previous_message_id
-            
-            new_messages.append(new_message)
-        
-        return new_messages
\ No newline at end of file
+        ).one_or_none()
+        if row is None:
+            return None
+
+        if row.snapshot is not None:
+            snapshot = SharedChatSnapshotDTO(body=row.snapshot, etag=row.snapshot_etag)
+        else:
+            # Rebuild from the primary, a lagging replica may not have the change that dropped the snapshot yet
+            self.shared_conversation_repo.session.info[REPLICA_SAFE] = False
+            snapshot = await self._build_shared_snapshot(shared_conversation_id)
+
+        if snapshot is not None and self.shared_chat_cache:
+            self.shared_chat_cache.set(shared_conversation_id, snapshot)
+        return snapshot
+
+    async def _build_shared_snapshot(self, shared_conversation_id: UUID) -> Optional[SharedChatSnapshotDTO]:
+        # Read before the chat, a change committed after this read bumps the version and the snapshot,
+        # built from a chat that may predate the change, is not stored
+        version = await self.shared_conversation_repo.session.scalar(
+            select(SharedConversation.snapshot_version).where(SharedConversation.id == shared_conversation_id)
+        )
+        chat = await self.get_shared_chat(shared_conversation_id)
+        if version is None or chat is None:
+            return None
+
+        snapshot = build_shared_chat_snapshot(ChatDTO.model_validate(chat))
+        # Unless a concurrent rebuild stored one already
+        await self.shared_conversation_repo.bulk_update(
+            filter=and_(
+                SharedConversation.id == shared_conversation_id,
+                SharedConversation.snapshot_version == version,
+                SharedConversation.snapshot_etag.is_(None),
+            ),
+            values={"snapshot": snapshot.body, "snapshot_etag": snapshot.etag},
+        )
+        return snapshot
+
+    @staticmethod
+    def _invalidate_shared_snapshot_stmt(filter: ClauseElement) -> Update:
+        # Bumps the version even without a stored snapshot, a rebuild may be in flight
+        return (
+            update(SharedConversation)
+            .where(filter)
+            .values(snapshot=None, snapshot_etag=None, snapshot_version=SharedConversation.snapshot_version + 1)
+            .returning(SharedConversation.id)
+        )
+
+    async def _invalidate_shared_snapshot(self, chat_id: UUID) -> None:
+        """Drop the snapshot of the chat's share, if any, the next view rebuilds it."""
+        self._evict_shared_snapshots(
+            await self.shared_conversation_repo.session.scalars(
+                self._invalidate_shared_snapshot_stmt(SharedConversation.chat_id == chat_id)
+            )
+        )
+
+    def _evict_shared_snapshots(self, shared_conversation_ids: Iterable[UUID]) -> None:
+        # Only this process' cache, the other processes' entries expire after SHARED_CHAT_CACHE_TTL
+        if self.shared_chat_cache:
+            self.shared_chat_cache.delete(shared_conversation_ids)
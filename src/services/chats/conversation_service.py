@@ -1,18 +1,18 @@
 import asyncio
 import json
+import time
 import traceback
-from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional, Tuple
 from uuid import UUID
 
 from fastapi import BackgroundTasks
 
 from src.services.ai_providers.ai_model_service import AiModelService
 from src.services.chats.chat_service import ChatService
-from src.services.chats.dto import ChatDTO, ChatMessageDTO, CompletionOptionsRequestDTO
-from src.services.chats.utils import stream_error_handler
+from src.services.chats.dto import ChatDTO, ChatMessageDTO, ChatMessageUsageDTO, CompletionOptionsRequestDTO
+from src.services.chats.utils import estimate_tokens, stream_error_handler
 from src.services.common import errors
 from src.services.common.context import Context
-from src.services.files import utils
 from src.services.files.files_service import FilesService
 from src.services.inference import InferenceService
 from src.services.inference.dto import DefaultResponseGenerationOptionsDTO, StreamGenerationDTO, TextGenerationDTO
@@ -37,6 +37,7 @@ class ConversationService:
         files_service: FilesService,
         ai_model_service: AiModelService,
         limits_service: LimitsService,
+        title_generator: Optional[Callable[[UUID, ChatMessageDTO, BackgroundTasks], Awaitable[str]]] = None,
     ):
         self.context = context
         self.chat_service = chat_service
@@ -45,6 +46,8 @@ class ConversationService:
         self.files_service = files_service
         self.ai_model_service = ai_model_service
         self.limits_service = limits_service
+        # Runs concurrently with the response streams, so it has to use a database session of its own
+        self.title_generator = title_generator
 
     async def _generate_completion(
         self,
@@ -84,39 +87,7 @@ class ConversationService:
         # Send done event
         yield f"data: {json.dumps({'type': 'done'})}\n\n"
 
-    async def _rewrite_chat_history(self, message: ChatMessageDTO) -> ChatMessageDTO:
-        """
-        Rewrite the entire message history for a chat.
-        This deletes all existing messages and adds the new ones.
-
-        Returns the new message.
-        """
-
-        if message.id:
-            await self.chat_service.delete_conversation_turn_from_point(message)
-
-        # For user messages, we need to determine the previous message and sequence
-        last_assistant = None
-        seq_num = 1  # Default for first message
-
-        # Get the last assistant message to link to
-        messages = await self.chat_service.get_messages(message.chat_id)
-        assistant_messages = [msg for msg in messages if msg.role == "assistant"]
-        if assistant_messages:
-            last_assistant = assistant_messages[-1]  # Get the last one
-            seq_num = last_assistant.seq_num + 1
-        else:
-            # No assistant messages, get max seq_num + appropriate increment
-            max_seq = await self.chat_service.get_max_sequence_number(message.chat_id)
-            if max_seq == 0:
-                seq_num = 1  # Very first message
-            else:
-                seq_num = max_seq + 2  # User messages increment by 2 when no assistant responses
-
-        message.role = "user"
-        return await self.chat_service.add_message(message, seq_num=seq_num)
-
-    async def _generate_chat_title(self, message: ChatMessageDTO, background_tasks: BackgroundTasks = None) -> str:
+    async def generate_chat_title(self, message: ChatMessageDTO, background_tasks: BackgroundTasks = None) -> str:
         model = await self.ai_model_service.get_model_by_path(settings.TITLE_GENERATION_MODEL)
         if not model:
             raise errors.NotFoundError(
@@ -147,6 +118,34 @@ class ConversationService:
 
         return title_response.text.strip()
 
+    async def set_generated_chat_title(
+            self, chat_id: UUID, message: ChatMessageDTO, background_tasks: BackgroundTasks = None
+    ) -> str:
+        title = await self.generate_chat_title(message, background_tasks)
+        await self.chat_service.update_chat_title(chat_id=chat_id, title=title)
+        return title
+
+    async def _generate_chat_title_update(
+            self,
+            chat: ChatDTO,
+            message: ChatMessageDTO,
+            chunk_queue: asyncio.Queue,
+            background_tasks: BackgroundTasks = None,
+    ) -> Optional[str]:
+        """
+        Generate and save the title of a new chat next to the responses, and push it to the stream as a
+        chat_metadata event.
+        """
+        try:
+            title = await self.title_generator(chat.id, message, background_tasks)
+        except Exception as e:
+            # The chat keeps its placeholder title
+            logger.error(f"Error generating the title of chat {chat.id}: {e}")
+            return None
+
+        await chunk_queue.put({"type": "chat_metadata", "chat": {"id": str(chat.id), "title": title}})
+        return title
+
     async def _prepare_messages(self, messages: List[ChatMessageDTO], model: AiProviderModelDTO, options: Optional[CompletionOptionsRequestDTO] = None) -> List[dict]:
         """
         Prepare messages for inference, including processing attachments.
@@ -167,15 +166,20 @@ class ConversationService:
             }
         ]
 
+        capabilities = None
+        if any(message.attachments for message in messages):
+            capabilities = await self.inference_service.get_attachment_capabilities(model)
+
         # Process each message
         for message in messages:
             content = [{"type": "text", "text": message.content}] if message.attachments else message.content
 
-            # Process attachments
+            # Process attachments, dropping the ones the model cannot take
             if message.attachments:
                 for attachment_id in message.attachments:
-                    file_content = await self.files_service.get_file(attachment_id)
-                    content.append(utils.prepare_file(file_content.content_type, file_content.data))
+                    part = await self.files_service.get_prepared_file(attachment_id, capabilities)
+                    if part is not None:
+                        content.append(part)
 
             model_messages.append({"role": message.role, "content": content})
 
@@ -210,32 +214,26 @@ class ConversationService:
     async def _setup_chat_context(
         self,
         message: ChatMessageDTO,
-        background_tasks: BackgroundTasks = None,
         shared_conversation_id: Optional[UUID] = None,
     ):
-        """Set up chat context - create new chat or get existing one."""
+        """Set up chat context - create new chat or get existing one. New chats get their title later, see _generate_chat_title_update."""
         if not message.chat_id:
             if shared_conversation_id:
                 chat = await self.chat_service.create_chat_from_shared_conversation(shared_conversation_id=shared_conversation_id)
             else:
-                title = await self._generate_chat_title(message=message, background_tasks=background_tasks)
-                chat = await self.chat_service.create_chat(title=title)
+                chat = await self.chat_service.create_chat()
 
             message.chat_id = chat.id
         else:
-            chat = await self.chat_service.get_chat(chat_id=message.chat_id)
+            chat = await self.chat_service.get_chat(chat_id=message.chat_id, with_messages=False)
             if not chat:
                 raise errors.NotFoundError(resource_name="Chat", message=f"Chat with id {message.chat_id} not found")
 
         return chat
 
     async def _setup_message_history(self, message: ChatMessageDTO):
-        """Set up message history - add new user message and get previous selected messages."""
-        new_message = await self._rewrite_chat_history(message=message)
-        msgs = await self.chat_service.get_messages(message.chat_id)
-        prev_messages = [msg for msg in msgs if msg.selected or msg.selected is None]  # only get selected messages
-
-        return new_message, prev_messages
+        """Set up message history - rewrite it with the new user message and get the selected messages back."""
+        return await self.chat_service.rewrite_history(message)
 
     async def _create_models_modalities(self, model_id: UUID,
                                         models_auxiliary: Dict[UUID, AiModelsInputDTO]) -> AiModelsModalitiesDTO:
@@ -255,13 +253,12 @@ class ConversationService:
             models_auxiliary: Dict[UUID, AiModelsInputDTO],
     ) -> Tuple[List[AiModelsModalitiesDTO], List[ChatMessageDTO]]:
         """Create assistant messages for each model and return models and assistant messages."""
-        assistant_messages = []
         models = []
 
         limits = await self.limits_service.get_limits(model_ids=model_ids)
         limits_models_ids = set([limit.model_id for limit in limits])
 
-        for idx, model_id in enumerate(model_ids):
+        for model_id in model_ids:
             model_modalities = await self._create_models_modalities(model_id, models_auxiliary)
 
             if model_id not in limits_models_ids and not model_modalities.llm.has_api_key:  # TODO: this is a hack to check if the model is BYOK, we need to refactor this
@@ -269,25 +266,21 @@ class ConversationService:
             
             models.append(model_modalities)
 
-            assistant_message = await self.chat_service.add_message(
+        # All placeholders of the turn go out in one INSERT
+        assistant_messages = await self.chat_service.add_messages(
+            [
                 ChatMessageDTO(
                     chat_id=chat_id, role="assistant", model_id=model_id, selected=idx == 0,
                     image_gen_model_id=model_modalities.image_gen.id  # First model is selected by default
-                ),
-                seq_num=new_message.seq_num + 1,
-                previous_message_id=new_message.id,
-            )
-            assistant_messages.append(assistant_message)
+                )
+                for idx, (model_id, model_modalities) in enumerate(zip(model_ids, models))
+            ],
+            seq_num=new_message.seq_num + 1,
+            previous_message_id=new_message.id,
+        )
 
         return models, assistant_messages
 
-    async def _ensure_limits(self, model: AiModelsModalitiesDTO, messages: List[Dict[str, Any]]):
-        if not model.llm.has_api_kay and await self.limits_service.check_utilization(model.llm.id, messages):
-            raise errors.LimitsExceededError(f"Model {model.llm.name} has exceeded its limit")
-        if not model.image_gen.has_api_key and await self.limits_service.check_utilization(model.image_gen.id,
-                                                                                           messages):
-            raise errors.LimitsExceededError(f"Model {model.image_gen.name} has exceeded its limit")
-
     async def _generate_model_response_stream(
             self,
             models_modalities: AiModelsModalitiesDTO,
@@ -301,10 +294,14 @@ class ConversationService:
         inference_messages = await self._prepare_messages(messages=prev_messages, model=models_modalities.llm)
         assistant_content = ""
         attachments = []
+        usage_by_model = None
+        cost_usd = None
+        ttft_ms = None
 
         generate_stream_func = self._generate_completion_stream if not settings.MOCK_AI_RESPONSE else self._fake_stream_response
 
         try:
+            started_at = time.monotonic()
             async for chunk in generate_stream_func(
                     models_modalities=models_modalities,
                 messages=inference_messages,
@@ -312,6 +309,11 @@ class ConversationService:
                 background_tasks=background_tasks,
             ):
                 chunk_data = {"model_id": str(models_modalities.llm.id), "message_id": str(assistant_message.id)}
+                if chunk.usage:
+                    usage_by_model = chunk.usage
+                    cost_usd = chunk.cost_usd
+                if ttft_ms is None and (chunk.text or chunk.reasoning):
+                    ttft_ms = int((time.monotonic() - started_at) * 1000)
                 if chunk.reasoning:
                     chunk_data["type"] = "reasoning_content"
                     chunk_data["content"] = {"type": "text", "text": chunk.reasoning}
@@ -340,6 +342,20 @@ class ConversationService:
                 #         chunk_data = {"type": "thinking_content", "model_id": str(model.id), "message_id": str(assistant_message.id), "content": {"type": "text", "text": thinking_chunk.thinking}}
                 #         await chunk_queue.put(chunk_data)
 
+            usage = ChatMessageUsageDTO(
+                cost_usd=cost_usd,
+                latency_ms=int((time.monotonic() - started_at) * 1000),
+                ttft_ms=ttft_ms,
+            )
+
+            # Replace the pre-flight estimate with the exact usage for the next limit checks
+            if usage_by_model:
+                self.limits_service.reconcile_usage(usage_by_model)
+                llm_usage = usage_by_model.get(models_modalities.llm.id)
+                if llm_usage:
+                    usage.prompt_tokens = llm_usage.prompt_tokens
+                    usage.completion_tokens = llm_usage.completion_tokens
+
             # Send stop chunk with final content
             stop_chunk = {
                 "type": "message_content_stop",
@@ -347,6 +363,7 @@ class ConversationService:
                 "message_id": str(assistant_message.id),
                 "final_content": assistant_content,
                 "attachments": attachments,
+                "usage": usage,
             }
             await chunk_queue.put(stop_chunk)
 
@@ -387,11 +404,34 @@ class ConversationService:
             }
             yield f"data: {json.dumps({'type': 'message_start', 'message': message_metadata})}\n\n"
 
-    async def _validate_model_limits(self, models: List[AiModelsModalitiesDTO], prev_messages: List[ChatMessageDTO]):
-        """Check limits for all models first - this will raise LimitsExceededError immediately if needed."""
-        for model in models:
-            inference_messages = await self._prepare_messages(messages=prev_messages, model=model.llm, options=options)
-            await self._ensure_limits(model, inference_messages)
+    async def _validate_model_limits(
+            self,
+            models: List[AiModelsModalitiesDTO],
+            prev_messages: List[ChatMessageDTO],
+            options: Optional[CompletionOptionsRequestDTO] = None,
+    ):
+        """
+        Check limits for all models at once before streaming - raises LimitsExceededError immediately if needed.
+        Uses the stored per-message token estimates against the cached utilization, nothing is downloaded or
+        tokenized here. The exact usage is reconciled once each response is done.
+        """
+        use_image_gen = bool(options and options.tools and "image" in options.tools)
+        limited_models = {
+            model.id: model
+            for model_modalities in models
+            for model in (model_modalities.llm, model_modalities.image_gen if use_image_gen else None)
+            if model and not model.has_api_key
+        }
+        if not limited_models:
+            return
+
+        input_tokens = sum(
+            message.token_estimate or estimate_tokens(message.content, message.attachments)
+            for message in prev_messages
+        )
+        exceeded = await self.limits_service.get_exceeded_models(list(limited_models), input_tokens)
+        if exceeded:
+            raise errors.LimitsExceededError(f"Model {limited_models[exceeded[0]].name} has exceeded its limit")
 
     async def _process_streaming_chunks(
             self,
@@ -411,10 +451,11 @@ class ConversationService:
                     "content": chunk["final_content"],
                     "attachments": [UUID(attachment["file_id"]) for attachment in chunk["attachments"]],
                     # TODO: Fix this
+                    "usage": chunk["usage"],
                 }
                 completed_models += 1
-                # Remove final_content from the chunk before sending to client
-                chunk_to_send = {k: v for k, v in chunk.items() if k != "final_content"}
+                # Remove final_content and usage from the chunk before sending to client
+                chunk_to_send = {k: v for k, v in chunk.items() if k not in ("final_content", "usage")}
                 yield f"data: {json.dumps(chunk_to_send)}\n\n"
             elif chunk.get("type") == "error":
                 completed_models += 1
@@ -426,7 +467,7 @@ class ConversationService:
         """Update all messages sequentially to avoid session conflicts."""
         for message_id, content in final_contents.items():
             await self.chat_service.update_message(message_id=UUID(message_id), content=content["content"],
-                                                   attachments=content["attachments"])
+                                                   attachments=content["attachments"], usage=content["usage"])
 
     @stream_error_handler
     async def chat_completion_stream(
@@ -439,8 +480,9 @@ class ConversationService:
             background_tasks: BackgroundTasks = None,
     ) -> AsyncGenerator[str, None]:
 
-        # Set up chat context (create or get existing chat)
-        chat = await self._setup_chat_context(message, background_tasks, shared_conversation_id)
+        # Set up chat context (create or get existing chat), a new chat starts with a placeholder title
+        is_new_chat = not message.chat_id and not shared_conversation_id
+        chat = await self._setup_chat_context(message, shared_conversation_id)
 
         # Set up message history (add user message, get previous messages)
         new_message, prev_messages = await self._setup_message_history(message)
@@ -450,6 +492,16 @@ class ConversationService:
                                                                                                  model_ids,
                                                                                                  models_auxiliary)
 
+        # Validate model limits before the turn is committed and announced, a refused turn leaves nothing behind
+        try:
+            await self._validate_model_limits(models_modalities, prev_messages, options)
+        except errors.LimitsExceededError:
+            await self.chat_service.rollback_turn()
+            raise
+
+        # Release the chat row locked by the sequence number allocation before the responses are streamed
+        await self.chat_service.commit_turn()
+
         # Send initial chat metadata
         yield await self._send_chat_metadata(chat)
 
@@ -458,9 +510,6 @@ class ConversationService:
                                                                       new_message):
             yield metadata_chunk
 
-        # Validate model limits before proceeding
-        # await self._validate_model_limits(models_modalities, prev_messages) # TODO: TURN THIS BACK ON
-
         # Set up streaming infrastructure
         chunk_queue = asyncio.Queue()
 
@@ -472,13 +521,31 @@ class ConversationService:
             for model_modalities, assistant_message in zip(models_modalities, assistant_messages)
         ]
 
-        # Process streaming chunks and yield responses
-        final_contents = {}
-        async for chunk_response in self._process_streaming_chunks(chunk_queue, len(models_modalities), final_contents):
-            yield chunk_response
+        # The title is generated concurrently, off the path to the first tokens
+        title_task = None
+        if is_new_chat and self.title_generator:
+            title_task = asyncio.create_task(
+                self._generate_chat_title_update(chat, message, chunk_queue, background_tasks))
 
-        # Wait for all tasks to complete
-        await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            # Process streaming chunks and yield responses
+            final_contents = {}
+            async for chunk_response in self._process_streaming_chunks(chunk_queue, len(models_modalities),
+                                                                       final_contents):
+                yield chunk_response
+
+            # Wait for all tasks to complete
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if title_task:
+                await title_task
+        finally:
+            # A client leaving mid-stream closes the generator, stop generating a title no one will receive
+            if title_task and not title_task.done():
+                title_task.cancel()
+
+        # A title that came after the last response is still queued
+        while not chunk_queue.empty():
+            yield f"data: {json.dumps(chunk_queue.get_nowait())}\n\n"
 
         # Update final message contents in database
         await self._update_final_contents(final_contents)
@@ -18,12 +18,27 @@ class ChatMessageDTO(BaseModel):
     content: Optional[str] = None
     selected: Optional[bool] = None
     attachments: Optional[List[UUID]] = None
+    token_estimate: Optional[int] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cost_usd: Optional[float] = None
+    latency_ms: Optional[int] = None
+    ttft_ms: Optional[int] = None
     created_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
 
+class ChatMessageUsageDTO(BaseModel):
+    """Exact usage and timings of the response of an assistant message."""
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cost_usd: Optional[float] = None
+    latency_ms: Optional[int] = None
+    ttft_ms: Optional[int] = None
+
+
 class SharedConversationDTO(BaseModel):
     id: UUID
 
@@ -31,6 +46,12 @@ class SharedConversationDTO(BaseModel):
         from_attributes = True
 
 
+class SharedChatSnapshotDTO(BaseModel):
+    """A shared chat serialized the way GET /api/chats/shared/{id} returns it, gzipped."""
+    body: bytes
+    etag: str
+
+
 class ChatDTO(BaseModel):
     id: UUID
     title: Optional[str]
@@ -45,6 +66,17 @@ class ChatDTO(BaseModel):
         from_attributes = True
 
 
+class ChatListItemDTO(BaseModel):
+    """Chat as shown in the chat list, without messages."""
+    id: UUID
+    title: Optional[str]
+    user_id: UUID
+    created_at: datetime
+    updated_at: datetime
+    pinned: bool
+    shared_conversation: Optional[SharedConversationDTO] = None
+
+
 class SharedConversationListItemDTO(BaseModel):
     id: UUID
     created_at: datetime
@@ -0,0 +1,52 @@
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Iterable, Optional, Tuple
+from uuid import UUID
+
+from src.services.chats.dto import SharedChatSnapshotDTO
+
+from src.config import settings
+
+
+class SharedChatCache:
+    """
+    Per-process cache of shared chat snapshots with a short TTL, bounded to max_entries shares.
+    Changes made through another process show up once the entry expires.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[UUID, Tuple[float, SharedChatSnapshotDTO]]" = OrderedDict()
+
+    def get(self, shared_conversation_id: UUID) -> Optional[SharedChatSnapshotDTO]:
+        entry = self._entries.get(shared_conversation_id)
+        if entry is None:
+            return None
+
+        expires_at, snapshot = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[shared_conversation_id]
+            return None
+
+        self._entries.move_to_end(shared_conversation_id)
+        return snapshot
+
+    def set(self, shared_conversation_id: UUID, snapshot: SharedChatSnapshotDTO) -> None:
+        self._entries[shared_conversation_id] = (time.monotonic() + self.ttl, snapshot)
+        self._entries.move_to_end(shared_conversation_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, shared_conversation_ids: Iterable[UUID]) -> None:
+        for shared_conversation_id in shared_conversation_ids:
+            self._entries.pop(shared_conversation_id, None)
+
+
+@lru_cache()
+def get_shared_chat_cache() -> Optional[SharedChatCache]:
+    """Process-wide shared chat cache, None when SHARED_CHAT_CACHE_TTL is 0."""
+    if settings.SHARED_CHAT_CACHE_TTL <= 0:
+        return None
+    return SharedChatCache(settings.SHARED_CHAT_CACHE_TTL, settings.SHARED_CHAT_CACHE_MAX_ENTRIES)
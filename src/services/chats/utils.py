@@ -1,15 +1,43 @@
 import functools
+import gzip
+import hashlib
 import json
+import math
 import traceback
+from typing import List, Optional
 from uuid import UUID
 
+from src.services.chats.dto import ChatDTO, SharedChatSnapshotDTO
 from src.services.common import errors
 
+from src.api.schemas.chat import ChatResponseSchema
 from src.logging.logging_config import get_logger
+from src.utils import constants
 
 logger = get_logger(__name__)
 
 
+def estimate_tokens(content: Optional[str], attachments: Optional[List[UUID]] = None) -> int:
+    """
+    Cheap estimate of the prompt tokens of a message, no tokenizer involved. Only meant for admission checks,
+    the exact counts come back with the usage of the response.
+    """
+    text_tokens = math.ceil(len(content or "") / constants.TOKEN_ESTIMATE_CHARS_PER_TOKEN)
+    attachment_tokens = len(attachments or []) * constants.TOKEN_ESTIMATE_PER_ATTACHMENT
+    return constants.TOKEN_ESTIMATE_PER_MESSAGE + text_tokens + attachment_tokens
+
+
+def build_shared_chat_snapshot(chat: ChatDTO) -> SharedChatSnapshotDTO:
+    """
+    Serialize a shared chat once, gzipped, with a strong ETag of its content. Messages still being generated
+    are left out, and the rest are ordered so the same chat always gives the same bytes.
+    """
+    messages = sorted((msg for msg in chat.messages if msg.content is not None), key=lambda msg: (msg.seq_num, str(msg.id)))
+    body = ChatResponseSchema.model_validate(chat.model_copy(update={"messages": messages})).model_dump_json().encode()
+    # mtime=0 keeps the gzip bytes stable for the same content
+    return SharedChatSnapshotDTO(body=gzip.compress(body, mtime=0), etag=hashlib.sha256(body).hexdigest()[:32])
+
+
 def stream_error_handler(func):
     """
     Decorator for streaming functions that handles errors and formats them as SSE events.
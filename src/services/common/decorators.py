@@ -13,20 +13,24 @@ def convert_to_dto(func: Callable[..., Any]) -> Callable[..., Any]:
     Decorator that converts database models to the type specified in the return annotation.
     Works with both async and sync functions.
     Handles Optional types, Lists, and direct model-to-DTO conversions.
+    The conversion is resolved once at decoration time, results that already are DTOs (e.g. from
+    BaseRepository.project) are passed through as is.
     """
     return_type_hints = get_type_hints(func).get("return")
     if return_type_hints is None:
         return func
 
+    converter = build_converter(return_type_hints)
+
     @wraps(func)
     async def async_wrapper(*args, **kwargs):
         result = await func(*args, **kwargs)
-        return convert_result(result, return_type_hints)
+        return converter(result)
 
     @wraps(func)
     def sync_wrapper(*args, **kwargs):
         result = func(*args, **kwargs)
-        return convert_result(result, return_type_hints)
+        return converter(result)
 
     if iscoroutinefunction(func):
         return async_wrapper
@@ -34,12 +38,20 @@ def convert_to_dto(func: Callable[..., Any]) -> Callable[..., Any]:
         return sync_wrapper
 
 
-def convert_result(result: Any, return_type: Type) -> Any:
-    """Convert the result to the specified return type."""
-    # Handle None result
-    if result is None:
-        return None
+def _identity(result: Any) -> Any:
+    return result
+
+
+def _model_converter(model: Type[BaseModel]) -> Callable[[Any], Any]:
+    def convert(item: Any) -> Any:
+        # Exact class check, a subclass instance is still converted to the annotated DTO
+        return item if type(item) is model else model.model_validate(item)
+
+    return convert
 
+
+def build_converter(return_type: Type) -> Callable[[Any], Any]:
+    """Build the function converting a result to the specified return type."""
     origin = get_origin(return_type)
 
     # Handle Optional types
@@ -48,20 +60,25 @@ def convert_result(result: Any, return_type: Type) -> Any:
         if type(None) in args:
             # Extract the real type from Optional
             real_type = next(arg for arg in args if arg is not type(None))
-            return convert_result(result, real_type)
+            convert_real = build_converter(real_type)
+            return lambda result: None if result is None else convert_real(result)
 
     # Handle List types
     elif origin is list:
         item_type = get_args(return_type)[0]
-        if issubclass(item_type, BaseModel) and hasattr(item_type, "model_validate"):
-            return [item_type.model_validate(item) for item in result]
-        else:
-            return result
+        if inspect.isclass(item_type) and issubclass(item_type, BaseModel):
+            convert_item = _model_converter(item_type)
+            return lambda result: None if result is None else [convert_item(item) for item in result]
 
     # Handle direct model to DTO conversion
     elif inspect.isclass(return_type) and issubclass(return_type, BaseModel):
-        if hasattr(return_type, "model_validate"):
-            return return_type.model_validate(result)
+        convert_model = _model_converter(return_type)
+        return lambda result: None if result is None else convert_model(result)
 
     # Return as is if no conversion needed
-    return result
+    return _identity
+
+
+def convert_result(result: Any, return_type: Type) -> Any:
+    """Convert the result to the specified return type."""
+    return build_converter(return_type)(result)
@@ -56,3 +56,10 @@ class BYOKError(Exception):
         self.status_code = 402
         self.message = message
         super().__init__(self.message)
+
+
+class PayloadTooLargeError(Exception):
+    def __init__(self, message: str):
+        self.status_code = 413
+        self.message = message
+        super().__init__(self.message)
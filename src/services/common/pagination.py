@@ -0,0 +1,31 @@
+import base64
+import json
+from typing import Any, Generic, List, Optional, TypeVar
+
+from pydantic import BaseModel
+
+from src.services.common import errors
+
+T = TypeVar("T")
+
+
+class PageDTO(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None  # None on the last page
+
+
+def encode_cursor(*values: Any) -> str:
+    """Opaque keyset cursor holding the sort key of the last row of a page."""
+    payload = json.dumps([str(value) if not isinstance(value, (bool, int)) else value for value in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise errors.BadRequestError("Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != size:
+        raise errors.BadRequestError("Invalid cursor")
+    return values
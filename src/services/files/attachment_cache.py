@@ -0,0 +1,140 @@
+import asyncio
+import itertools
+import json
+import os
+import shutil
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional
+
+from src.config import settings
+from src.logging.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class AttachmentCacheEntry(NamedTuple):
+    path: Path
+    size: int
+    filename: str
+    content_type: str
+
+
+class CachedAttachment(NamedTuple):
+    filename: str
+    content_type: str
+    data: bytes
+
+
+class AttachmentCache:
+    """
+    Per-process, disk-backed LRU cache of attachment contents (and optionally the prepared message parts
+    sent to the models).
+    Entries are keyed by user and resource id, so a hit implies the ownership check already passed.
+    The index lives in memory, the bytes live on disk under a per-process directory, and the total
+    size on disk is kept under max_bytes by evicting the least recently used entries. The disk IO runs in
+    worker threads, every write goes to a new file so reads and deletes in flight never see a replaced one.
+    """
+
+    RAW = "raw"
+    PREPARED = "part"
+
+    def __init__(self, root_path: str, max_bytes: int):
+        self.root = Path(root_path) / str(os.getpid())
+        shutil.rmtree(self.root, ignore_errors=True)  # whatever a previous process with our pid left is stale
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, AttachmentCacheEntry]" = OrderedDict()
+        self._total_bytes = 0
+        self._counter = itertools.count()
+
+    def _key(self, key: str, kind: str) -> str:
+        return f"{key}.{kind}"
+
+    async def _get(self, key: str, kind: str) -> Optional[CachedAttachment]:
+        entry_key = self._key(key, kind)
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            return None
+
+        try:
+            data = await asyncio.to_thread(entry.path.read_bytes)
+        except OSError:
+            if self._entries.get(entry_key) is entry:
+                await self._unlink([self._pop(entry_key)])
+            return None
+
+        if self._entries.get(entry_key) is entry:
+            self._entries.move_to_end(entry_key)
+        return CachedAttachment(filename=entry.filename, content_type=entry.content_type, data=data)
+
+    async def _put(self, key: str, kind: str, filename: str, content_type: str, data: bytes) -> None:
+        size = len(data)
+        if size > self.max_bytes:  # would evict everything else and still not fit
+            return
+
+        entry_key = self._key(key, kind)
+        path = self.root / f"{entry_key}.{next(self._counter)}"
+        try:
+            await asyncio.to_thread(path.write_bytes, data)
+        except OSError as e:
+            logger.warning(f"Failed to write attachment cache entry {entry_key}: {str(e)}")
+            return
+
+        stale = [self._pop(entry_key)]
+        self._entries[entry_key] = AttachmentCacheEntry(path=path, size=size, filename=filename, content_type=content_type)
+        self._total_bytes += size
+        while self._total_bytes > self.max_bytes and self._entries:
+            stale.append(self._pop(next(iter(self._entries))))
+        await self._unlink(stale)
+
+    def _pop(self, entry_key: str) -> Optional[Path]:
+        """Remove an entry from the index, its file is left to _unlink."""
+        entry = self._entries.pop(entry_key, None)
+        if entry is None:
+            return None
+
+        self._total_bytes -= entry.size
+        return entry.path
+
+    @staticmethod
+    def _unlink_files(paths: List[Path]) -> None:
+        for path in paths:
+            path.unlink(missing_ok=True)
+
+    async def _unlink(self, paths: Iterable[Optional[Path]]) -> None:
+        paths = [path for path in paths if path is not None]
+        if paths:
+            await asyncio.to_thread(self._unlink_files, paths)
+
+    async def get(self, key: str) -> Optional[CachedAttachment]:
+        return await self._get(key, self.RAW)
+
+    async def put(self, key: str, filename: str, content_type: str, data: bytes) -> None:
+        await self._put(key, self.RAW, filename, content_type, data)
+
+    async def get_prepared(self, key: str, variant: str) -> Optional[dict]:
+        if not settings.ATTACHMENT_CACHE_PREPARED_PARTS:
+            return None
+        cached = await self._get(f"{key}.{variant}", self.PREPARED)
+        return json.loads(cached.data) if cached else None
+
+    async def put_prepared(self, key: str, variant: str, filename: str, content_type: str, part: dict) -> None:
+        if not settings.ATTACHMENT_CACHE_PREPARED_PARTS:
+            return
+        await self._put(f"{key}.{variant}", self.PREPARED, filename, content_type, json.dumps(part).encode("utf-8"))
+
+    async def invalidate(self, key: str) -> None:
+        # Deletes are rare, so a scan over the index is cheaper than tracking the variants of every key
+        entry_keys = [entry_key for entry_key in self._entries if entry_key.startswith(f"{key}.")]
+        await self._unlink([self._pop(entry_key) for entry_key in entry_keys])
+
+
+@lru_cache()
+def get_attachment_cache() -> Optional[AttachmentCache]:
+    """Process-wide attachment cache, None when ATTACHMENT_CACHE_MAX_BYTES is 0."""
+    if settings.ATTACHMENT_CACHE_MAX_BYTES <= 0:
+        return None
+    return AttachmentCache(settings.ATTACHMENT_CACHE_PATH, settings.ATTACHMENT_CACHE_MAX_BYTES)
@@ -1,49 +1,30 @@
-import asyncio
-from contextvars import Context
+from typing import AsyncIterator, BinaryIO, Optional, Union
 
-from google.cloud import storage
+from src.services.common.context import Context
+from src.services.files.storage import StorageBackend, get_storage_backend
 
 from src.config import settings
 
 
-# TODO: rework to async
 class CloudStorageService:
-    def __init__(self, context: Context):
+    def __init__(self, context: Context, storage_backend: Optional[StorageBackend] = None):
         self.context = context
-
-        self.client = storage.Client()
-        self.bucket = self.client.bucket(settings.GCP_BUCKET_NAME)
+        self.storage_backend = storage_backend or get_storage_backend()
 
     async def upload_file(
-        self, path: str, contents: bytes, metadata: dict = None
+        self, path: str, contents: Union[bytes, BinaryIO], metadata: dict = None
     ) -> str:
-        blob = self.bucket.blob(path)
-
-        # Upload the file contents in a thread pool
-        await asyncio.to_thread(blob.upload_from_string, contents)
-
-        # Set metadata if provided
-        if metadata:
-            blob.metadata = metadata
-            await asyncio.to_thread(blob.patch)
-
-        return path
-
-    async def get_file(self, path: str) -> dict:
-        blob = self.bucket.blob(path)
+        content_type = metadata.get("content_type") if metadata else None
+        return await self.storage_backend.upload(path, contents, content_type=content_type, metadata=metadata)
 
-        # Download data and get metadata in parallel
-        data_task = asyncio.to_thread(blob.download_as_bytes)
-        metadata_task = asyncio.to_thread(lambda: blob.metadata or {})
+    async def get_file(self, path: str) -> bytes:
+        return await self.storage_backend.download(path)
 
-        data, metadata = await asyncio.gather(data_task, metadata_task)
+    def get_file_stream(self, path: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        return self.storage_backend.download_stream(path, start=start, end=end, chunk_size=settings.FILE_CHUNK_SIZE)
 
-        return {"data": data, "metadata": metadata}
+    async def get_file_size(self, path: str) -> int:
+        return await self.storage_backend.get_size(path)
 
     async def delete_file(self, path: str) -> bool:
-        blob = self.bucket.blob(path)
-        try:
-            await asyncio.to_thread(blob.delete)
-            return True
-        except Exception:
-            return False
+        return await self.storage_backend.delete(path)
@@ -1,3 +1,4 @@
+from typing import Optional
 from uuid import UUID
 
 from pydantic import BaseModel
@@ -11,3 +12,20 @@ class FileDTO(BaseModel):
 
 class FileDataDTO(FileDTO):
     data: bytes
+
+
+class FileInfoDTO(FileDTO):
+    size: int
+    etag: str
+    object_path: str
+
+
+class AttachmentCapabilitiesDTO(BaseModel):
+    """What a model accepts as attachments, used to pick the cheapest attachment artifact for it."""
+    supports_vision: bool = True
+    supports_pdf: bool = True
+    max_image_dimension: Optional[int] = None
+
+    @property
+    def cache_key(self) -> str:
+        return f"v{int(self.supports_vision)}p{int(self.supports_pdf)}d{self.max_image_dimension or 0}"
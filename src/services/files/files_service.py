@@ -1,17 +1,33 @@
+import hashlib
+import tempfile
 import uuid
-from typing import Optional
+from typing import AsyncIterator, BinaryIO, List, Optional, Union
 
-from sqlalchemy import and_
+from sqlalchemy import and_, bindparam, delete, literal_column, select, union_all, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import selectinload
 
 from src.services.common import errors
 from src.services.common.context import Context
-from src.services.files import utils
+from src.services.files import preprocessing, utils
+from src.services.files.attachment_cache import AttachmentCache, get_attachment_cache
 from src.services.files.cloud_storage_service import CloudStorageService
-from src.services.files.dto import FileDataDTO, FileDTO
+from src.services.files.dto import AttachmentCapabilitiesDTO, FileDataDTO, FileDTO, FileInfoDTO
 
 from src.storage.base_repo import BaseRepository
+from src.storage.models.blob import Blob, BlobArtifact
 from src.storage.models.resource import Resource
 
+from src.config import settings
+from src.utils import constants
+
+# Resolved for every attachment of every message, built once, see BaseRepository.fetch_one
+OWNED_RESOURCE = (
+    select(Resource)
+    .where(Resource.id == bindparam("file_id"), Resource.user_id == bindparam("user_id"))
+    .options(selectinload(Resource.blob))
+)
+
 
 class FilesService:
     def __init__(
@@ -19,73 +35,316 @@ class FilesService:
         context: Context = None,
         cloud_storage_service: CloudStorageService = None,
         resource_repo: BaseRepository[Resource] = None,
+        blob_repo: BaseRepository[Blob] = None,
+        blob_artifact_repo: BaseRepository[BlobArtifact] = None,
+        attachment_cache: Optional[AttachmentCache] = None,
     ):
         self.context = context
         self.cloud_storage_service = cloud_storage_service
         self.resource_repo = resource_repo
+        self.blob_repo = blob_repo
+        self.blob_artifact_repo = blob_artifact_repo
+        self.attachment_cache = attachment_cache or get_attachment_cache()
 
-    def _get_file_path(
-        self, file_id: uuid.UUID, filename: str, content_type: str
-    ) -> str:
-        return f"{utils.get_attachment_type(content_type)}/{file_id}_{filename}"
+    def _get_cache_key(self, file_id: str) -> str:
+        return f"{self.context.user_id}_{file_id}"
 
-    async def upload_file(
-            self, contents: bytes, content_type: str, filename: Optional[str] = None
-    ) -> FileDTO:
-        file_id = uuid.uuid4()
-        file_path = self._get_file_path(file_id, filename, content_type)
+    def _get_legacy_object_path(self, storage_path: str) -> str:
+        return f"attachments/{self.context.user_id}/{storage_path}"
+
+    def _get_blob_object_path(self, content_hash: str, blob_id: uuid.UUID) -> str:
+        # Unique per blob row, so deleting a released blob's objects never hits a re-upload of the same contents
+        return f"blobs/{content_hash[:2]}/{content_hash}-{blob_id}"
+
+    def _get_object_path(self, resource: Resource) -> str:
+        if resource.blob is not None:
+            return resource.blob.storage_path
+        return self._get_legacy_object_path(resource.storage_path)
+
+    def _ensure_upload_size(self, size: int) -> None:
+        if size > settings.MAX_UPLOAD_SIZE_BYTES:
+            raise errors.PayloadTooLargeError(
+                f"File exceeds the maximum upload size of {settings.MAX_UPLOAD_SIZE_BYTES} bytes"
+            )
+
+    async def _get_resource(self, file_id: str) -> Resource:
+        resource = await self.resource_repo.fetch_one(OWNED_RESOURCE, file_id=file_id, user_id=self.context.user_id)
+
+        if not resource:
+            raise errors.NotFoundError(resource_name="File", message=f"File with id {file_id} not found")
+
+        return resource
+
+    async def _acquire_blob(
+        self, contents: Union[bytes, BinaryIO], content_hash: str, size: int, content_type: str
+    ) -> uuid.UUID:
+        """
+        Take a reference on the blob with the given hash, uploading the contents only if the blob is new.
+        The insert holds the unique key until the transaction commits, so concurrent uploads of the same
+        contents wait for the first one instead of uploading twice.
+        """
+        blob_id = uuid.uuid4()
+        storage_path = self._get_blob_object_path(content_hash, blob_id)
+        stmt = (
+            insert(Blob)
+            .values(id=blob_id, content_hash=content_hash, size=size, storage_path=storage_path, ref_count=1)
+            .on_conflict_do_update(index_elements=[Blob.content_hash], set_={"ref_count": Blob.ref_count + 1})
+            .returning(Blob.id, literal_column("xmax = 0").label("inserted"))
+        )
+        result = await self.blob_repo.session.execute(stmt)
+        blob_id, inserted = result.one()
+
+        if inserted:
+            await self.cloud_storage_service.upload_file(storage_path, contents, {"content_type": content_type})
 
-        # TODO: refactor this
+        return blob_id
+
+    async def _release_blob(self, blob_id: uuid.UUID) -> List[str]:
+        """
+        Drop a reference on the blob, deleting the row and its artifact rows with the last one.
+        The decrement locks the row until commit, so no upload can take a reference between it and the delete.
+        Returns the paths of the stored objects to delete once the transaction has committed.
+        """
+        remaining = await self.blob_repo.session.scalar(
+            update(Blob).where(Blob.id == blob_id).values(ref_count=Blob.ref_count - 1).returning(Blob.ref_count)
+        )
+        if remaining is None or remaining > 0:
+            return []
+
+        deleted_blob = (
+            delete(Blob)
+            .where(Blob.id == blob_id, Blob.ref_count <= 0)
+            .returning(Blob.id, Blob.storage_path)
+            .cte("deleted_blob")
+        )
+        # Deleted explicitly rather than through the FK cascade, for their paths
+        deleted_artifacts = (
+            delete(BlobArtifact)
+            .where(BlobArtifact.blob_id.in_(select(deleted_blob.c.id)))
+            .returning(BlobArtifact.storage_path)
+            .cte("deleted_artifacts")
+        )
+        stmt = union_all(select(deleted_blob.c.storage_path), select(deleted_artifacts.c.storage_path))
+        return list(await self.blob_repo.session.scalars(stmt))
+
+    async def _store_file(
+        self,
+        contents: Union[bytes, BinaryIO],
+        content_hash: str,
+        size: int,
+        content_type: str,
+        filename: Optional[str] = None,
+    ) -> FileDTO:
         if not filename:
             filename = utils.generate_random_filename()
 
+        blob_id = await self._acquire_blob(contents, content_hash, size, content_type)
+
         resource = Resource(
-            id=file_id,
+            id=uuid.uuid4(),
             user_id=self.context.user_id,
+            blob_id=blob_id,
             filename=filename,
             content_type=content_type,
-            storage_path=file_path,
         )
-
         resource = await self.resource_repo.add(resource)
 
-        await self.cloud_storage_service.upload_file(
-            f"attachments/{self.context.user_id}/{file_path}",
-            contents,
-            {"content_type": content_type, "file_name": filename},
-        )
-        return FileDTO(file_id=file_id, filename=filename, content_type=content_type)
+        return FileDTO(file_id=resource.id, filename=filename, content_type=content_type)
+
+    async def upload_file(
+            self, contents: bytes, content_type: str, filename: Optional[str] = None
+    ) -> FileDTO:
+        self._ensure_upload_size(len(contents))
+        content_hash = hashlib.sha256(contents).hexdigest()
+        return await self._store_file(contents, content_hash, len(contents), content_type, filename)
+
+    async def upload_file_stream(
+            self, chunks: AsyncIterator[bytes], content_type: str, filename: Optional[str] = None
+    ) -> FileDTO:
+        """
+        Upload a file from an async stream of chunks.
+        The size limit is enforced and the content hash computed while reading. Chunks are spooled to disk
+        past FILE_CHUNK_SIZE, so memory per upload is bounded by the chunk size.
+        """
+        hasher = hashlib.sha256()
+        with tempfile.SpooledTemporaryFile(max_size=settings.FILE_CHUNK_SIZE) as spool:
+            size = 0
+            async for chunk in chunks:
+                size += len(chunk)
+                self._ensure_upload_size(size)
+                hasher.update(chunk)
+                spool.write(chunk)
+
+            spool.seek(0)
+            return await self._store_file(spool, hasher.hexdigest(), size, content_type, filename)
+
+    async def _read_resource(self, resource: Resource) -> bytes:
+        cache_key = self._get_cache_key(str(resource.id))
+        if self.attachment_cache and (cached := await self.attachment_cache.get(cache_key)):
+            return cached.data
+
+        data = await self.cloud_storage_service.get_file(self._get_object_path(resource))
+        if self.attachment_cache:
+            await self.attachment_cache.put(cache_key, resource.filename, resource.content_type, data)
+        return data
 
     async def get_file(self, file_id: str) -> FileDataDTO:
-        filter = and_(Resource.id == file_id, Resource.user_id == self.context.user_id)
-        resource = await self.resource_repo.get(filter=filter)
+        cache_key = self._get_cache_key(file_id)
+        if self.attachment_cache and (cached := await self.attachment_cache.get(cache_key)):
+            return FileDataDTO(file_id=file_id, filename=cached.filename, content_type=cached.content_type, data=cached.data)
 
-        if not resource:
-            raise errors.NotFoundError(f"File with id {file_id} not found")
+        resource = await self._get_resource(file_id)
 
-        storage_path = resource.storage_path
-        content_type = resource.content_type
+        # The resource row already has the filename, so there is no need to fetch the blob metadata
+        data = await self._read_resource(resource)
 
-        file_data = await self.cloud_storage_service.get_file(
-            f"attachments/{self.context.user_id}/{storage_path}"
-        )
         return FileDataDTO(
             file_id=file_id,
-            filename=file_data["metadata"].get("file_name", str(file_id)),
-            content_type=content_type,
-            data=file_data["data"],
+            filename=resource.filename,
+            content_type=resource.content_type,
+            data=data,
         )
 
-    async def delete_file(self, file_id: str):
-        filter = and_(Resource.id == file_id, Resource.user_id == self.context.user_id)
-        resource = await self.resource_repo.get(filter=filter)
+    async def preprocess_file(self, file_id: str) -> None:
+        """
+        Build the derived artifacts (downscaled images, extracted PDF text, normalized text) for a file's blob.
+        Runs once per blob; legacy resources without a blob are served as uploaded.
+        """
+        resource = await self._get_resource(file_id)
+        blob = resource.blob
+        if blob is None or blob.preprocessed:
+            return
 
-        if not resource:
-            raise errors.NotFoundError(f"File with id {file_id} not found")
+        attachment_type = utils.get_attachment_type(resource.content_type)
+        if attachment_type in ("image", "pdf", "text"):
+            data = await self._read_resource(resource)
+            artifacts = await preprocessing.run_preprocessing(attachment_type, data)
+
+            for artifact in artifacts:
+                storage_path = f"{blob.storage_path}.{artifact.kind}"
+                await self.cloud_storage_service.upload_file(
+                    storage_path, artifact.data, {"content_type": artifact.content_type}
+                )
+                stmt = (
+                    insert(BlobArtifact)
+                    .values(
+                        id=uuid.uuid4(),
+                        blob_id=blob.id,
+                        kind=artifact.kind,
+                        content_type=artifact.content_type,
+                        size=len(artifact.data),
+                        storage_path=storage_path,
+                        max_dimension=artifact.max_dimension,
+                    )
+                    .on_conflict_do_nothing(constraint="uq_blob_artifact_kind")
+                )
+                await self.blob_artifact_repo.session.execute(stmt)
+
+        blob.preprocessed = True
+        await self.blob_repo.update(blob)
+
+    async def _select_artifact(
+        self, resource: Resource, capabilities: AttachmentCapabilitiesDTO
+    ) -> Optional[BlobArtifact]:
+        """Pick the cheapest artifact the model accepts, None to send the original file."""
+        attachment_type = utils.get_attachment_type(resource.content_type)
+        if resource.blob is None or not resource.blob.preprocessed:
+            return None
+        if attachment_type == "pdf" and capabilities.supports_pdf:
+            return None
+        if attachment_type not in ("image", "pdf", "text"):
+            return None
+
+        artifacts = await self.blob_artifact_repo.select(filter=BlobArtifact.blob_id == resource.blob_id)
 
-        storage_path = resource.storage_path
+        if attachment_type == "image":
+            images = sorted((a for a in artifacts if a.max_dimension), key=lambda a: a.max_dimension)
+            if not images:
+                return None  # the original is already within every limit
+            max_dimension = capabilities.max_image_dimension or constants.DEFAULT_VISION_MAX_IMAGE_DIMENSION
+            fitting = [a for a in images if a.max_dimension <= max_dimension]
+            return fitting[-1] if fitting else images[0]
 
-        await self.cloud_storage_service.delete_file(
-            f"attachments/{self.context.user_id}/{storage_path}"
+        kind = preprocessing.PDF_TEXT_ARTIFACT if attachment_type == "pdf" else preprocessing.TEXT_UTF8_ARTIFACT
+        return next((a for a in artifacts if a.kind == kind), None)
+
+    async def get_prepared_file(
+        self, file_id: str, capabilities: Optional[AttachmentCapabilitiesDTO] = None
+    ) -> Optional[dict]:
+        """
+        Return the attachment as a message content part for a model with the given capabilities,
+        or None when the model cannot take it at all. Prepared parts are cached per capability variant.
+        """
+        capabilities = capabilities or AttachmentCapabilitiesDTO()
+        cache_key = self._get_cache_key(file_id)
+        if self.attachment_cache:
+            cached = await self.attachment_cache.get_prepared(cache_key, capabilities.cache_key)
+            if cached:
+                return cached
+
+        resource = await self._get_resource(file_id)
+        attachment_type = utils.get_attachment_type(resource.content_type)
+        if attachment_type == "image" and not capabilities.supports_vision:
+            return None
+
+        artifact = await self._select_artifact(resource, capabilities)
+        if artifact is not None:
+            data = await self.cloud_storage_service.get_file(artifact.storage_path)
+            part = utils.prepare_file(artifact.content_type, data)
+        else:
+            data = await self._read_resource(resource)
+            part = utils.prepare_file(resource.content_type, data)
+
+        # Until the background preprocessing finishes the original is used, which must not stick in the cache
+        if self.attachment_cache and (resource.blob is None or resource.blob.preprocessed):
+            await self.attachment_cache.put_prepared(
+                cache_key, capabilities.cache_key, resource.filename, resource.content_type, part
+            )
+
+        return part
+
+    async def get_file_info(self, file_id: str) -> FileInfoDTO:
+        resource = await self._get_resource(file_id)
+        object_path = self._get_object_path(resource)
+
+        if resource.blob is not None:
+            size = resource.blob.size
+            etag = f'"{resource.blob.content_hash}"'
+        else:
+            size = await self.cloud_storage_service.get_file_size(object_path)
+            etag = f'"{resource.id}"'  # legacy objects are never overwritten, so the id is a strong validator
+
+        return FileInfoDTO(
+            file_id=resource.id,
+            filename=resource.filename,
+            content_type=resource.content_type,
+            size=size,
+            etag=etag,
+            object_path=object_path,
         )
+
+    def stream_file(self, file_info: FileInfoDTO, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Stream file contents; does not touch the database, so it is safe to consume after the request session closes."""
+        return self.cloud_storage_service.get_file_stream(file_info.object_path, start=start, end=end)
+
+    async def delete_file(self, file_id: str) -> List[str]:
+        """
+        Delete the file's resource and release its blob. Returns the paths of the stored objects no longer
+        referenced, delete them after the transaction commits with delete_stored_objects, e.g. as a background task.
+        """
+        resource = await self._get_resource(file_id)
+        blob_id = resource.blob_id
+        legacy_path = self._get_object_path(resource) if blob_id is None else None
+
+        if self.attachment_cache:
+            await self.attachment_cache.invalidate(self._get_cache_key(file_id))
+
         await self.resource_repo.delete(resource)
+
+        if blob_id is None:
+            return [legacy_path]
+        return await self._release_blob(blob_id)
+
+    async def delete_stored_objects(self, paths: List[str]) -> None:
+        for path in paths:
+            await self.cloud_storage_service.delete_file(path)
@@ -0,0 +1,147 @@
+"""
+Upload-time attachment preprocessing.
+
+The functions in this module are CPU bound and run in a process pool, so they must stay picklable
+and must not touch the database, the event loop or any request state.
+"""
+import asyncio
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional
+
+from src.config import settings
+from src.logging.logging_config import get_logger
+from src.utils import constants
+
+logger = get_logger(__name__)
+
+IMAGE_ARTIFACT_PREFIX = "image_"
+PDF_TEXT_ARTIFACT = "pdf_text"
+TEXT_UTF8_ARTIFACT = "text_utf8"
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+class ArtifactResult(NamedTuple):
+    kind: str
+    content_type: str
+    data: bytes
+    max_dimension: Optional[int] = None
+
+
+def get_image_artifact_dimensions() -> List[int]:
+    dimensions = set(constants.VISION_MAX_IMAGE_DIMENSIONS.values())
+    dimensions.add(constants.DEFAULT_VISION_MAX_IMAGE_DIMENSION)
+    return sorted(dimensions)
+
+
+def _downscale_images(data: bytes, dimensions: List[int]) -> List[ArtifactResult]:
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        logger.warning("Pillow is not installed, skipping image preprocessing")
+        return []
+
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+
+        results = []
+        for dimension in dimensions:
+            if max(image.size) <= dimension:
+                break  # dimensions are sorted, every remaining one would just re-encode the original size
+
+            resized = image.copy()
+            resized.thumbnail((dimension, dimension), Image.Resampling.LANCZOS)
+
+            output = io.BytesIO()
+            if has_alpha:
+                resized.save(output, format="PNG", optimize=True)
+                content_type = "image/png"
+            else:
+                resized.convert("RGB").save(output, format="JPEG", quality=settings.IMAGE_ARTIFACT_QUALITY, optimize=True)
+                content_type = "image/jpeg"
+
+            if output.tell() >= len(data):
+                continue  # recompression did not help, the original is cheaper
+
+            results.append(
+                ArtifactResult(
+                    kind=f"{IMAGE_ARTIFACT_PREFIX}{dimension}",
+                    content_type=content_type,
+                    data=output.getvalue(),
+                    max_dimension=dimension,
+                )
+            )
+        return results
+
+
+def _extract_pdf_text(data: bytes) -> List[ArtifactResult]:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        logger.warning("pypdf is not installed, skipping PDF text extraction")
+        return []
+
+    reader = PdfReader(io.BytesIO(data))
+    pages = [page.extract_text() or "" for page in reader.pages]
+    text = "\n\n".join(page.strip() for page in pages if page.strip())
+    if not text:
+        return []  # scanned PDF without a text layer
+
+    return [ArtifactResult(kind=PDF_TEXT_ARTIFACT, content_type="text/plain; charset=utf-8", data=text.encode("utf-8"))]
+
+
+def _normalize_text(data: bytes) -> List[ArtifactResult]:
+    for encoding in ("utf-8-sig", "utf-8"):
+        try:
+            text = data.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        from charset_normalizer import from_bytes
+
+        best = from_bytes(data).best()
+        text = str(best) if best else data.decode("latin-1")
+
+    text = text.replace("\r\n", "\n")
+    return [ArtifactResult(kind=TEXT_UTF8_ARTIFACT, content_type="text/plain; charset=utf-8", data=text.encode("utf-8"))]
+
+
+def build_artifacts(attachment_type: str, data: bytes, image_dimensions: List[int]) -> List[ArtifactResult]:
+    """Entry point executed in the worker process."""
+    if attachment_type == "image":
+        return _downscale_images(data, image_dimensions)
+    elif attachment_type == "pdf":
+        return _extract_pdf_text(data)
+    elif attachment_type == "text":
+        return _normalize_text(data)
+    return []
+
+
+def get_preprocessing_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Forking the server would copy its event loop and the locks held by its threads (DB pools, telemetry
+        # exporters) into the workers, they start from a clean process instead
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.PREPROCESSING_WORKERS, mp_context=multiprocessing.get_context(start_method)
+        )
+    return _pool
+
+
+def shutdown_preprocessing_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def run_preprocessing(attachment_type: str, data: bytes) -> List[ArtifactResult]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_preprocessing_pool(), build_artifacts, attachment_type, data, get_image_artifact_dimensions()
+    )
@@ -0,0 +1,26 @@
+from functools import lru_cache
+
+from src.services.files.storage.base_storage import StorageBackend
+
+from src.config import settings
+
+
+@lru_cache()
+def get_storage_backend() -> StorageBackend:
+    """Process-wide storage backend, selected by STORAGE_BACKEND."""
+    if settings.STORAGE_BACKEND == "local":
+        from src.services.files.storage.local_storage import LocalStorageBackend
+
+        return LocalStorageBackend(settings.LOCAL_STORAGE_PATH)
+    elif settings.STORAGE_BACKEND == "gcs":
+        from src.services.files.storage.gcs_storage import GcsStorageBackend
+
+        return GcsStorageBackend(settings.GCP_BUCKET_NAME)
+
+    raise ValueError(f"Unknown storage backend: {settings.STORAGE_BACKEND}")
+
+
+__all__ = [
+    "StorageBackend",
+    "get_storage_backend",
+]
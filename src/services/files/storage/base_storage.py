@@ -0,0 +1,43 @@
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, BinaryIO, Optional, Union
+
+
+class StorageBackend(ABC):
+    """Base abstract class for all object storage backends."""
+
+    @abstractmethod
+    async def upload(
+        self,
+        path: str,
+        contents: Union[bytes, BinaryIO],
+        content_type: Optional[str] = None,
+        metadata: Optional[dict] = None,
+    ) -> str:
+        """Store the contents (bytes or a readable file object) under the given path and return the path."""
+        pass
+
+    @abstractmethod
+    async def download(self, path: str) -> bytes:
+        """Return the contents stored under the given path."""
+        pass
+
+    @abstractmethod
+    def download_stream(
+        self, path: str, start: int = 0, end: Optional[int] = None, chunk_size: int = 256 * 1024
+    ) -> AsyncIterator[bytes]:
+        """Yield the bytes in the inclusive range [start, end] in chunks of at most chunk_size."""
+        pass
+
+    @abstractmethod
+    async def get_size(self, path: str) -> int:
+        """Return the size of the object in bytes."""
+        pass
+
+    @abstractmethod
+    async def delete(self, path: str) -> bool:
+        """Delete the object under the given path, returns False if it could not be deleted."""
+        pass
+
+    async def close(self) -> None:
+        """Release any resources (sessions, file handles) held by the backend."""
+        pass
@@ -0,0 +1,103 @@
+import asyncio
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Optional, Union
+
+from src.services.files.storage.base_storage import StorageBackend
+
+from src.logging.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Local filesystem backend, used for tests and local deployments without the GCS emulator.
+    The blocking file IO runs in worker threads, off the event loop.
+    """
+
+    METADATA_SUFFIX = ".meta.json"
+    COPY_BUFFER_SIZE = 256 * 1024
+
+    def __init__(self, root_path: str):
+        self.root = Path(root_path).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _resolve(self, path: str) -> Path:
+        full_path = (self.root / path).resolve()
+        # Never allow paths to escape the storage root
+        if not full_path.is_relative_to(self.root):
+            raise ValueError(f"Invalid storage path: {path}")
+        return full_path
+
+    def _write(
+        self,
+        full_path: Path,
+        contents: Union[bytes, BinaryIO],
+        content_type: Optional[str],
+        metadata: Optional[dict],
+    ) -> None:
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temporary file first so readers never see a partially written object
+        tmp_path = full_path.with_name(f".{full_path.name}.tmp")
+        with open(tmp_path, "wb") as f:
+            if isinstance(contents, (bytes, bytearray, memoryview)):
+                f.write(contents)
+            else:
+                shutil.copyfileobj(contents, f, self.COPY_BUFFER_SIZE)
+        os.replace(tmp_path, full_path)
+
+        if metadata or content_type:
+            meta_path = full_path.with_name(full_path.name + self.METADATA_SUFFIX)
+            meta_path.write_text(json.dumps({"content_type": content_type, "metadata": metadata or {}}))
+
+    async def upload(
+        self,
+        path: str,
+        contents: Union[bytes, BinaryIO],
+        content_type: Optional[str] = None,
+        metadata: Optional[dict] = None,
+    ) -> str:
+        await asyncio.to_thread(self._write, self._resolve(path), contents, content_type, metadata)
+        return path
+
+    async def download(self, path: str) -> bytes:
+        return await asyncio.to_thread(self._resolve(path).read_bytes)
+
+    async def download_stream(
+        self, path: str, start: int = 0, end: Optional[int] = None, chunk_size: int = 256 * 1024
+    ) -> AsyncIterator[bytes]:
+        full_path = self._resolve(path)
+
+        fd = await asyncio.to_thread(os.open, full_path, os.O_RDONLY)
+        try:
+            size = os.fstat(fd).st_size
+            last = size - 1 if end is None else min(end, size - 1)
+            position = start
+            while position <= last:
+                chunk = await asyncio.to_thread(os.pread, fd, min(chunk_size, last + 1 - position), position)
+                if not chunk:
+                    return
+                yield chunk
+                position += len(chunk)
+        finally:
+            os.close(fd)
+
+    async def get_size(self, path: str) -> int:
+        return (await asyncio.to_thread(self._resolve(path).stat)).st_size
+
+    def _delete(self, full_path: Path) -> None:
+        full_path.unlink()
+        full_path.with_name(full_path.name + self.METADATA_SUFFIX).unlink(missing_ok=True)
+
+    async def delete(self, path: str) -> bool:
+        full_path = self._resolve(path)
+        try:
+            await asyncio.to_thread(self._delete, full_path)
+            return True
+        except OSError as e:
+            logger.warning(f"Failed to delete {path} from local storage: {str(e)}")
+            return False
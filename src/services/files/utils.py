@@ -19,11 +19,17 @@ def generate_random_filename() -> str:
     return ''.join(random.choices(string.ascii_letters + string.digits, k=8))
 
 
-def prepare_file(content_type: str, file_data: bytes) -> dict:
+def encode_data_url(content_type: str, file_data: bytes) -> str:
     encoded_file = base64.b64encode(file_data).decode("utf-8")
-    base64_url = f"data:{content_type};base64,{encoded_file}"
+    return f"data:{content_type};base64,{encoded_file}"
+
+
+def prepare_file(content_type: str, file_data: bytes) -> dict:
+    """Build the message content part for an attachment, text files are inlined without being encoded."""
     attachment_type = get_attachment_type(content_type)
-    
+    if attachment_type != "text":
+        base64_url = encode_data_url(content_type, file_data)
+
     if attachment_type == "image":
         return {
             "type": "image_url",
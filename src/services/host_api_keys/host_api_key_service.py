@@ -1,6 +1,8 @@
 from typing import List, Optional
 from uuid import UUID
 
+from sqlalchemy import bindparam, select
+
 from src.services.common.context import Context
 from src.services.common.decorators import convert_to_dto
 from src.services.common.errors import BadRequestError, NotFoundError
@@ -10,6 +12,10 @@ from src.services.host_api_keys.encryption import ApiKeyEncryption
 from src.storage.base_repo import BaseRepository
 from src.storage.models.host_api_key import HostApiKey
 
+# BYOK lookups of every model resolution, built once, see BaseRepository.fetch_one
+ACTIVE_KEYS = select(HostApiKey).where(HostApiKey.user_id == bindparam("user_id"), HostApiKey.is_active == True)
+ACTIVE_KEY_FOR_HOST = ACTIVE_KEYS.where(HostApiKey.host_id == bindparam("host_id"))
+
 
 class HostApiKeyService:
     def __init__(self, context: Context, host_api_key_repo: BaseRepository[HostApiKey]):
@@ -82,17 +88,11 @@ class HostApiKeyService:
         )
 
     async def get_user_host_ids_with_active_keys(self) -> set[UUID]:
-        api_keys = await self.host_api_key_repo.select(
-            filter=(HostApiKey.user_id == self.context.user_id) & (HostApiKey.is_active == True)
-        )
+        api_keys = await self.host_api_key_repo.fetch_all(ACTIVE_KEYS, user_id=self.context.user_id)
         return {key.host_id for key in api_keys}
 
     async def get_user_api_key_for_host(self, host_id: UUID) -> Optional[str]:
-        api_key = await self.host_api_key_repo.get(
-            filter=(HostApiKey.user_id == self.context.user_id) & 
-                   (HostApiKey.host_id == host_id) & 
-                   (HostApiKey.is_active == True)
-        )
+        api_key = await self.host_api_key_repo.fetch_one(ACTIVE_KEY_FOR_HOST, user_id=self.context.user_id, host_id=host_id)
         if api_key:
             return self._encryption.decrypt(api_key.encrypted_key)
         return None
\ No newline at end of file
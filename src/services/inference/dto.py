@@ -16,6 +16,7 @@ class ThinkingContentDTO(BaseModel):
 class StreamGenerationDTO(BaseModel):
     text: Optional[str] = None
     usage: Optional[Dict[UUID, TokenUsageDTO]] = None
+    cost_usd: Optional[float] = None  # total cost of the response, sent with the usage in the last chunk
 
     tools_calls: Optional[List[str]] = None
 
@@ -5,6 +5,7 @@ from fastapi import BackgroundTasks
 from src.services.background_tasks.background_task_service import BackgroundTaskService
 from src.services.budget.budget_service import BudgetService
 from src.services.common.context import Context
+from src.services.files.dto import AttachmentCapabilitiesDTO
 from src.services.inference.dto import DefaultResponseGenerationOptionsDTO, StreamGenerationDTO, TextGenerationDTO
 from src.services.inference.model_provider import ModelProvider
 from src.services.usage_tracking.dto import TokenUsageDTO
@@ -29,9 +30,26 @@ class InferenceService:
         self._background_task_service = background_task_service
         self._budget_service = budget_service
 
-    async def _ensure_budget(self, model: AiProviderModelDTO, usage: TokenUsageDTO) -> None:
-        total_cost_usd = await self._models_provider.cost_per_token(model, usage)
-        await self._budget_service.add_usage(total_cost_usd)
+    async def _track_usage(
+        self,
+        model_id: Any,
+        model: Optional[AiProviderModelDTO],
+        usage: TokenUsageDTO,
+        background_tasks: BackgroundTasks,
+    ) -> float:
+        """Queue the usage tracking of one model's response and return its cost, 0 for a model not priced here."""
+        cost_usd = await self._models_provider.cost_per_token(model, usage) if model else 0.0
+        background_tasks.add_task(
+            self._background_task_service.track_model_usage,
+            user_id=self._context.user_id,
+            model_id=model_id,
+            usage=usage,
+            cost_usd=cost_usd,
+        )
+        return cost_usd
+
+    async def get_attachment_capabilities(self, model: AiProviderModelDTO) -> AttachmentCapabilitiesDTO:
+        return await self._models_provider.get_attachment_capabilities(model)
 
     async def generate_response(
         self,
@@ -48,19 +66,14 @@ class InferenceService:
             **kwargs,
         )
 
-        # Track usage for each model separately
+        # Track usage for each model separately, before the budget check that may raise
+        total_cost_usd = 0.0
         for model_id, usage in resp.usage.items():
-            background_tasks.add_task(
-                self._background_task_service.track_model_usage,
-                user_id=self._context.user_id,
-                model_id=model_id,
-                usage=usage,
-            )
-
-            # Ensure budget for each model - for single model case, should be the same model
-            if model_id == model.id:
-                await self._ensure_budget(model, usage)
+            # Only the requested model is charged to the budget
+            charged_model = model if model_id == model.id else None
+            total_cost_usd += await self._track_usage(model_id, charged_model, usage, background_tasks)
 
+        await self._budget_service.add_usage(total_cost_usd)
         return resp
 
     async def generate_response_stream(
@@ -79,26 +92,25 @@ class InferenceService:
             **kwargs,
         ):
             if chunk.usage:
+                # Held back and sent last, together with the cost of the response
                 usage_by_model = chunk.usage
+                continue
             yield chunk
 
-        # Track usage for each model separately
+        # Track usage for each model separately, before the budget check that may raise
         if usage_by_model:
+            total_cost_usd = 0.0
             for model_id, usage in usage_by_model.items():
-                background_tasks.add_task(
-                    self._background_task_service.track_model_usage,
-                    user_id=self._context.user_id,
-                    model_id=model_id,
-                    usage=usage,
-                )
-
-                # Ensure budget for each model
                 # Find the model DTO for budget calculation
                 model_dto = None
                 if model_id == models_modalities.llm.id:
                     model_dto = models_modalities.llm
-                elif model_id == models_modalities.image_gen.id:
+                elif models_modalities.image_gen and model_id == models_modalities.image_gen.id:
                     model_dto = models_modalities.image_gen
 
-                if model_dto:
-                    await self._ensure_budget(model_dto, usage)
+                total_cost_usd += await self._track_usage(model_id, model_dto, usage, background_tasks)
+
+            yield StreamGenerationDTO(usage=usage_by_model, cost_usd=total_cost_usd)
+
+            # A response crossing the budget is still tracked and stored, the next request is refused
+            await self._budget_service.add_usage(total_cost_usd)
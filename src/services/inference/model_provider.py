@@ -15,7 +15,7 @@ from src.services.common.errors import (
     NoAvailableHostError,
     NotFoundError,
 )
-from src.services.files.dto import FileDTO
+from src.services.files.dto import AttachmentCapabilitiesDTO, FileDTO
 from src.services.files.files_service import FilesService
 from src.services.host_api_keys.host_api_key_service import HostApiKeyService
 from src.services.inference.dto import (
@@ -34,6 +34,7 @@ from src.services.ai_providers.dto import AiModelsModalitiesDTO, AiProviderModel
 
 from src.config import settings
 from src.logging.logging_config import get_logger
+from src.utils import constants
 
 # TODO:
 # - add prompt caching when supported by the model provider
@@ -69,6 +70,19 @@ class ModelProvider:
 
         return model.hosts[0]
 
+    async def get_attachment_capabilities(self, model: AiProviderModelDTO) -> AttachmentCapabilitiesDTO:
+        """What the host that would serve the model accepts, so attachments can be prepared for it up front."""
+        selected_host = await self._select_available_host(model)
+        model_slug = selected_host.model_slug
+
+        return AttachmentCapabilitiesDTO(
+            supports_vision=litellm_utils.supports_vision(model_slug),
+            supports_pdf=litellm_utils.supports_pdf_input(model_slug),
+            max_image_dimension=constants.VISION_MAX_IMAGE_DIMENSIONS.get(
+                selected_host.slug, constants.DEFAULT_VISION_MAX_IMAGE_DIMENSION
+            ),
+        )
+
     # TODO: this might be a bit slow, we should somehow come up with a better way to do this
     def _prepare_messages(self, messages: List[Dict[str, Any]], model_slug: str) -> List[Dict[str, Any]]:
         if litellm_utils.supports_prompt_caching(model_slug):
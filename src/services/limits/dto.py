@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List
 from uuid import UUID
 
 from pydantic import BaseModel, Field
@@ -14,6 +14,12 @@ class UtilizationDTO(BaseModel):
     percentage: float
 
 
+class UtilizationSnapshotDTO(BaseModel):
+    """Utilization of every limited model of a user, keyed by model id."""
+    utilizations: Dict[UUID, UtilizationDTO]
+    is_team: bool = False  # team groups count the total tokens of every member, individual groups prompt tokens
+
+
 class LimitDTO(BaseModel):
     model_id: UUID
     max_tokens: int
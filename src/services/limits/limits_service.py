@@ -1,7 +1,8 @@
 from typing import Any, Dict, List, Optional
 from uuid import UUID
 
-from sqlalchemy import and_
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.orm import aliased
 
 from src.services.ai_providers.ai_model_service import AiModelService
 from src.services.chats.dto import ChatMessageDTO
@@ -10,16 +11,24 @@ from src.services.common.decorators import convert_to_dto
 from src.services.common.enums import UserGroupType
 from src.services.inference.inference_service import InferenceService
 from src.services.inference.model_provider import ModelProvider
-from src.services.limits.dto import LimitDTO, UtilizationDTO
+from src.services.limits.dto import LimitDTO, UtilizationDTO, UtilizationSnapshotDTO
+from src.services.limits.utilization_cache import get_utilization_cache
+from src.services.usage_tracking.dto import TokenUsageDTO
 from src.services.usage_tracking.usage_tracking_service import UsageTrackingService
 from src.services.user.user_service import UserService
 
 from src.services.ai_providers.dto import AiProviderModelDTO
 
 from src.storage.base_repo import BaseRepository
+from src.storage.models.ai_provider_model import AiProviderModel
 from src.storage.models.limits import Limits
+from src.storage.models.usage import Usage
 from src.storage.models.user import User
 from src.storage.models.user_group import UserGroup
+from src.storage.models.user_group_limits import UserGroupLimits
+
+# A model is over its limit once this share of max_tokens is used
+UTILIZATION_THRESHOLD = 0.9
 
 
 class LimitsService:
@@ -49,7 +58,8 @@ class LimitsService:
         else:
             filter = User.id == self.context.user_id
 
-        return await self.limits_repo.select(
+        return await self.limits_repo.project(
+            LimitDTO,
             joins=[Limits.user_groups, (User, User.group_id == UserGroup.id)],
             filter=filter,
         )
@@ -62,74 +72,156 @@ class LimitsService:
         )
         return results
 
-    @convert_to_dto
-    async def _get_individual_utilization(
-        self,
-        model: AiProviderModelDTO,
-        limits: LimitDTO,
-        messages: Optional[List[Dict[str, Any]]] = None,
-    ) -> UtilizationDTO:
-        usage = await self.usage_tracking_service.get_usage(model.id)
+    def _utilization_query(self, model_ids: Optional[List[UUID]] = None):
+        """
+        Usage against the limit of every limited model of the current user's group, in one query.
+        Individual groups count the user's own prompt tokens, team groups the total tokens of every group member.
+        """
+        member = aliased(User)
+        is_team = UserGroup.type == UserGroupType.TEAM.value
+
+        # One row per model before usage is joined, several limits of a model would multiply its usage.
+        # The strictest one applies
+        group_limits = (
+            select(
+                Limits.model_id,
+                func.min(Limits.max_tokens).label("max_tokens"),
+                UserGroup.id.label("group_id"),
+                is_team.label("is_team"),
+            )
+            .select_from(User)
+            .join(UserGroup, UserGroup.id == User.group_id)
+            .join(UserGroupLimits, UserGroupLimits.user_group_id == UserGroup.id)
+            .join(Limits, Limits.id == UserGroupLimits.limits_id)
+            .where(User.id == self.context.user_id)
+            .group_by(Limits.model_id, UserGroup.id, UserGroup.type)
+        )
+        if model_ids:
+            group_limits = group_limits.where(Limits.model_id.in_(model_ids))
+        group_limits = group_limits.subquery("group_limits")
 
-        input_tokens = 0
-        if messages:
-            input_tokens = await self.model_provider.count_tokens(model, messages)
+        used_tokens = func.coalesce(
+            func.sum(case((group_limits.c.is_team, Usage.total_tokens), else_=Usage.prompt_tokens)), 0
+        )
+        stmt = (
+            select(
+                group_limits.c.model_id,
+                group_limits.c.max_tokens,
+                used_tokens.label("total_tokens"),
+                group_limits.c.is_team,
+            )
+            .select_from(group_limits)
+            .outerjoin(
+                member,
+                and_(
+                    member.group_id == group_limits.c.group_id,
+                    or_(group_limits.c.is_team, member.id == self.context.user_id),
+                ),
+            )
+            .outerjoin(Usage, and_(Usage.user_id == member.id, Usage.model_id == group_limits.c.model_id))
+            .group_by(group_limits.c.model_id, group_limits.c.max_tokens, group_limits.c.is_team)
+        )
+        return stmt
 
-        return UtilizationDTO(
-            model=model,
-            total_tokens=usage.prompt_tokens + input_tokens,
-            percentage=(usage.prompt_tokens + input_tokens) / limits.max_tokens,
+    async def _compute_utilizations(self, model_ids: Optional[List[UUID]] = None) -> UtilizationSnapshotDTO:
+        """Utilization per limited model: one aggregate query plus one batch model load."""
+        rows = (await self.limits_repo.session.execute(self._utilization_query(model_ids))).all()
+        if not rows:
+            return UtilizationSnapshotDTO(utilizations={})
+
+        models = await self.ai_model_service.get_ai_models(
+            only_active=False, custom_filter=AiProviderModel.id.in_([row.model_id for row in rows])
+        )
+        models_by_id = {model.id: model for model in models}
+
+        return UtilizationSnapshotDTO(
+            utilizations={
+                row.model_id: self._to_utilization(models_by_id[row.model_id], int(row.total_tokens), row.max_tokens)
+                for row in rows
+                if row.model_id in models_by_id
+            },
+            is_team=rows[0].is_team,
         )
 
-    async def _get_team_utilization(
-        self,
-        model: AiProviderModelDTO,
-        limits: LimitDTO,
-        messages: Optional[List[Dict[str, Any]]] = None,
-    ) -> UtilizationDTO:
-        group_usages = await self.usage_tracking_service.get_group_usages(model.id)
-        total_tokens = sum(usage.total_tokens for usage in group_usages)
+    async def _get_utilization_snapshot(self) -> UtilizationSnapshotDTO:
+        utilization_cache = get_utilization_cache()
+        if utilization_cache and (cached := utilization_cache.get(self.context.user_id)) is not None:
+            return cached
 
-        input_tokens = 0
-        if messages:
-            input_tokens = await self.model_provider.count_tokens(model, messages)
+        snapshot = await self._compute_utilizations()
 
+        if utilization_cache:
+            utilization_cache.set(self.context.user_id, snapshot)
+        return snapshot
+
+    def _to_utilization(self, model: AiProviderModelDTO, total_tokens: int, max_tokens: int) -> UtilizationDTO:
         return UtilizationDTO(
             model=model,
-            total_tokens=total_tokens + input_tokens,
-            max_tokens=limits.max_tokens,
-            percentage=(total_tokens + input_tokens) / limits.max_tokens,
+            total_tokens=total_tokens,
+            max_tokens=max_tokens,
+            percentage=total_tokens / max_tokens if max_tokens > 0 else float("inf"),
         )
 
     async def get_utilization(self, model_id: UUID, messages: Optional[List[Dict[str, Any]]] = None) -> UtilizationDTO:
-        model = await self.ai_model_service.get_model(model_id)
-
-        limits = await self.get_limits_by_model(model_id)
-        if not limits: # have no limits for this model, so we can't check utilization
+        utilization = (await self._compute_utilizations(model_ids=[model_id])).utilizations.get(model_id)
+        if not utilization: # have no limits for this model, so we can't check utilization
             return UtilizationDTO(
-                model=model,
+                model=await self.ai_model_service.get_model(model_id),
                 max_tokens=-1,
                 percentage=1000, # to fail check utilization
                 total_tokens=-1,
             )
 
-        user = await self.user_service.get_user_by_id(self.context.user_id, user_group=True)
+        input_tokens = 0
+        if messages:
+            input_tokens = await self.model_provider.count_tokens(utilization.model, messages)
+
+        return self._to_utilization(utilization.model, utilization.total_tokens + input_tokens, utilization.max_tokens)
 
-        if user.user_group.type == UserGroupType.INDIVIDUAL:
-            return await self._get_individual_utilization(model, limits, messages)
-        elif user.user_group.type == UserGroupType.TEAM:
-            return await self._get_team_utilization(model, limits, messages)
-        
     async def check_utilization(self, model_id: UUID, messages: Optional[List[Dict[str, Any]]] = None) -> bool:
         utilization = await self.get_utilization(model_id, messages)
-        return utilization.percentage > 0.9
+        return utilization.percentage > UTILIZATION_THRESHOLD
+
+    async def get_exceeded_models(self, model_ids: List[UUID], input_tokens: int) -> List[UUID]:
+        """
+        Pre-flight limit check of several models at once against the cached utilization snapshot, with an estimate
+        of the input tokens instead of an exact count. Models without a limit count as exceeded.
+        """
+        snapshot = await self._get_utilization_snapshot()
+
+        exceeded = []
+        for model_id in model_ids:
+            utilization = snapshot.utilizations.get(model_id)
+            if utilization is None or utilization.max_tokens <= 0:
+                exceeded.append(model_id)
+            elif (utilization.total_tokens + input_tokens) / utilization.max_tokens > UTILIZATION_THRESHOLD:
+                exceeded.append(model_id)
+        return exceeded
+
+    def reconcile_usage(self, usage_by_model: Dict[UUID, TokenUsageDTO]) -> None:
+        """
+        Add the exact usage of a response to the cached snapshot, so the next pre-flight checks see it before
+        the snapshot expires and the usage is re-read from the database.
+        """
+        utilization_cache = get_utilization_cache()
+        snapshot = utilization_cache.get(self.context.user_id) if utilization_cache else None
+        if snapshot is None:
+            return
+
+        for model_id, usage in usage_by_model.items():
+            utilization = snapshot.utilizations.get(model_id)
+            if utilization is None:
+                continue
+            used_tokens = usage.total_tokens if snapshot.is_team else usage.prompt_tokens
+            snapshot.utilizations[model_id] = self._to_utilization(
+                utilization.model, utilization.total_tokens + used_tokens, utilization.max_tokens
+            )
 
     async def get_utilizations(self) -> List[UtilizationDTO]:
-        usages = await self.usage_tracking_service.get_usages()
-        utilizations = []
-        # TODO: make it less hacky
-        for usage in usages:
-            utilization = await self.get_utilization(usage.model_id)
-            if utilization.max_tokens > 0:
-                utilizations.append(utilization)
-        return utilizations
+        """Utilization of every limited model the user (or their team) has used."""
+        snapshot = await self._get_utilization_snapshot()
+        return [
+            utilization
+            for utilization in snapshot.utilizations.values()
+            if utilization.max_tokens > 0 and utilization.total_tokens > 0
+        ]
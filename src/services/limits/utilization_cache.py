@@ -0,0 +1,45 @@
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional, Tuple
+from uuid import UUID
+
+from src.services.limits.dto import UtilizationSnapshotDTO
+
+from src.config import settings
+
+
+class UtilizationCache:
+    """Per-process, per-user cache of utilization snapshots with a short TTL, bounded to max_entries users."""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[UUID, Tuple[float, UtilizationSnapshotDTO]]" = OrderedDict()
+
+    def get(self, user_id: UUID) -> Optional[UtilizationSnapshotDTO]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+
+        expires_at, snapshot = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[user_id]
+            return None
+
+        self._entries.move_to_end(user_id)
+        return snapshot
+
+    def set(self, user_id: UUID, snapshot: UtilizationSnapshotDTO) -> None:
+        self._entries[user_id] = (time.monotonic() + self.ttl, snapshot)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+@lru_cache()
+def get_utilization_cache() -> Optional[UtilizationCache]:
+    """Process-wide utilization cache, None when UTILIZATION_CACHE_TTL is 0."""
+    if settings.UTILIZATION_CACHE_TTL <= 0:
+        return None
+    return UtilizationCache(settings.UTILIZATION_CACHE_TTL, settings.UTILIZATION_CACHE_MAX_USERS)
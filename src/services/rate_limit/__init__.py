@@ -0,0 +1,27 @@
+from functools import lru_cache
+
+from src.services.rate_limit.base_store import RateLimitResult, RateLimitStore
+
+from src.config import settings
+
+
+@lru_cache()
+def get_rate_limit_store() -> RateLimitStore:
+    """Process-wide rate limit store, selected by RATE_LIMIT_BACKEND."""
+    if settings.RATE_LIMIT_BACKEND == "memory":
+        from src.services.rate_limit.memory_store import MemoryRateLimitStore
+
+        return MemoryRateLimitStore(settings.RATE_LIMIT_MAX_KEYS)
+    elif settings.RATE_LIMIT_BACKEND == "postgres":
+        from src.services.rate_limit.postgres_store import PostgresRateLimitStore
+
+        return PostgresRateLimitStore(settings.RATE_LIMIT_CLEANUP_INTERVAL)
+
+    raise ValueError(f"Unknown rate limit backend: {settings.RATE_LIMIT_BACKEND}")
+
+
+__all__ = [
+    "RateLimitResult",
+    "RateLimitStore",
+    "get_rate_limit_store",
+]
@@ -0,0 +1,43 @@
+from abc import ABC, abstractmethod
+from typing import NamedTuple, Tuple
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    retry_after: float = 0.0  # seconds until the next request would be allowed
+    remaining: int = 0
+
+
+class RateLimitStore(ABC):
+    """
+    Base abstract class for rate limit stores.
+
+    Stores implement GCRA (generic cell rate algorithm): each key keeps a single "theoretical arrival time" (TAT)
+    instead of a list of timestamps, so a check is O(1) and allows `limit` requests per `window` seconds
+    with bursts of up to `limit` requests.
+    """
+
+    @abstractmethod
+    async def hit(self, key: str, limit: int, window: float) -> RateLimitResult:
+        """Record a request for the key and return whether it is allowed."""
+        pass
+
+    async def close(self) -> None:
+        """Release the resources held by the store."""
+        pass
+
+
+def gcra(tat: float, now: float, limit: int, window: float) -> Tuple[float, RateLimitResult]:
+    """
+    Apply one request to a TAT and return the new TAT together with the result.
+    A TAT in the past is the same as a fresh key, which is what lets idle keys be dropped at any time.
+    """
+    interval = window / limit
+    new_tat = max(tat, now) + interval
+    allow_at = new_tat - window
+
+    if allow_at > now:
+        return tat, RateLimitResult(allowed=False, retry_after=allow_at - now, remaining=0)
+
+    remaining = int((now - allow_at) / interval)
+    return new_tat, RateLimitResult(allowed=True, remaining=min(remaining, limit - 1))
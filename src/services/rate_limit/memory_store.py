@@ -0,0 +1,32 @@
+import time
+from collections import OrderedDict
+
+from src.services.rate_limit.base_store import RateLimitResult, RateLimitStore, gcra
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """
+    Per-process GCRA store. Keys are kept in access order, expired ones are dropped from the front on every hit
+    and the least recently used key is evicted once max_keys is reached, so memory stays bounded.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+
+    def _evict(self, now: float) -> None:
+        # Amortized O(1): each key is dropped at most once after being inserted
+        while self._tats:
+            key, tat = next(iter(self._tats.items()))
+            if tat > now and len(self._tats) < self.max_keys:
+                break
+            del self._tats[key]
+
+    async def hit(self, key: str, limit: int, window: float) -> RateLimitResult:
+        now = time.monotonic()
+        self._evict(now)
+
+        tat, result = gcra(self._tats.pop(key, now), now, limit, window)
+        if tat > now:
+            self._tats[key] = tat
+        return result
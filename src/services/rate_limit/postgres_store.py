@@ -0,0 +1,70 @@
+import time
+
+from sqlalchemy import text
+
+from src.services.rate_limit.base_store import RateLimitResult, RateLimitStore
+
+from src.storage.db import db_session_manager
+
+from src.logging.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# GCRA as a single upsert, evaluated with the database clock so every replica agrees on "now".
+# The update only happens when the request is allowed; a denied request returns the unchanged TAT instead.
+_HIT_SQL = text(
+    """
+    WITH clock AS (SELECT extract(epoch FROM clock_timestamp())::float8 AS now),
+    upsert AS (
+        INSERT INTO agg_ai.rate_limit_counters AS c (key, tat)
+        SELECT CAST(:key AS text), clock.now + CAST(:interval AS float8) FROM clock
+        ON CONFLICT (key) DO UPDATE
+            SET tat = greatest(c.tat, excluded.tat - :interval) + :interval
+            WHERE greatest(c.tat, excluded.tat - :interval) + :interval - :window <= excluded.tat - :interval
+        RETURNING c.tat, true AS allowed
+    )
+    SELECT upsert.tat, upsert.allowed, clock.now FROM upsert, clock
+    UNION ALL
+    SELECT c.tat, false, clock.now FROM agg_ai.rate_limit_counters c, clock
+    WHERE c.key = :key AND NOT EXISTS (SELECT 1 FROM upsert)
+    """
+)
+
+_CLEANUP_SQL = text("DELETE FROM agg_ai.rate_limit_counters WHERE tat < extract(epoch FROM clock_timestamp())")
+
+
+class PostgresRateLimitStore(RateLimitStore):
+    """
+    GCRA store shared by every replica through the rate_limit_counters table.
+    Expired rows are equivalent to missing ones, so they are deleted in the background every cleanup_interval seconds.
+    If the database is unavailable requests are let through, rate limiting must not take the API down.
+    """
+
+    def __init__(self, cleanup_interval: float = 60.0):
+        self.cleanup_interval = cleanup_interval
+        self._next_cleanup = time.monotonic() + cleanup_interval
+
+    async def _cleanup(self, connection) -> None:
+        if time.monotonic() < self._next_cleanup:
+            return
+        self._next_cleanup = time.monotonic() + self.cleanup_interval
+        await connection.execute(_CLEANUP_SQL)
+
+    async def hit(self, key: str, limit: int, window: float) -> RateLimitResult:
+        interval = window / limit
+        try:
+            async with db_session_manager.connect() as connection:
+                row = (
+                    await connection.execute(_HIT_SQL, {"key": key, "interval": interval, "window": window})
+                ).one()
+                await self._cleanup(connection)
+        except Exception as e:
+            logger.error(f"Rate limit store unavailable, allowing request: {str(e)}")
+            return RateLimitResult(allowed=True, remaining=limit - 1)
+
+        tat, allowed, now = row
+        if not allowed:
+            return RateLimitResult(allowed=False, retry_after=tat + interval - window - now)
+
+        remaining = int((now - (tat - window)) / interval)
+        return RateLimitResult(allowed=True, remaining=min(remaining, limit - 1))
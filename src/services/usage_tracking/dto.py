@@ -15,6 +15,10 @@ class TokenUsageDTO(BaseModel):
     total_tokens: int
 
 
+class UsageCostDTO(TokenUsageDTO):
+    cost_usd: float = 0.0
+
+
 class UsageDTO(TokenUsageDTO):
     user_id: UUID
     model_id: UUID
@@ -25,7 +29,7 @@ class UsageDTO(TokenUsageDTO):
         from_attributes = True
 
 
-class AggregatedUsageItemDTO(TokenUsageDTO):
+class AggregatedUsageItemDTO(UsageCostDTO):
     date: Optional[datetime] = None
     
     model_id: Optional[UUID] = None
@@ -37,4 +41,4 @@ class AggregatedUsageItemDTO(TokenUsageDTO):
 
 class UsageAggregationDTO(BaseModel):
     data: List[AggregatedUsageItemDTO]
-    total: TokenUsageDTO
+    total: UsageCostDTO
@@ -0,0 +1,123 @@
+import asyncio
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy.exc import IntegrityError
+
+from src.services.common.context import Context
+from src.services.usage_tracking.dto import TokenUsageDTO, UsageCostDTO
+from src.services.usage_tracking.usage_tracking_service import UsageTrackingService
+
+from src.storage.base_repo import BaseRepository
+from src.storage.db import db_session_manager
+from src.storage.models.usage import Usage
+
+from src.config import settings
+from src.logging.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class UsageAggregator:
+    """
+    Per-process buffer of token usage. Responses only add to an in-memory total per (user_id, model_id),
+    and the totals are written every flush_interval seconds as a single upsert batch.
+    A failed flush puts its increments back for up to max_attempts flushes, a batch the database rejects as
+    invalid is retried pair by pair and the rejected pairs are dropped. The lifespan flushes whatever is left
+    on shutdown.
+    """
+
+    def __init__(self, flush_interval: float, max_attempts: int):
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._pending: Dict[Tuple[UUID, UUID], UsageCostDTO] = {}
+        self._attempts: Dict[Tuple[UUID, UUID], int] = {}
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, user_id: UUID, model_id: UUID, usage: TokenUsageDTO, cost_usd: float = 0.0) -> None:
+        pending = self._pending.get((user_id, model_id))
+        if pending is None:
+            pending = self._pending[(user_id, model_id)] = UsageCostDTO(prompt_tokens=0, completion_tokens=0, total_tokens=0)
+
+        pending.prompt_tokens += usage.prompt_tokens
+        pending.completion_tokens += usage.completion_tokens
+        pending.total_tokens += usage.total_tokens
+        pending.cost_usd += cost_usd
+
+    def _restore(self, usages: Dict[Tuple[UUID, UUID], UsageCostDTO], error: Exception) -> None:
+        for (user_id, model_id), usage in usages.items():
+            attempts = self._attempts.get((user_id, model_id), 0) + 1
+            if attempts >= self.max_attempts:
+                self._drop(user_id, model_id, usage, error)
+                continue
+            self._attempts[(user_id, model_id)] = attempts
+            self.add(user_id, model_id, usage, usage.cost_usd)
+
+    def _drop(self, user_id: UUID, model_id: UUID, usage: UsageCostDTO, error: Exception) -> None:
+        # The log line is the only record left of the increment, it has all it takes to replay it
+        self._attempts.pop((user_id, model_id), None)
+        logger.error(
+            f"Dropping usage of user {user_id} model {model_id}: prompt_tokens={usage.prompt_tokens} "
+            f"completion_tokens={usage.completion_tokens} total_tokens={usage.total_tokens} "
+            f"cost_usd={usage.cost_usd}: {str(error)}"
+        )
+
+    async def _write(self, usages: Dict[Tuple[UUID, UUID], UsageCostDTO]) -> None:
+        async with db_session_manager.session() as session:
+            usage_service = UsageTrackingService(Context(), BaseRepository(Usage, session))
+            await usage_service.track_usages(usages)
+        for key in usages:
+            self._attempts.pop(key, None)
+
+    async def _write_one_by_one(self, usages: Dict[Tuple[UUID, UUID], UsageCostDTO]) -> None:
+        """Write the pairs of a batch the database rejected separately, to keep all but the invalid ones."""
+        for (user_id, model_id), usage in usages.items():
+            try:
+                await self._write({(user_id, model_id): usage})
+            except IntegrityError as e:
+                self._drop(user_id, model_id, usage, e)
+            except Exception as e:
+                logger.error(f"Error flushing usage of user {user_id} model {model_id}, will retry: {str(e)}")
+                self._restore({(user_id, model_id): usage}, e)
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if not self._pending:
+                return
+
+            usages, self._pending = self._pending, {}
+            try:
+                await self._write(usages)
+            except IntegrityError as e:
+                logger.error(f"Usage batch of {len(usages)} user/model pairs rejected, writing them one by one: {e}")
+                await self._write_one_by_one(usages)
+            except Exception as e:
+                logger.error(f"Error flushing usage for {len(usages)} user/model pairs, will retry: {str(e)}", exc_info=True)
+                self._restore(usages, e)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+@lru_cache()
+def get_usage_aggregator() -> UsageAggregator:
+    """Process-wide usage aggregator, flushed every USAGE_FLUSH_INTERVAL seconds."""
+    return UsageAggregator(settings.USAGE_FLUSH_INTERVAL, settings.USAGE_FLUSH_MAX_ATTEMPTS)
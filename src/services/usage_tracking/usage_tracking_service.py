@@ -1,17 +1,25 @@
-from datetime import datetime
-from typing import List, Optional
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple, Type
 from uuid import UUID
 
-from sqlalchemy import and_, func, select
+from sqlalchemy import and_, func, select, text
+from sqlalchemy.dialects.postgresql import insert
 
 from src.services.common import errors
 from src.services.common.context import Context
 from src.services.common.decorators import convert_to_dto
-from src.services.usage_tracking.dto import AggregatedUsageItemDTO, TokenUsageDTO, UsageAggregationDTO, UsageDTO
+from src.services.usage_tracking.dto import (
+    AggregatedUsageItemDTO,
+    TokenUsageDTO,
+    UsageAggregationDTO,
+    UsageCostDTO,
+    UsageDTO,
+)
 
 from src.storage.base_repo import BaseRepository
 from src.storage.models.ai_provider_model import AiProviderModel
 from src.storage.models.usage import Usage
+from src.storage.models.usage_ledger import UsageDaily, UsageHourly, UsageLedger, UsageRollupMixin
 from src.storage.models.user import User
 
 
@@ -20,26 +28,64 @@ class UsageTrackingService:
         self.context = context
         self.usage_model_repo = usage_model_repo
 
-    async def track_usage(self, user_id: UUID, model_id: UUID, usage: TokenUsageDTO):
-        existing_usage = await self.usage_model_repo.get(filter=and_(Usage.user_id == user_id, Usage.model_id == model_id))
+    async def track_usage(self, user_id: UUID, model_id: UUID, usage: TokenUsageDTO, cost_usd: float = 0.0):
+        await self.track_usages({(user_id, model_id): UsageCostDTO(**usage.model_dump(), cost_usd=cost_usd)})
+
+    async def _upsert_rollup(self, rollup_model: Type[UsageRollupMixin], bucket: datetime, rows: List[dict]):
+        stmt = insert(rollup_model).values([{**row, "bucket": bucket} for row in rows])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[rollup_model.bucket, rollup_model.user_id, rollup_model.model_id],
+            set_={
+                column: getattr(rollup_model, column) + getattr(stmt.excluded, column)
+                for column in ("prompt_tokens", "completion_tokens", "total_tokens", "cost_usd")
+            },
+        )
+        await self.usage_model_repo.session.execute(stmt)
+
+    async def track_usages(self, usages: Dict[Tuple[UUID, UUID], UsageCostDTO]):
+        """
+        Record usage of several (user_id, model_id) pairs in one transaction: the running totals, an append-only
+        ledger row per pair, and the hourly and daily rollups. Every increment is applied by the database,
+        so concurrent writers never lose each other's updates.
+        """
+        if not usages:
+            return
+
+        now = datetime.now(timezone.utc)
+
+        # Sorted so concurrent batches lock the rows in the same order and cannot deadlock
+        rows = [
+            {
+                "user_id": user_id,
+                "model_id": model_id,
+                "prompt_tokens": usage.prompt_tokens,
+                "completion_tokens": usage.completion_tokens,
+                "total_tokens": usage.total_tokens,
+                "cost_usd": usage.cost_usd,
+            }
+            for (user_id, model_id), usage in sorted(usages.items(), key=lambda item: (str(item[0][0]), str(item[0][1])))
+        ]
+
+        token_rows = [{key: value for key, value in row.items() if key != "cost_usd"} for row in rows]
+        stmt = insert(Usage).values(token_rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Usage.user_id, Usage.model_id],
+            set_={
+                "prompt_tokens": Usage.prompt_tokens + stmt.excluded.prompt_tokens,
+                "completion_tokens": Usage.completion_tokens + stmt.excluded.completion_tokens,
+                "total_tokens": Usage.total_tokens + stmt.excluded.total_tokens,
+                "updated_at": func.now(),
+            },
+        )
+        await self.usage_model_repo.session.execute(stmt)
 
-        if existing_usage:
-            # Update existing record by adding new token counts
-            existing_usage.prompt_tokens += usage.prompt_tokens
-            existing_usage.completion_tokens += usage.completion_tokens
-            existing_usage.total_tokens += usage.total_tokens
-            await self.usage_model_repo.update(existing_usage)
-        else:
-            # Create a new record if none exists
-            await self.usage_model_repo.add(
-                Usage(
-                    user_id=user_id,
-                    model_id=model_id,
-                    prompt_tokens=usage.prompt_tokens,
-                    completion_tokens=usage.completion_tokens,
-                    total_tokens=usage.total_tokens,
-                )
-            )
+        await self.usage_model_repo.session.execute(
+            text("SELECT agg_ai.ensure_usage_ledger_partition(:ts)"), {"ts": now}
+        )
+        await self.usage_model_repo.session.execute(insert(UsageLedger).values([{**row, "created_at": now} for row in rows]))
+
+        await self._upsert_rollup(UsageHourly, now.replace(minute=0, second=0, microsecond=0), rows)
+        await self._upsert_rollup(UsageDaily, now.replace(hour=0, minute=0, second=0, microsecond=0), rows)
 
     @convert_to_dto
     async def get_usage(self, model_id: UUID) -> UsageDTO:
@@ -62,6 +108,47 @@ class UsageTrackingService:
             ),
         )
 
+    @staticmethod
+    def _is_aligned(date: Optional[datetime], unit: str) -> bool:
+        """Whether the date is at the start of a UTC hour or day, naive dates are taken as UTC."""
+        if date is None:
+            return True
+        if date.tzinfo is not None:
+            date = date.astimezone(timezone.utc)
+        if unit == "day":
+            return (date.hour, date.minute, date.second, date.microsecond) == (0, 0, 0, 0)
+        return (date.minute, date.second, date.microsecond) == (0, 0, 0)
+
+    def _get_usage_source(
+        self, aggregation: str, start_date: Optional[datetime], end_date: Optional[datetime]
+    ) -> Tuple[Any, Any]:
+        """
+        Pick the coarsest table that can answer the query exactly: a rollup only when both bounds fall on its
+        bucket boundaries, the daily one unless the series is hourly, and the ledger for per-minute series
+        and unaligned ranges. Returns the table and its time column.
+        """
+        if aggregation != "minute":
+            if aggregation != "hour" and self._is_aligned(start_date, "day") and self._is_aligned(end_date, "day"):
+                return UsageDaily, UsageDaily.bucket
+            if self._is_aligned(start_date, "hour") and self._is_aligned(end_date, "hour"):
+                return UsageHourly, UsageHourly.bucket
+        return UsageLedger, UsageLedger.created_at
+
+    @staticmethod
+    def _get_time_filter(
+        source: Any, time_column: Any, start_date: Optional[datetime], end_date: Optional[datetime]
+    ) -> List[Any]:
+        """
+        A rollup bucket holds the usage from its start up to the next bucket, so the bucket starting at end_date
+        is excluded: with aligned bounds it covers the same usage as created_at <= end_date on the ledger.
+        """
+        conditions = []
+        if start_date:
+            conditions.append(time_column >= start_date)
+        if end_date:
+            conditions.append(time_column <= end_date if source is UsageLedger else time_column < end_date)
+        return conditions
+
     async def get_aggregated_usage(
         self,
         aggregation: str,
@@ -70,102 +157,59 @@ class UsageTrackingService:
         user_id: Optional[UUID] = None,
         model_id: Optional[UUID] = None,
     ) -> UsageAggregationDTO:
-        filter_conditions = []
-        if start_date:
-            filter_conditions.append(Usage.created_at >= start_date)
-        if end_date:
-            filter_conditions.append(Usage.created_at <= end_date)
+        source, time_column = self._get_usage_source(aggregation, start_date, end_date)
+
+        filter_conditions = self._get_time_filter(source, time_column, start_date, end_date)
         if user_id:
-            filter_conditions.append(Usage.user_id == user_id)
+            filter_conditions.append(source.user_id == user_id)
         if model_id:
-            filter_conditions.append(Usage.model_id == model_id)
+            filter_conditions.append(source.model_id == model_id)
 
         filter_expr = and_(*filter_conditions) if filter_conditions else True
 
-        columns_to_sum = [Usage.prompt_tokens, Usage.completion_tokens, Usage.total_tokens]
+        columns_to_sum = [source.prompt_tokens, source.completion_tokens, source.total_tokens, source.cost_usd]
+        sums = [func.sum(column).label(column.key) for column in columns_to_sum]
 
         total_result = await self.usage_model_repo.get_total(columns_to_sum=columns_to_sum, filter=filter_expr)
 
-        total = TokenUsageDTO(
+        total = UsageCostDTO(
             prompt_tokens=total_result.get("prompt_tokens", 0) or 0,
             completion_tokens=total_result.get("completion_tokens", 0) or 0,
             total_tokens=total_result.get("total_tokens", 0) or 0,
+            cost_usd=total_result.get("cost_usd", 0) or 0,
         )
 
         if aggregation in ["minute", "hour", "day", "week", "month"]:
             period = aggregation
-            date_trunc = func.date_trunc(period, Usage.created_at).label("date")
-
-            select_columns = [
-                date_trunc,
-                func.sum(Usage.prompt_tokens).label("prompt_tokens"),
-                func.sum(Usage.completion_tokens).label("completion_tokens"),
-                func.sum(Usage.total_tokens).label("total_tokens"),
-            ]
-
-            results = await self.usage_model_repo.select(columns=select_columns, filter=filter_expr, group_by=[date_trunc], order_by=date_trunc, as_dict=True)
-
-            data = [
-                AggregatedUsageItemDTO(
-                    date=item.get("date"),
-                    prompt_tokens=item.get("prompt_tokens", 0),
-                    completion_tokens=item.get("completion_tokens", 0),
-                    total_tokens=item.get("total_tokens", 0),
-                )
-                for item in results
-            ]
+            date_trunc = func.date_trunc(period, time_column).label("date")
 
-        elif aggregation == "model":
-            select_columns = [
-                Usage.model_id,
-                AiProviderModel.name.label("model_name"),
-                func.sum(Usage.prompt_tokens).label("prompt_tokens"),
-                func.sum(Usage.completion_tokens).label("completion_tokens"),
-                func.sum(Usage.total_tokens).label("total_tokens"),
-            ]
+            results = await self.usage_model_repo.select(
+                columns=[date_trunc, *sums], filter=filter_expr, group_by=[date_trunc], order_by=date_trunc, as_dict=True
+            )
 
+            data = [AggregatedUsageItemDTO(**item) for item in results]
+
+        elif aggregation == "model":
             results = await self.usage_model_repo.select(
-                columns=select_columns,
-                joins=[(AiProviderModel, Usage.model_id == AiProviderModel.id)],
+                columns=[source.model_id, AiProviderModel.name.label("model_name"), *sums],
+                joins=[(AiProviderModel, source.model_id == AiProviderModel.id)],
                 filter=filter_expr,
-                group_by=[Usage.model_id, AiProviderModel.name],
+                group_by=[source.model_id, AiProviderModel.name],
                 as_dict=True,
             )
 
-            data = [
-                AggregatedUsageItemDTO(
-                    model_id=item.get("model_id"),
-                    model_name=item.get("model_name"),
-                    prompt_tokens=item.get("prompt_tokens", 0),
-                    completion_tokens=item.get("completion_tokens", 0),
-                    total_tokens=item.get("total_tokens", 0),
-                )
-                for item in results
-            ]
+            data = [AggregatedUsageItemDTO(**item) for item in results]
 
         elif aggregation == "user":
-            select_columns = [
-                Usage.user_id,
-                User.email.label("user_email"),
-                func.sum(Usage.prompt_tokens).label("prompt_tokens"),
-                func.sum(Usage.completion_tokens).label("completion_tokens"),
-                func.sum(Usage.total_tokens).label("total_tokens"),
-            ]
-
             results = await self.usage_model_repo.select(
-                columns=select_columns, joins=[(User, Usage.user_id == User.id)], filter=filter_expr, group_by=[Usage.user_id, User.email], as_dict=True
+                columns=[source.user_id, User.email.label("user_email"), *sums],
+                joins=[(User, source.user_id == User.id)],
+                filter=filter_expr,
+                group_by=[source.user_id, User.email],
+                as_dict=True,
             )
 
-            data = [
-                AggregatedUsageItemDTO(
-                    user_id=item.get("user_id"),
-                    user_email=item.get("user_email"),
-                    prompt_tokens=item.get("prompt_tokens", 0),
-                    completion_tokens=item.get("completion_tokens", 0),
-                    total_tokens=item.get("total_tokens", 0),
-                )
-                for item in results
-            ]
+            data = [AggregatedUsageItemDTO(**item) for item in results]
         else:
             raise errors.InvalidInputError(f"Invalid aggregation type: {aggregation}")
 
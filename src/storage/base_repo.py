@@ -1,16 +1,27 @@
+from functools import lru_cache
 from typing import Any, Dict, Generic, List, Optional, Sequence, Tuple, Type, TypeVar, Union
 
-from sqlalchemy import func
+from pydantic import BaseModel
+from sqlalchemy import func, insert, inspect
 from sqlalchemy import select as sqlalchemy_select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
-from sqlalchemy.sql import Select, and_, delete, select, update
+from sqlalchemy.sql import Executable, Select, and_, delete, select, update
 from sqlalchemy.sql.elements import ClauseElement
 
 T = TypeVar("T")
+D = TypeVar("D", bound=BaseModel)
 JoinTarget = Union[Any, Tuple[Any, Any]]
 
 
+@lru_cache(maxsize=None)
+def _projection_columns(model: Type[Any], dto: Type[BaseModel]) -> Tuple[Any, ...]:
+    """The model's columns that share a name with a field of the DTO."""
+    model_columns = inspect(model).columns
+    return tuple(getattr(model, name) for name in dto.model_fields if name in model_columns)
+
+
 class BaseRepository(Generic[T]):
     def __init__(self, model: Type[T], session: AsyncSession):
         self.model = model
@@ -141,6 +152,68 @@ class BaseRepository(Generic[T]):
         else:
             return result.scalars().all()
 
+    async def fetch_one(self, stmt: Executable, **params: Any) -> Optional[T]:
+        """
+        Run a statement built once, e.g. at import with bindparam() placeholders, with the given parameters.
+        Its cache key is memoized on the statement object, so nothing is rebuilt or recompiled per call.
+        """
+        result = await self.session.execute(stmt, params)
+        return result.scalars().first()
+
+    async def fetch_all(self, stmt: Executable, **params: Any) -> List[T]:
+        """Like fetch_one, returning every row."""
+        result = await self.session.execute(stmt, params)
+        return result.scalars().all()
+
+    async def project(
+        self,
+        dto: Type[D],
+        *,
+        columns: Optional[Sequence[Any]] = None,
+        joins: Optional[Sequence[JoinTarget]] = None,
+        filter: Optional[ClauseElement] = None,
+        order_by: Optional[Union[Any, Sequence[Any]]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+    ) -> List[D]:
+        """
+        Select only the columns a DTO needs and build the DTOs straight from the rows, without hydrating
+        entities or going through the identity map.
+
+        Args:
+            dto: DTO class to build, its fields are filled from the result columns of the same name
+            columns: Optional columns to select, defaults to the model's columns named like the DTO's fields
+            joins: Optional sequence of join targets
+            filter: Optional filter condition
+            order_by: Optional ordering (single expression or sequence of expressions)
+            limit: Optional limit for number of results
+            offset: Optional offset for results
+
+        Returns:
+            List of DTOs. They are built with model_construct, so the columns must already have the DTO's types.
+        """
+        stmt = sqlalchemy_select(*(columns or _projection_columns(self.model, dto)))
+        stmt = self._apply_joins(stmt, joins)
+
+        if filter is not None:
+            stmt = stmt.where(filter)
+
+        if order_by is not None:
+            if isinstance(order_by, (list, tuple)):
+                stmt = stmt.order_by(*order_by)
+            else:
+                stmt = stmt.order_by(order_by)
+
+        if limit is not None:
+            stmt = stmt.limit(limit)
+
+        if offset is not None:
+            stmt = stmt.offset(offset)
+
+        result = await self.session.execute(stmt)
+        keys = list(result.keys())
+        return [dto.model_construct(**dict(zip(keys, row))) for row in result.all()]
+
     async def get_total(
         self,
         columns_to_sum: List[Any],
@@ -181,6 +254,56 @@ class BaseRepository(Generic[T]):
         await self.session.refresh(entity)
         return entity
 
+    async def add_many(self, rows: Sequence[Dict[str, Any]]) -> List[T]:
+        """
+        Insert many rows with multi-row INSERT ... RETURNING statements instead of a flush and refresh per entity.
+
+        Args:
+            rows: Column values of each row, give every row the same keys so they go out as one statement
+
+        Returns:
+            The inserted entities in the order of the rows
+        """
+        if not rows:
+            return []
+
+        result = await self.session.scalars(insert(self.model).returning(self.model, sort_by_parameter_order=True), rows)
+        return result.all()
+
+    async def upsert_many(
+        self,
+        rows: Sequence[Dict[str, Any]],
+        index_elements: Sequence[Any],
+        update_columns: Optional[Sequence[str]] = None,
+    ) -> List[T]:
+        """
+        Insert many rows with INSERT ... ON CONFLICT, updating update_columns of the conflicting rows or skipping
+        them when no update_columns are given.
+
+        Args:
+            rows: Column values of each row
+            index_elements: Columns of the unique index the conflicts are detected on
+            update_columns: Optional names of the columns to overwrite with the new values on conflict
+
+        Returns:
+            The inserted and updated entities, rows skipped by DO NOTHING are not returned
+        """
+        if not rows:
+            return []
+
+        stmt = pg_insert(self.model)
+        if update_columns:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=index_elements,
+                set_={column: stmt.excluded[column] for column in update_columns},
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+
+        stmt = stmt.returning(self.model).execution_options(populate_existing=True)
+        result = await self.session.scalars(stmt, rows)
+        return result.all()
+
     async def update(self, entity: T) -> T:
         await self.session.flush()
         await self.session.refresh(entity)
@@ -200,6 +323,14 @@ class BaseRepository(Generic[T]):
         await self.session.execute(stmt)
         await self.session.flush()
 
+    async def commit(self) -> None:
+        """Commit the session's transaction before the unit of work ends, releasing its row locks."""
+        await self.session.commit()
+
+    async def rollback(self) -> None:
+        """Discard the session's uncommitted changes, the unit of work can go on in a new transaction."""
+        await self.session.rollback()
+
     async def exists(self, filter: ClauseElement) -> bool:
         stmt = select(self.model).where(filter).exists()
         result = await self.session.execute(select(stmt))
@@ -1,7 +1,12 @@
 from contextlib import asynccontextmanager
-from typing import AsyncIterator
+from typing import AsyncIterator, Optional
+from uuid import UUID
 
-from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, async_sessionmaker, create_async_engine
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from src.storage.pool_metrics import PRIMARY_POOL, InstrumentedPool, PoolMonitor, track_session
+from src.storage.replicas import REPLICA_SAFE, USER_ID, ReplicaSet, RoutingSession
 
 from src.config import settings
 from src.logging.logging_config import get_logger
@@ -9,31 +14,77 @@ from src.logging.logging_config import get_logger
 logger = get_logger(__name__)
 
 
+def _async_url(database_url: str) -> str:
+    if not database_url.startswith("postgresql+asyncpg://"):
+        database_url = database_url.replace("postgresql://", "postgresql+asyncpg://")
+    return database_url
+
+
+def _create_engine(database_url: str, pool_name: str) -> AsyncEngine:
+    return create_async_engine(
+        _async_url(database_url),
+        echo=False,
+        future=True,
+        poolclass=InstrumentedPool,
+        pool_logging_name=pool_name,
+        pool_pre_ping=True,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        query_cache_size=settings.DB_QUERY_CACHE_SIZE,
+        connect_args={
+            # Per connection cache of asyncpg prepared statements, keyed by SQL text
+            "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+        },
+    )
+
+
 class DatabaseSessionManager:
     def __init__(self):
-        database_url = settings.DATABASE_URL
-        if not database_url.startswith("postgresql+asyncpg://"):
-            database_url = database_url.replace(
-                "postgresql://", "postgresql+asyncpg://"
+        self._engine = _create_engine(settings.DATABASE_URL, PRIMARY_POOL)
+        self._pool_monitor = PoolMonitor(warn_after=settings.DB_SESSION_WARN_SECONDS)
+        self._pool_monitor.instrument(self._engine, PRIMARY_POOL)
+
+        self._replica_set = None
+        if settings.DB_REPLICA_URLS:
+            replica_engines = []
+            for index, url in enumerate(settings.DB_REPLICA_URLS):
+                pool_name = f"replica-{index}"
+                replica_engines.append(_create_engine(url, pool_name))
+                self._pool_monitor.instrument(replica_engines[-1], pool_name)
+
+            self._replica_set = ReplicaSet(
+                replica_engines,
+                max_lag=settings.DB_REPLICA_MAX_LAG,
+                check_interval=settings.DB_REPLICA_CHECK_INTERVAL,
+                sticky_seconds=settings.DB_REPLICA_STICKY_SECONDS,
             )
 
-        self._engine = create_async_engine(
-            database_url,
-            echo=False,
-            future=True,
-            pool_pre_ping=True,
-            pool_recycle=settings.DB_POOL_RECYCLE,
-            pool_size=settings.DB_POOL_SIZE,
-            max_overflow=settings.DB_MAX_OVERFLOW,
-        )
         self._sessionmaker = async_sessionmaker(
-            self._engine, class_=AsyncSession, expire_on_commit=False, autoflush=True
+            self._engine,
+            class_=AsyncSession,
+            sync_session_class=RoutingSession,
+            replica_set=self._replica_set,
+            expire_on_commit=False,
+            autoflush=True,
         )
 
+    def start(self):
+        """
+        Start watching for connections held too long, and tracking the replication lag of the replicas.
+        Reads stay on the primary until a replica passes a check.
+        """
+        self._pool_monitor.start()
+        if self._replica_set is not None:
+            self._replica_set.start()
+
     async def close(self):
         if self._engine is None:
             raise Exception("DatabaseSessionManager is not initialized")
+        await self._pool_monitor.close()
         await self._engine.dispose()
+        if self._replica_set is not None:
+            await self._replica_set.close()
 
         self._engine = None
         self._sessionmaker = None
@@ -51,32 +102,51 @@ class DatabaseSessionManager:
                 raise
 
     @asynccontextmanager
-    async def session(self) -> AsyncIterator[AsyncSession]:
+    async def session(self, user_id: Optional[UUID] = None, route: Optional[str] = None) -> AsyncIterator[AsyncSession]:
+        """
+        Session of a unit of work. Pass the user id of requests, a user whose session wrote reads from
+        the primary for the next DB_REPLICA_STICKY_SECONDS. The connection metrics are labeled with the route.
+        """
         if self._sessionmaker is None:
             raise Exception("DatabaseSessionManager is not initialized")
 
-        session = self._sessionmaker()
-        try:
-            yield session
-            await session.commit()
-        except Exception:
-            await session.rollback()
-            raise
-        finally:
-            await session.close()
+        session = self._sessionmaker(info={USER_ID: user_id})
+        with track_session(route):
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+            finally:
+                await session.close()
 
 
 db_session_manager = DatabaseSessionManager()
 
 
-async def get_db_session():
-    async with db_session_manager.session() as session:
+def route_name(request: Request) -> str:
+    """Path template of the request's route, e.g. /api/chats/{chat_id}, the raw path before routing."""
+    route = request.scope.get("route")
+    return getattr(route, "path", request.url.path)
+
+
+async def get_db_session(request: Request):
+    async with db_session_manager.session(
+        user_id=getattr(request.state, "user_id", None), route=route_name(request)
+    ) as session:
         yield session
 
 
+def replica_reads(db: AsyncSession = Depends(get_db_session)) -> None:
+    """Route dependency marking the reads of the request's session safe to serve from a read replica."""
+    db.info[REPLICA_SAFE] = True
+
+
 @asynccontextmanager
 async def lifespan(app):
     print("Starting up database connection...")
+    db_session_manager.start()
     yield
     print("Shutting down database connection...")
     if db_session_manager._engine is not None:
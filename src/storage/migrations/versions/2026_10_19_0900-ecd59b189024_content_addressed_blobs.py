@@ -0,0 +1,55 @@
+"""content addressed blobs
+
+Revision ID: ecd59b189024
+Revises: 1e5e3e240c23
+Create Date: 2026-10-19 09:00:00.000000-05:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'ecd59b189024'
+down_revision: Union[str, None] = '1e5e3e240c23'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('blobs',
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('storage_path', sa.String(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('content_hash'),
+    sa.UniqueConstraint('storage_path'),
+    schema='agg_ai'
+    )
+    op.create_index(op.f('ix_agg_ai_blobs_id'), 'blobs', ['id'], unique=False, schema='agg_ai')
+
+    op.add_column('resources', sa.Column('blob_id', sa.UUID(), nullable=True), schema='agg_ai')
+    op.create_foreign_key('resources_blob_id_fkey', 'resources', 'blobs', ['blob_id'], ['id'], source_schema='agg_ai', referent_schema='agg_ai')
+    op.create_index(op.f('ix_agg_ai_resources_blob_id'), 'resources', ['blob_id'], unique=False, schema='agg_ai')
+
+    # Resources sharing a blob have no storage path of their own
+    op.drop_constraint('resources_storage_path_key', 'resources', type_='unique', schema='agg_ai')
+    op.alter_column('resources', 'storage_path', existing_type=sa.String(), nullable=True, schema='agg_ai')
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM agg_ai.resources WHERE storage_path IS NULL")
+    op.alter_column('resources', 'storage_path', existing_type=sa.String(), nullable=False, schema='agg_ai')
+    op.create_unique_constraint('resources_storage_path_key', 'resources', ['storage_path'], schema='agg_ai')
+
+    op.drop_index(op.f('ix_agg_ai_resources_blob_id'), table_name='resources', schema='agg_ai')
+    op.drop_constraint('resources_blob_id_fkey', 'resources', type_='foreignkey', schema='agg_ai')
+    op.drop_column('resources', 'blob_id', schema='agg_ai')
+
+    op.drop_index(op.f('ix_agg_ai_blobs_id'), table_name='blobs', schema='agg_ai')
+    op.drop_table('blobs', schema='agg_ai')
@@ -0,0 +1,45 @@
+"""blob artifacts
+
+Revision ID: 00959eaf40d4
+Revises: ecd59b189024
+Create Date: 2026-10-19 10:00:00.000000-05:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '00959eaf40d4'
+down_revision: Union[str, None] = 'ecd59b189024'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('blobs', sa.Column('preprocessed', sa.Boolean(), server_default=sa.false(), nullable=False), schema='agg_ai')
+
+    op.create_table('blob_artifacts',
+    sa.Column('blob_id', sa.UUID(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('content_type', sa.String(), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('storage_path', sa.String(), nullable=False),
+    sa.Column('max_dimension', sa.Integer(), nullable=True),
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['blob_id'], ['agg_ai.blobs.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('blob_id', 'kind', name='uq_blob_artifact_kind'),
+    sa.UniqueConstraint('storage_path'),
+    schema='agg_ai'
+    )
+    op.create_index(op.f('ix_agg_ai_blob_artifacts_id'), 'blob_artifacts', ['id'], unique=False, schema='agg_ai')
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_agg_ai_blob_artifacts_id'), table_name='blob_artifacts', schema='agg_ai')
+    op.drop_table('blob_artifacts', schema='agg_ai')
+    op.drop_column('blobs', 'preprocessed', schema='agg_ai')
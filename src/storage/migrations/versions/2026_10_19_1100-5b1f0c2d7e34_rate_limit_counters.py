@@ -0,0 +1,31 @@
+"""rate limit counters
+
+Revision ID: 5b1f0c2d7e34
+Revises: 00959eaf40d4
+Create Date: 2026-10-19 11:00:00.000000-05:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1f0c2d7e34'
+down_revision: Union[str, None] = '00959eaf40d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('rate_limit_counters',
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('tat', sa.Float(precision=53), nullable=False),
+    sa.PrimaryKeyConstraint('key'),
+    schema='agg_ai',
+    prefixes=['UNLOGGED']
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('rate_limit_counters', schema='agg_ai')
@@ -0,0 +1,47 @@
+"""usage user model unique
+
+Revision ID: 8c3d9a4e1f62
+Revises: 5b1f0c2d7e34
+Create Date: 2026-10-19 12:00:00.000000-05:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '8c3d9a4e1f62'
+down_revision: Union[str, None] = '5b1f0c2d7e34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The old select-then-update tracking could race into duplicate rows, fold them into one before indexing
+    op.execute(
+        """
+        WITH merged AS (
+            SELECT user_id, model_id, (array_agg(id ORDER BY created_at, id))[1] AS keep_id,
+                   sum(prompt_tokens) AS prompt_tokens,
+                   sum(completion_tokens) AS completion_tokens,
+                   sum(total_tokens) AS total_tokens
+            FROM agg_ai.usage
+            GROUP BY user_id, model_id
+            HAVING count(*) > 1
+        ),
+        updated AS (
+            UPDATE agg_ai.usage u
+            SET prompt_tokens = m.prompt_tokens, completion_tokens = m.completion_tokens, total_tokens = m.total_tokens
+            FROM merged m
+            WHERE u.id = m.keep_id
+        )
+        DELETE FROM agg_ai.usage u
+        USING merged m
+        WHERE u.user_id = m.user_id AND u.model_id = m.model_id AND u.id <> m.keep_id
+        """
+    )
+    op.create_index('uq_usage_user_model', 'usage', ['user_id', 'model_id'], unique=True, schema='agg_ai')
+
+
+def downgrade() -> None:
+    op.drop_index('uq_usage_user_model', table_name='usage', schema='agg_ai')
@@ -0,0 +1,120 @@
+"""usage ledger
+
+Revision ID: 2e7a6b0c9d15
+Revises: 8c3d9a4e1f62
+Create Date: 2026-10-19 13:00:00.000000-05:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '2e7a6b0c9d15'
+down_revision: Union[str, None] = '8c3d9a4e1f62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _create_rollup_table(name: str) -> None:
+    op.create_table(name,
+    sa.Column('bucket', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('model_id', sa.UUID(), nullable=False),
+    sa.Column('prompt_tokens', sa.BigInteger(), nullable=False),
+    sa.Column('completion_tokens', sa.BigInteger(), nullable=False),
+    sa.Column('total_tokens', sa.BigInteger(), nullable=False),
+    sa.Column('cost_usd', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['model_id'], ['agg_ai.ai_provider_models.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['agg_ai.users.id'], ),
+    sa.PrimaryKeyConstraint('bucket', 'user_id', 'model_id'),
+    schema='agg_ai'
+    )
+    op.create_index(f'ix_{name}_user_id_bucket', name, ['user_id', 'bucket'], unique=False, schema='agg_ai')
+    op.create_index(f'ix_{name}_model_id_bucket', name, ['model_id', 'bucket'], unique=False, schema='agg_ai')
+
+
+def _backfill_rollup_table(name: str, period: str) -> None:
+    op.execute(
+        f"""
+        INSERT INTO agg_ai.{name} (bucket, user_id, model_id, prompt_tokens, completion_tokens, total_tokens, cost_usd)
+        SELECT date_trunc('{period}', created_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC', user_id, model_id,
+               sum(prompt_tokens), sum(completion_tokens), sum(total_tokens), sum(cost_usd)
+        FROM agg_ai.usage_ledger
+        GROUP BY 1, 2, 3
+        """
+    )
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE TABLE agg_ai.usage_ledger (
+            id UUID NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            user_id UUID NOT NULL REFERENCES agg_ai.users (id),
+            model_id UUID NOT NULL REFERENCES agg_ai.ai_provider_models (id),
+            prompt_tokens BIGINT NOT NULL,
+            completion_tokens BIGINT NOT NULL,
+            total_tokens BIGINT NOT NULL,
+            cost_usd DOUBLE PRECISION NOT NULL,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.create_index('ix_usage_ledger_created_at', 'usage_ledger', ['created_at'], unique=False, schema='agg_ai')
+    op.create_index('ix_usage_ledger_user_id_created_at', 'usage_ledger', ['user_id', 'created_at'], unique=False, schema='agg_ai')
+    op.create_index('ix_usage_ledger_model_id_created_at', 'usage_ledger', ['model_id', 'created_at'], unique=False, schema='agg_ai')
+
+    # Monthly partitions are created on demand by the usage flush, idempotent so replicas can race on it
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION agg_ai.ensure_usage_ledger_partition(ts TIMESTAMP WITH TIME ZONE) RETURNS void AS $$
+        DECLARE
+            month_start TIMESTAMP WITH TIME ZONE := date_trunc('month', ts AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+            partition_name TEXT := 'usage_ledger_' || to_char(ts AT TIME ZONE 'UTC', 'YYYY_MM');
+        BEGIN
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS agg_ai.%I PARTITION OF agg_ai.usage_ledger FOR VALUES FROM (%L) TO (%L)',
+                partition_name, month_start, month_start + interval '1 month'
+            );
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+
+    _create_rollup_table('usage_hourly')
+    _create_rollup_table('usage_daily')
+
+    # The running totals have no history, so each one becomes a single ledger entry at the time it was first recorded
+    op.execute(
+        """
+        SELECT agg_ai.ensure_usage_ledger_partition(month)
+        FROM (SELECT DISTINCT date_trunc('month', coalesce(created_at, now())) AS month FROM agg_ai.usage) months
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO agg_ai.usage_ledger (id, created_at, user_id, model_id, prompt_tokens, completion_tokens, total_tokens, cost_usd)
+        SELECT u.id, coalesce(u.created_at, now()), u.user_id, u.model_id,
+               coalesce(u.prompt_tokens, 0), coalesce(u.completion_tokens, 0), coalesce(u.total_tokens, 0),
+               coalesce(u.prompt_tokens, 0) * m.price_input_token + coalesce(u.completion_tokens, 0) * m.price_output_token
+        FROM agg_ai.usage u
+        JOIN agg_ai.ai_provider_models m ON m.id = u.model_id
+        WHERE u.user_id IS NOT NULL
+        """
+    )
+    _backfill_rollup_table('usage_hourly', 'hour')
+    _backfill_rollup_table('usage_daily', 'day')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_usage_daily_model_id_bucket', table_name='usage_daily', schema='agg_ai')
+    op.drop_index('ix_usage_daily_user_id_bucket', table_name='usage_daily', schema='agg_ai')
+    op.drop_table('usage_daily', schema='agg_ai')
+    op.drop_index('ix_usage_hourly_model_id_bucket', table_name='usage_hourly', schema='agg_ai')
+    op.drop_index('ix_usage_hourly_user_id_bucket', table_name='usage_hourly', schema='agg_ai')
+    op.drop_table('usage_hourly', schema='agg_ai')
+    op.execute("DROP FUNCTION IF EXISTS agg_ai.ensure_usage_ledger_partition(TIMESTAMP WITH TIME ZONE)")
+    op.execute("DROP TABLE IF EXISTS agg_ai.usage_ledger CASCADE")
@@ -0,0 +1,40 @@
+"""budget usage shards
+
+Revision ID: a41c7e5d3b08
+Revises: 2e7a6b0c9d15
+Create Date: 2026-10-19 14:00:00.000000-05:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41c7e5d3b08'
+down_revision: Union[str, None] = '2e7a6b0c9d15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('budget_usage_shards',
+    sa.Column('budget_id', sa.UUID(), nullable=False),
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.Column('usage', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['budget_id'], ['agg_ai.budget.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('budget_id', 'shard'),
+    schema='agg_ai'
+    )
+
+
+def downgrade() -> None:
+    # Fold the shards back into the budget rows so no recorded spend is lost
+    op.execute(
+        """
+        UPDATE agg_ai.budget b SET usage = b.usage + s.usage
+        FROM (SELECT budget_id, sum(usage) AS usage FROM agg_ai.budget_usage_shards GROUP BY budget_id) s
+        WHERE b.id = s.budget_id
+        """
+    )
+    op.drop_table('budget_usage_shards', schema='agg_ai')
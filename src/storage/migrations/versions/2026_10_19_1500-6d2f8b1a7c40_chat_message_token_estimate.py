@@ -0,0 +1,26 @@
+"""chat message token estimate
+
+Revision ID: 6d2f8b1a7c40
+Revises: a41c7e5d3b08
+Create Date: 2026-10-19 15:00:00.000000-05:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '6d2f8b1a7c40'
+down_revision: Union[str, None] = 'a41c7e5d3b08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # No backfill, messages written before this revision are estimated on read
+    op.add_column('chat_messages', sa.Column('token_estimate', sa.Integer(), nullable=True), schema='agg_ai')
+
+
+def downgrade() -> None:
+    op.drop_column('chat_messages', 'token_estimate', schema='agg_ai')
@@ -0,0 +1,33 @@
+"""chat message usage
+
+Revision ID: b83e1d4f9a27
+Revises: 6d2f8b1a7c40
+Create Date: 2026-10-19 16:00:00.000000-05:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'b83e1d4f9a27'
+down_revision: Union[str, None] = '6d2f8b1a7c40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('chat_messages', sa.Column('prompt_tokens', sa.Integer(), nullable=True), schema='agg_ai')
+    op.add_column('chat_messages', sa.Column('completion_tokens', sa.Integer(), nullable=True), schema='agg_ai')
+    op.add_column('chat_messages', sa.Column('cost_usd', sa.Float(), nullable=True), schema='agg_ai')
+    op.add_column('chat_messages', sa.Column('latency_ms', sa.Integer(), nullable=True), schema='agg_ai')
+    op.add_column('chat_messages', sa.Column('ttft_ms', sa.Integer(), nullable=True), schema='agg_ai')
+
+
+def downgrade() -> None:
+    op.drop_column('chat_messages', 'ttft_ms', schema='agg_ai')
+    op.drop_column('chat_messages', 'latency_ms', schema='agg_ai')
+    op.drop_column('chat_messages', 'cost_usd', schema='agg_ai')
+    op.drop_column('chat_messages', 'completion_tokens', schema='agg_ai')
+    op.drop_column('chat_messages', 'prompt_tokens', schema='agg_ai')
@@ -0,0 +1,26 @@
+"""chat list keyset indexes
+
+Revision ID: c5a9e2d7f318
+Revises: b83e1d4f9a27
+Create Date: 2026-10-19 17:00:00.000000-05:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a9e2d7f318'
+down_revision: Union[str, None] = 'b83e1d4f9a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_chats_user_id_pinned_updated_at_id', 'chats', ['user_id', 'pinned', 'updated_at', 'id'], unique=False, schema='agg_ai')
+    op.create_index('ix_chat_messages_chat_id_seq_num_id', 'chat_messages', ['chat_id', 'seq_num', 'id'], unique=False, schema='agg_ai')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chat_messages_chat_id_seq_num_id', table_name='chat_messages', schema='agg_ai')
+    op.drop_index('ix_chats_user_id_pinned_updated_at_id', table_name='chats', schema='agg_ai')
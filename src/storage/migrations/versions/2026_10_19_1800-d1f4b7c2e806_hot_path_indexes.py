@@ -0,0 +1,44 @@
+"""hot path indexes
+
+Revision ID: d1f4b7c2e806
+Revises: c5a9e2d7f318
+Create Date: 2026-10-19 18:00:00.000000-05:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1f4b7c2e806'
+down_revision: Union[str, None] = 'c5a9e2d7f318'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# chats(user_id), chat_messages(chat_id, seq_num) and usage(user_id, model_id) are already covered by
+# ix_chats_user_id_pinned_updated_at_id, ix_chat_messages_chat_id_seq_num_id and uq_usage_user_model,
+# host_api_keys(user_id, host_id) by uq_user_host_api_key, resources(id, user_id) by the primary key on id.
+INDEXES = [
+    # Replies of the same generation batch, and ON DELETE SET NULL of the parent message
+    dict(index_name='ix_chat_messages_previous_message_id', table_name='chat_messages', columns=['previous_message_id'],
+         postgresql_where=sa.text('previous_message_id IS NOT NULL')),
+    # Shared conversation of a chat, and ON DELETE CASCADE from chats
+    dict(index_name='ix_agg_ai_shared_conversations_chat_id', table_name='shared_conversations', columns=['chat_id']),
+    # Foreign key to users, scanned when a user is deleted
+    dict(index_name='ix_agg_ai_resources_user_id', table_name='resources', columns=['user_id']),
+]
+
+
+def upgrade() -> None:
+    # Built concurrently so chat_messages and chats stay writable while the indexes build
+    with op.get_context().autocommit_block():
+        for index in INDEXES:
+            op.create_index(**index, unique=False, schema='agg_ai', postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for index in reversed(INDEXES):
+            op.drop_index(index['index_name'], table_name=index['table_name'], schema='agg_ai',
+                          postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,32 @@
+"""chat seq counter
+
+Revision ID: e7b3c9a1d452
+Revises: d1f4b7c2e806
+Create Date: 2026-10-19 19:00:00.000000-05:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b3c9a1d452'
+down_revision: Union[str, None] = 'd1f4b7c2e806'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('chats', sa.Column('last_seq_num', sa.Integer(), server_default='0', nullable=False), schema='agg_ai')
+    op.execute(
+        """
+        UPDATE agg_ai.chats c SET last_seq_num = m.last_seq_num
+        FROM (SELECT chat_id, max(seq_num) AS last_seq_num FROM agg_ai.chat_messages GROUP BY chat_id) m
+        WHERE c.id = m.chat_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('chats', 'last_seq_num', schema='agg_ai')
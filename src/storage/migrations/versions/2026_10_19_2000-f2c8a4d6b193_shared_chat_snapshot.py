@@ -0,0 +1,28 @@
+"""shared chat snapshot
+
+Revision ID: f2c8a4d6b193
+Revises: e7b3c9a1d452
+Create Date: 2026-10-19 20:00:00.000000-05:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c8a4d6b193'
+down_revision: Union[str, None] = 'e7b3c9a1d452'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing shares have no snapshot yet, it is built on their next view
+    op.add_column('shared_conversations', sa.Column('snapshot', sa.LargeBinary(), nullable=True), schema='agg_ai')
+    op.add_column('shared_conversations', sa.Column('snapshot_etag', sa.String(), nullable=True), schema='agg_ai')
+
+
+def downgrade() -> None:
+    op.drop_column('shared_conversations', 'snapshot_etag', schema='agg_ai')
+    op.drop_column('shared_conversations', 'snapshot', schema='agg_ai')
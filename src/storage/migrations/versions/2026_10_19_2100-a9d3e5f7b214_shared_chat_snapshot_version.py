@@ -0,0 +1,29 @@
+"""shared chat snapshot version
+
+Revision ID: a9d3e5f7b214
+Revises: f2c8a4d6b193
+Create Date: 2026-10-19 21:00:00.000000-05:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d3e5f7b214'
+down_revision: Union[str, None] = 'f2c8a4d6b193'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'shared_conversations',
+        sa.Column('snapshot_version', sa.Integer(), nullable=False, server_default='0'),
+        schema='agg_ai',
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('shared_conversations', 'snapshot_version', schema='agg_ai')
@@ -0,0 +1,29 @@
+"""drop duplicate host api key index
+
+Revision ID: b6e1f8c3d527
+Revises: a9d3e5f7b214
+Create Date: 2026-10-19 22:00:00.000000-05:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e1f8c3d527'
+down_revision: Union[str, None] = 'a9d3e5f7b214'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Left by the first version of d1f4b7c2e806, uq_user_host_api_key already covers every lookup by
+    # (user_id, host_id)
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_host_api_keys_user_id_host_id_active', table_name='host_api_keys', schema='agg_ai',
+                      postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    # Nothing to restore, d1f4b7c2e806 no longer creates the index
+    pass
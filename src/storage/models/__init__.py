@@ -1,15 +1,18 @@
 from .ai_provider import AiProvider
 from .ai_provider_model import AiProviderModel
 from .base import Base
-from .budget import Budget
+from .blob import Blob, BlobArtifact
+from .budget import Budget, BudgetUsageShard
 from .chat import Chat, ChatMessage
 from .host_api_key import HostApiKey
 from .limits import Limits
 from .model_host import ModelHost
 from .model_host_association import ModelHostAssociation
+from .rate_limit import RateLimitCounter
 from .resource import Resource
 from .shared_conversation import SharedConversation
 from .usage import Usage
+from .usage_ledger import UsageDaily, UsageHourly, UsageLedger
 from .user import User
 from .user_group import UserGroup
 from .user_group_limits import UserGroupLimits
@@ -17,6 +20,8 @@ from .white_list import WhiteList
 
 __all__ = [
     "Base",
+    "Blob",
+    "BlobArtifact",
     "AiProvider",
     "AiProviderModel",
     "Chat",
@@ -24,13 +29,18 @@ __all__ = [
     "HostApiKey",
     "User",
     "Usage",
+    "UsageLedger",
+    "UsageHourly",
+    "UsageDaily",
     "Resource",
     "Limits",
     "UserGroup",
     "UserGroupLimits",
     "Budget",
+    "BudgetUsageShard",
     "WhiteList",
     "ModelHost",
     "ModelHostAssociation",
     "SharedConversation",
+    "RateLimitCounter",
 ]
@@ -0,0 +1,40 @@
+from sqlalchemy import BigInteger, Boolean, Column, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID as PGUUID
+from sqlalchemy.orm import relationship
+
+from src.storage.models.base import BaseModel
+
+
+class Blob(BaseModel):
+    """
+    Content-addressed stored object, shared by every Resource with the same contents.
+    ref_count tracks how many resources point at it, the object is deleted when it drops to zero.
+    """
+    __tablename__ = "blobs"
+    __table_args__ = {"schema": "agg_ai"}
+
+    content_hash = Column(String(64), nullable=False, unique=True)  # sha256 hex digest
+    size = Column(BigInteger, nullable=False)
+    storage_path = Column(String, nullable=False, unique=True)
+    ref_count = Column(Integer, nullable=False, default=1)
+    preprocessed = Column(Boolean, nullable=False, default=False)
+
+    artifacts = relationship("BlobArtifact", back_populates="blob", cascade="all, delete-orphan", lazy="noload")
+
+
+class BlobArtifact(BaseModel):
+    """Derived version of a blob (downscaled image, extracted PDF text, ...), stored beside the original."""
+    __tablename__ = "blob_artifacts"
+    __table_args__ = (
+        UniqueConstraint("blob_id", "kind", name="uq_blob_artifact_kind"),
+        {"schema": "agg_ai"},
+    )
+
+    blob_id = Column(PGUUID(as_uuid=True), ForeignKey("agg_ai.blobs.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String, nullable=False)
+    content_type = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    storage_path = Column(String, nullable=False, unique=True)
+    max_dimension = Column(Integer, nullable=True)  # only for image artifacts
+
+    blob = relationship("Blob", back_populates="artifacts", lazy="noload")
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Float
+from sqlalchemy import Column, Float, ForeignKey, Integer
+from sqlalchemy.dialects.postgresql import UUID as PGUUID
 
-from src.storage.models.base import BaseModel
+from src.storage.models.base import Base, BaseModel
 
 
 class Budget(BaseModel):
@@ -13,3 +14,16 @@ class Budget(BaseModel):
     budget = Column(Float, nullable=False)
     usage = Column(Float, nullable=False)
 
+
+
+class BudgetUsageShard(Base):
+    """
+    Optional usage counters spread over BUDGET_USAGE_SHARDS rows, so concurrent completions add their cost to
+    different rows instead of all queueing on the budget row's lock. The budget's usage is Budget.usage plus its shards.
+    """
+    __tablename__ = "budget_usage_shards"
+    __table_args__ = {"schema": "agg_ai"}
+
+    budget_id = Column(PGUUID(as_uuid=True), ForeignKey("agg_ai.budget.id", ondelete="CASCADE"), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    usage = Column(Float, nullable=False, default=0.0)
@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import ARRAY, Boolean, Column, ForeignKey, Integer, String, Text
+from sqlalchemy import ARRAY, Boolean, Column, Float, ForeignKey, Index, Integer, String, Text, text
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
 from sqlalchemy.orm import backref, relationship
 
@@ -10,11 +10,16 @@ from src.storage.models.base import BaseModel
 class Chat(BaseModel):
     """Chat conversation model"""
     __tablename__ = "chats"
-    __table_args__ = {"schema": "agg_ai"}
+    __table_args__ = (
+        # Keyset pagination of a user's chat list, scanned backwards for the (pinned, updated_at, id) DESC order
+        Index("ix_chats_user_id_pinned_updated_at_id", "user_id", "pinned", "updated_at", "id"),
+        {"schema": "agg_ai"},
+    )
 
     user_id = Column(PGUUID(as_uuid=True), ForeignKey("agg_ai.users.id", ondelete="CASCADE"), nullable=False)
     title = Column(String, nullable=True)
     pinned = Column(Boolean, nullable=False, default=False)
+    last_seq_num = Column(Integer, nullable=False, default=0, server_default="0")  # per-chat message sequence counter
     
     messages = relationship("ChatMessage", back_populates="chat", cascade="all, delete-orphan", lazy="noload")
     user = relationship("User", back_populates="chats", lazy="noload")
@@ -24,7 +29,16 @@ class Chat(BaseModel):
 class ChatMessage(BaseModel):
     """Chat message model"""
     __tablename__ = "chat_messages"
-    __table_args__ = {"schema": "agg_ai"}
+    __table_args__ = (
+        # History reads in seq_num order and its keyset pagination on (seq_num, id)
+        Index("ix_chat_messages_chat_id_seq_num_id", "chat_id", "seq_num", "id"),
+        Index(
+            "ix_chat_messages_previous_message_id",
+            "previous_message_id",
+            postgresql_where=text("previous_message_id IS NOT NULL"),
+        ),
+        {"schema": "agg_ai"},
+    )
 
     id = Column(PGUUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     chat_id = Column(PGUUID(as_uuid=True), ForeignKey("agg_ai.chats.id", ondelete="CASCADE"), nullable=False)
@@ -41,6 +55,14 @@ class ChatMessage(BaseModel):
     content = Column(Text, nullable=True)
     selected = Column(Boolean, nullable=True)
     attachments = Column(ARRAY(PGUUID(as_uuid=True)), nullable=True)
+    token_estimate = Column(Integer, nullable=True)  # cheap estimate of the message's prompt tokens, see estimate_tokens
+
+    # Exact usage of an assistant message's response, set once it is done
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    cost_usd = Column(Float, nullable=True)
+    latency_ms = Column(Integer, nullable=True)
+    ttft_ms = Column(Integer, nullable=True)
     
     chat = relationship("Chat", back_populates="messages", lazy="noload")
     model = relationship("AiProviderModel", foreign_keys=[model_id],
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Float, String
+
+from src.storage.models.base import Base
+
+
+class RateLimitCounter(Base):
+    """
+    Shared GCRA state for the Postgres rate limit store: one row per limited key.
+    tat is the theoretical arrival time in epoch seconds, rows with a tat in the past are expired.
+    The table is unlogged, losing it on a crash only resets the limits.
+    """
+    __tablename__ = "rate_limit_counters"
+    __table_args__ = {"schema": "agg_ai", "prefixes": ["UNLOGGED"]}
+
+    key = Column(String, primary_key=True)
+    tat = Column(Float(precision=53), nullable=False)
@@ -12,9 +12,11 @@ class Resource(BaseModel):
     __table_args__ = {"schema": "agg_ai"}
 
     user_id = Column(
-        PGUUID(as_uuid=True), ForeignKey("agg_ai.users.id"), nullable=False
+        PGUUID(as_uuid=True), ForeignKey("agg_ai.users.id"), nullable=False, index=True
     )
+    blob_id = Column(PGUUID(as_uuid=True), ForeignKey("agg_ai.blobs.id"), nullable=True, index=True)
     filename = Column(String, nullable=False)
     content_type = Column(String, nullable=False)
-    storage_path = Column(String, nullable=False, unique=True)
+    storage_path = Column(String, nullable=True)  # only set for legacy, per-user uploads without a blob
     user = relationship("User", lazy="noload")
+    blob = relationship("Blob", lazy="noload")
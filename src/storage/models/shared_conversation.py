@@ -1,6 +1,6 @@
-from sqlalchemy import Column, ForeignKey
+from sqlalchemy import Column, ForeignKey, Integer, LargeBinary, String
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 
 from src.storage.models.base import BaseModel
 
@@ -9,6 +9,11 @@ class SharedConversation(BaseModel):
     __tablename__ = "shared_conversations"
     __table_args__ = {"schema": "agg_ai"}
 
-    chat_id = Column(PGUUID(as_uuid=True), ForeignKey("agg_ai.chats.id", ondelete="CASCADE"), nullable=False)
+    chat_id = Column(PGUUID(as_uuid=True), ForeignKey("agg_ai.chats.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Gzipped JSON of the shared chat as served, NULL until built and again whenever the chat changes
+    snapshot = deferred(Column(LargeBinary, nullable=True))
+    snapshot_etag = Column(String, nullable=True)
+    # Bumped by every change to the chat, a snapshot is only stored if no change came since its build started
+    snapshot_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     chat = relationship("Chat", back_populates="shared_conversation", lazy="noload")
@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import Column, ForeignKey, Integer
+from sqlalchemy import Column, ForeignKey, Index, Integer
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
 from sqlalchemy.orm import relationship
 
@@ -9,7 +9,11 @@ from src.storage.models.base import BaseModel
 
 class Usage(BaseModel):
     __tablename__ = "usage"
-    __table_args__ = {"schema": "agg_ai"}
+    __table_args__ = (
+        # One running total per user and model, lets usage be upserted with ON CONFLICT
+        Index("uq_usage_user_model", "user_id", "model_id", unique=True),
+        {"schema": "agg_ai"},
+    )
 
     id = Column(PGUUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     
@@ -0,0 +1,62 @@
+import uuid
+
+from sqlalchemy import BigInteger, Column, DateTime, Float, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID as PGUUID
+
+from src.storage.models.base import Base
+
+
+class UsageLedger(Base):
+    """
+    Append-only usage history, one row per user/model per usage flush.
+    Range partitioned by month on created_at, partitions are created on demand by
+    agg_ai.ensure_usage_ledger_partition(), so the primary key has to include created_at.
+    """
+    __tablename__ = "usage_ledger"
+    __table_args__ = (
+        Index("ix_usage_ledger_created_at", "created_at"),
+        Index("ix_usage_ledger_user_id_created_at", "user_id", "created_at"),
+        Index("ix_usage_ledger_model_id_created_at", "model_id", "created_at"),
+        {"schema": "agg_ai", "postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    id = Column(PGUUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    created_at = Column(DateTime(timezone=True), primary_key=True)
+
+    user_id = Column(PGUUID(as_uuid=True), ForeignKey("agg_ai.users.id"), nullable=False)
+    model_id = Column(PGUUID(as_uuid=True), ForeignKey("agg_ai.ai_provider_models.id"), nullable=False)
+
+    prompt_tokens = Column(BigInteger, nullable=False, default=0)
+    completion_tokens = Column(BigInteger, nullable=False, default=0)
+    total_tokens = Column(BigInteger, nullable=False, default=0)
+    cost_usd = Column(Float, nullable=False, default=0.0)
+
+
+class UsageRollupMixin:
+    """Usage summed per time bucket, user and model. Maintained incrementally by every usage flush."""
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    user_id = Column(PGUUID(as_uuid=True), ForeignKey("agg_ai.users.id"), primary_key=True)
+    model_id = Column(PGUUID(as_uuid=True), ForeignKey("agg_ai.ai_provider_models.id"), primary_key=True)
+
+    prompt_tokens = Column(BigInteger, nullable=False, default=0)
+    completion_tokens = Column(BigInteger, nullable=False, default=0)
+    total_tokens = Column(BigInteger, nullable=False, default=0)
+    cost_usd = Column(Float, nullable=False, default=0.0)
+
+
+class UsageHourly(UsageRollupMixin, Base):
+    __tablename__ = "usage_hourly"
+    __table_args__ = (
+        Index("ix_usage_hourly_user_id_bucket", "user_id", "bucket"),
+        Index("ix_usage_hourly_model_id_bucket", "model_id", "bucket"),
+        {"schema": "agg_ai"},
+    )
+
+
+class UsageDaily(UsageRollupMixin, Base):
+    __tablename__ = "usage_daily"
+    __table_args__ = (
+        Index("ix_usage_daily_user_id_bucket", "user_id", "bucket"),
+        Index("ix_usage_daily_model_id_bucket", "model_id", "bucket"),
+        {"schema": "agg_ai"},
+    )
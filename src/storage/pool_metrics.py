@@ -0,0 +1,182 @@
+import asyncio
+import time
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set
+
+from opentelemetry import metrics
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.logging.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Route of sessions opened outside of a request, e.g. the usage flush and attachment preprocessing
+BACKGROUND_ROUTE = "background"
+PRIMARY_POOL = "primary"
+CHECKOUT_INFO_KEY = "checkout"
+
+# No-op until configure_telemetry installs a meter provider
+meter = metrics.get_meter(__name__)
+wait_time = meter.create_histogram(
+    "db.client.connection.wait_time", unit="s", description="Time it took to get a connection from the pool"
+)
+use_time = meter.create_histogram(
+    "db.client.connection.use_time", unit="s", description="Time a connection was checked out, by route"
+)
+session_checkouts = meter.create_histogram(
+    "db.client.connection.session_checkouts", unit="{checkout}", description="Connection checkouts of one session, by route"
+)
+
+
+class SessionScope:
+    """Route and checkout count of the session in use, the pool events run in greenlets sharing the context."""
+
+    __slots__ = ("route", "checkouts")
+
+    def __init__(self, route: str):
+        self.route = route
+        self.checkouts = 0
+
+
+class Checkout(NamedTuple):
+    pool_name: str
+    route: str
+    started_at: float
+    task: Optional[asyncio.Task]
+
+
+_session_scope: ContextVar[Optional[SessionScope]] = ContextVar("db_session_scope", default=None)
+
+
+@contextmanager
+def track_session(route: Optional[str]) -> Iterator[SessionScope]:
+    """Attribute the connections checked out inside the block to the route, and record their count at the end."""
+    scope = SessionScope(route or BACKGROUND_ROUTE)
+    previous = _session_scope.get()
+    # set() instead of reset(token), streaming responses may close the session in a copy of the context
+    _session_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _session_scope.set(previous)
+        if scope.checkouts:
+            session_checkouts.record(scope.checkouts, {"http.route": scope.route})
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool recording how long each checkout waited for a connection, new connections included."""
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        connection = super()._do_get()
+        wait_time.record(time.perf_counter() - started_at, {"pool.name": self._orig_logging_name or PRIMARY_POOL})
+        return connection
+
+
+class PoolMonitor:
+    """
+    Tracks the checked out connections of the instrumented engines: records their use time per route when
+    they are returned and, every few seconds, logs the stack of the task holding one for longer than
+    warn_after seconds, e.g. a request keeping its session open during a long SSE stream.
+    """
+
+    def __init__(self, warn_after: float):
+        self.warn_after = warn_after
+        self._engines: Dict[str, AsyncEngine] = {}
+        self._checked_out: Dict[int, Checkout] = {}
+        self._warned: Set[int] = set()
+        self._task: Optional[asyncio.Task] = None
+
+        meter.create_observable_up_down_counter(
+            "db.client.connection.count",
+            callbacks=[self._observe_connections],
+            unit="{connection}",
+            description="Connections of the pools by state",
+        )
+
+    def instrument(self, engine: AsyncEngine, pool_name: str) -> None:
+        self._engines[pool_name] = engine
+
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            self._on_checkout(pool_name, connection_record)
+
+        def on_checkin(dbapi_connection, connection_record):
+            self._on_checkin(connection_record)
+
+        event.listen(engine.sync_engine, "checkout", on_checkout)
+        event.listen(engine.sync_engine, "checkin", on_checkin)
+
+    def _on_checkout(self, pool_name: str, connection_record) -> None:
+        scope = _session_scope.get()
+        if scope is not None:
+            scope.checkouts += 1
+
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+
+        checkout = Checkout(
+            pool_name=pool_name,
+            route=scope.route if scope is not None else BACKGROUND_ROUTE,
+            started_at=time.monotonic(),
+            task=task,
+        )
+        connection_record.info[CHECKOUT_INFO_KEY] = checkout
+        self._checked_out[id(connection_record)] = checkout
+
+    def _on_checkin(self, connection_record) -> None:
+        checkout = connection_record.info.pop(CHECKOUT_INFO_KEY, None)
+        self._checked_out.pop(id(connection_record), None)
+        self._warned.discard(id(connection_record))
+        if checkout is not None:
+            use_time.record(
+                time.monotonic() - checkout.started_at, {"pool.name": checkout.pool_name, "http.route": checkout.route}
+            )
+
+    def _observe_connections(self, options) -> List[metrics.Observation]:
+        observations = []
+        for pool_name, engine in self._engines.items():
+            pool = engine.sync_engine.pool
+            observations.append(metrics.Observation(pool.checkedout(), {"pool.name": pool_name, "state": "used"}))
+            observations.append(metrics.Observation(pool.checkedin(), {"pool.name": pool_name, "state": "idle"}))
+        return observations
+
+    def check(self) -> None:
+        now = time.monotonic()
+        for record_id, checkout in list(self._checked_out.items()):
+            held_for = now - checkout.started_at
+            if held_for < self.warn_after or record_id in self._warned:
+                continue
+
+            self._warned.add(record_id)
+            stack = ""
+            if checkout.task is not None and not checkout.task.done():
+                frames = traceback.StackSummary.extract((frame, frame.f_lineno) for frame in checkout.task.get_stack())
+                stack = "".join(traceback.format_list(frames))
+            logger.warning(
+                f"Database connection of the {checkout.pool_name} pool held for {held_for:.1f}s by {checkout.route}, "
+                f"holding task stack:\n{stack or '<not available>'}"
+            )
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(min(self.warn_after / 2, 10.0))
+            self.check()
+
+    def start(self) -> None:
+        if self._task is None and self.warn_after > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,183 @@
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select, visitors
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.selectable import CTE
+
+from src.logging.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Session.info keys
+REPLICA_SAFE = "replica_safe"
+WROTE = "wrote"
+USER_ID = "user_id"
+
+MAX_RECENT_WRITERS = 100_000
+
+# Seconds of replication lag, 0 when the replica has replayed all the WAL it received (an idle primary
+# would otherwise make an up to date replica look more and more behind). Also 0 on a primary.
+LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class ReplicaSet:
+    """
+    Read replicas of the primary database, picked round robin.
+    A background task measures each replica's lag every check_interval seconds, replicas lagging more than
+    max_lag seconds or failing the check are out of rotation until they catch up. Users who wrote in the last
+    sticky_seconds read from the primary, so they see their own writes in the following requests too.
+    """
+
+    def __init__(self, engines: List[AsyncEngine], max_lag: float, check_interval: float, sticky_seconds: float):
+        self.engines = engines
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.sticky_seconds = sticky_seconds
+        self.lags: Dict[str, Optional[float]] = {self._name(engine): None for engine in engines}
+        self._healthy: List[Engine] = []
+        self._counter = itertools.count()
+        self._recent_writers: OrderedDict[UUID, float] = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _name(engine: AsyncEngine) -> str:
+        return engine.url.render_as_string(hide_password=True)
+
+    def choose(self) -> Optional[Engine]:
+        """A replica in rotation, None when there is none and reads have to go to the primary."""
+        healthy = self._healthy
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    def mark_write(self, user_id: UUID) -> None:
+        now = time.monotonic()
+        self._recent_writers[user_id] = now
+        self._recent_writers.move_to_end(user_id)
+        while self._recent_writers:
+            oldest_user_id, written_at = next(iter(self._recent_writers.items()))
+            if now - written_at < self.sticky_seconds and len(self._recent_writers) <= MAX_RECENT_WRITERS:
+                break
+            del self._recent_writers[oldest_user_id]
+
+    def is_sticky(self, user_id: Optional[UUID]) -> bool:
+        written_at = self._recent_writers.get(user_id) if user_id else None
+        return written_at is not None and time.monotonic() - written_at < self.sticky_seconds
+
+    async def _measure_lag(self, engine: AsyncEngine) -> Optional[float]:
+        async def measure() -> float:
+            async with engine.connect() as connection:
+                return float(await connection.scalar(LAG_QUERY))
+
+        try:
+            return await asyncio.wait_for(measure(), timeout=self.check_interval)
+        except Exception as e:
+            logger.warning(f"Replication lag check of {self._name(engine)} failed: {str(e)}")
+            return None
+
+    async def check(self) -> None:
+        lags = await asyncio.gather(*(self._measure_lag(engine) for engine in self.engines))
+
+        healthy = []
+        for engine, lag in zip(self.engines, lags):
+            name = self._name(engine)
+            in_rotation = lag is not None and lag <= self.max_lag
+            was_in_rotation = engine.sync_engine in self._healthy
+            if in_rotation and not was_in_rotation:
+                logger.info(f"Replica {name} is in rotation, lag {lag:.2f}s")
+            elif was_in_rotation and not in_rotation:
+                lag_info = f"lag {lag:.2f}s" if lag is not None else "unreachable"
+                logger.warning(f"Replica {name} is out of rotation, {lag_info}")
+
+            self.lags[name] = lag
+            if in_rotation:
+                healthy.append(engine.sync_engine)
+
+        self._healthy = healthy
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self.check_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        self._healthy = []
+        for engine in self.engines:
+            await engine.dispose()
+
+
+class RoutingSession(Session):
+    """
+    Session sending replica-safe reads to a read replica and everything else to the primary.
+    Reads are replica-safe when the session is marked with REPLICA_SAFE in its info (the replica_reads route
+    dependency). A SELECT carrying INSERT, UPDATE or DELETE CTEs is a write.
+    A session sticks to one replica, and once it writes every following statement goes to the primary and
+    each commit marks its user as a recent writer.
+    """
+
+    def __init__(self, *args, replica_set: Optional[ReplicaSet] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica_set = replica_set
+        self._replica: Optional[Engine] = None
+
+    def _is_write(self, clause) -> bool:
+        if self._flushing or isinstance(clause, UpdateBase):
+            return True
+        # e.g. SELECT ... FROM (INSERT ... RETURNING), only looked for while reads may still go to a replica
+        if clause is None or self.replica_set is None or self.info.get(WROTE):
+            return False
+        return any(
+            isinstance(element, CTE) and isinstance(element.element, UpdateBase) for element in visitors.iterate(clause)
+        )
+
+    def _is_replica_read(self, clause) -> bool:
+        if self.replica_set is None or self.info.get(WROTE) or not self.info.get(REPLICA_SAFE):
+            return False
+        # Plain SELECTs only, no SELECT ... FOR UPDATE and no compound statements
+        if not isinstance(clause, Select) or clause._for_update_arg is not None:
+            return False
+        return not self.replica_set.is_sticky(self.info.get(USER_ID))
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._is_write(clause):
+            self.info[WROTE] = True
+        elif self._is_replica_read(clause):
+            if self._replica is None:
+                self._replica = self.replica_set.choose()
+            if self._replica is not None:
+                return self._replica
+
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _mark_writer(session: RoutingSession) -> None:
+    # On every commit, not when the session is closed, so requests racing a long-lived session (a streamed
+    # response) already read the user's committed writes from the primary
+    user_id = session.info.get(USER_ID)
+    if session.replica_set is not None and user_id and session.info.get(WROTE):
+        session.replica_set.mark_write(user_id)
@@ -1 +1,16 @@
 DEFAULT_IMAGE_GEN_MODEL = 'openai/dall-e-2'
+
+
+# Longest image edge each host's vision models work with, larger images are downscaled by the provider anyway
+VISION_MAX_IMAGE_DIMENSIONS = {
+    'openai': 2048,
+    'anthropic': 1568,
+    'gemini': 3072,
+}
+DEFAULT_VISION_MAX_IMAGE_DIMENSION = 1568
+
+# Cheap token estimate used for the pre-flight limit check: roughly four characters per token for text,
+# a flat amount per attachment and a small per-message overhead for the role and separators
+TOKEN_ESTIMATE_CHARS_PER_TOKEN = 4
+TOKEN_ESTIMATE_PER_ATTACHMENT = 1000
+TOKEN_ESTIMATE_PER_MESSAGE = 4
@@ -0,0 +1,76 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src.services.common.context import Context
+from src.services.usage_tracking.usage_tracking_service import UsageTrackingService
+
+from src.storage.base_repo import BaseRepository
+from src.storage.models.usage import Usage
+
+DAY = datetime(2026, 10, 19, tzinfo=timezone.utc)
+
+
+class EmptyResult:
+    def fetchone(self):
+        return None
+
+    def fetchall(self):
+        return []
+
+
+class RecordingSession:
+    """Stands in for the database session, keeps the SQL of every statement and returns no rows."""
+
+    def __init__(self):
+        self.statements: List[str] = []
+
+    async def execute(self, stmt, params=None):
+        compiled = stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+        self.statements.append(" ".join(str(compiled).split()))
+        return EmptyResult()
+
+
+def aggregated_usage_sql(aggregation, start_date=None, end_date=None) -> List[str]:
+    session = RecordingSession()
+    service = UsageTrackingService(context=Context(), usage_model_repo=BaseRepository(Usage, session))
+    asyncio.run(service.get_aggregated_usage(aggregation, start_date=start_date, end_date=end_date))
+    return session.statements
+
+
+@pytest.mark.parametrize(
+    "aggregation, start_date, end_date, table",
+    [
+        ("day", DAY - timedelta(days=7), DAY, "usage_daily"),
+        ("model", None, None, "usage_daily"),
+        ("hour", DAY - timedelta(days=7), DAY, "usage_hourly"),
+        ("day", DAY - timedelta(hours=5), DAY, "usage_hourly"),
+        ("day", DAY - timedelta(minutes=30), DAY, "usage_ledger"),
+        ("hour", DAY, DAY + timedelta(hours=1, seconds=1), "usage_ledger"),
+        ("minute", DAY - timedelta(days=1), DAY, "usage_ledger"),
+        # 02:00 in UTC+2 is the start of the UTC day
+        ("day", datetime(2026, 10, 19, 2, tzinfo=timezone(timedelta(hours=2))), None, "usage_daily"),
+    ],
+)
+def test_reads_the_coarsest_table_aligned_with_the_bounds(aggregation, start_date, end_date, table):
+    statements = aggregated_usage_sql(aggregation, start_date, end_date)
+
+    assert statements
+    for sql in statements:
+        assert f"FROM agg_ai.{table}" in sql
+
+
+@pytest.mark.parametrize(
+    "start_date, end_filter",
+    [
+        (DAY - timedelta(days=1), "agg_ai.usage_daily.bucket < '2026-10-19 00:00:00+00:00'"),
+        (DAY - timedelta(hours=1), "agg_ai.usage_hourly.bucket < '2026-10-19 00:00:00+00:00'"),
+        (DAY - timedelta(minutes=1), "agg_ai.usage_ledger.created_at <= '2026-10-19 00:00:00+00:00'"),
+    ],
+)
+def test_rollups_exclude_the_bucket_starting_at_end_date(start_date, end_filter):
+    for sql in aggregated_usage_sql("day", start_date, DAY):
+        assert end_filter in sql